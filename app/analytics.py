@@ -0,0 +1,142 @@
+"""
+Shared analytics helpers for dashboard and report charts
+
+Every trend helper returns one entry per calendar month (oldest first) and is
+backed by a single grouped query, so a chart costs one round trip per metric
+no matter how many months it spans.
+"""
+
+from datetime import date
+
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import DailyAttendanceRollup, Employee, Payroll
+
+
+def last_n_months(n, today=None):
+    """Return the first day of the last ``n`` calendar months, oldest first, ending with the current month"""
+    today = today or timezone.now().date()
+    months = []
+    year, month = today.year, today.month
+    for _ in range(n):
+        months.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    months.reverse()
+    return months
+
+
+def _month_key(value):
+    """Normalise a TruncMonth result (date or datetime) to a (year, month) tuple"""
+    return (value.year, value.month)
+
+
+def attendance_by_month(n, today=None):
+    """
+    Attendance totals for the last ``n`` calendar months, read from the daily rollup table.
+
+    Each entry has ``month_start``, ``present`` (present + half day + late), ``absent``,
+    ``half_day``, ``late``, ``total`` and ``attendance_rate``.
+    """
+    today = today or timezone.now().date()
+    months = last_n_months(n, today)
+
+    grouped = DailyAttendanceRollup.objects.filter(
+        date__gte=months[0],
+        date__lte=today
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('month').annotate(
+        present=Sum('present_count'),
+        absent=Sum('absent_count'),
+        half_day=Sum('half_day_count'),
+        late=Sum('late_count'),
+        total=Sum('total_count'),
+    ).order_by()
+
+    by_month = {_month_key(row['month']): row for row in grouped}
+
+    results = []
+    for month_start in months:
+        row = by_month.get(_month_key(month_start), {})
+        present = (row.get('present') or 0) + (row.get('half_day') or 0) + (row.get('late') or 0)
+        total = row.get('total') or 0
+        results.append({
+            'month_start': month_start,
+            'present': present,
+            'absent': row.get('absent') or 0,
+            'half_day': row.get('half_day') or 0,
+            'late': row.get('late') or 0,
+            'total': total,
+            'attendance_rate': round((present / max(total, 1)) * 100, 1),
+        })
+    return results
+
+
+def payroll_by_month(n, today=None):
+    """
+    Payroll totals for the last ``n`` calendar months.
+
+    Grouped on ``Payroll.period`` (first day of the month) with a range scan on its
+    index, so "January" and "January 2025" labels land in the same month. Each entry
+    has ``month_start``, ``label``, ``total`` (sum of final salaries) and ``employee_count``.
+    """
+    months = last_n_months(n, today)
+    labels = [month_start.strftime("%B %Y") for month_start in months]
+
+    grouped = Payroll.objects.filter(
+        period__gte=months[0],
+        period__lte=months[-1]
+    ).values('period').annotate(
+        total=Sum('final_salary'),
+        employee_count=Count('employee', distinct=True),
+    ).order_by()
+
+    by_period = {row['period']: row for row in grouped}
+
+    results = []
+    for month_start, label in zip(months, labels):
+        row = by_period.get(month_start, {})
+        results.append({
+            'month_start': month_start,
+            'label': label,
+            'total': row.get('total') or 0,
+            'employee_count': row.get('employee_count') or 0,
+        })
+    return results
+
+
+def headcount_by_month(n, today=None):
+    """
+    Registered and still-active employee counts at the end of each of the last ``n`` months.
+
+    Joins are grouped by month in one query and accumulated in Python. Each entry has
+    ``month_start``, ``total_employees`` and ``active_employees``.
+    """
+    months = last_n_months(n, today)
+
+    grouped = Employee.objects.annotate(
+        month=TruncMonth('created_at')
+    ).values('month').annotate(
+        joined=Count('id'),
+        joined_active=Count('id', filter=Q(resigned_date__isnull=True)),
+    ).order_by('month')
+
+    results = []
+    running_total = running_active = 0
+    rows = iter(grouped)
+    row = next(rows, None)
+    for month_start in months:
+        while row is not None and _month_key(row['month']) <= _month_key(month_start):
+            running_total += row['joined']
+            running_active += row['joined_active']
+            row = next(rows, None)
+        results.append({
+            'month_start': month_start,
+            'total_employees': running_total,
+            'active_employees': running_active,
+        })
+    return results
@@ -0,0 +1,314 @@
+"""
+Attendance views helpers built on date-keyed indexes
+
+Each record type is fetched once for the whole range with ``.values()`` and
+indexed by date, so building a month (or a table of employees x days) costs a
+fixed number of queries instead of one per day.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils import timezone
+
+from .caching import cache_timeout
+from .models import PresentRecord, AbsentRecord, LateMarkRecord, DailyWorkCompletion
+
+
+# Finished months are immutable apart from HR back-dating, which invalidates the key.
+# The invalidation only reaches a shared cache; a per-process cache gets the short timeout.
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+CALENDAR_LOCAL_CACHE_TIMEOUT = 60 * 5
+
+
+# ============================================================================
+# EMPLOYEE ATTENDANCE CALENDAR
+# ============================================================================
+
+def month_bounds(year, month):
+    """Return (first_day, last_day) of a calendar month"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def calendar_cache_key(employee_id, year, month):
+    return f"attendance_calendar:{employee_id}:{year}:{month:02d}"
+
+
+def invalidate_attendance_calendar(employee_id, attendance_date):
+    """Drop the cached month containing ``attendance_date`` for one employee"""
+    cache.delete(calendar_cache_key(employee_id, attendance_date.year, attendance_date.month))
+
+
+def _format(value, fmt):
+    return value.strftime(fmt) if value else None
+
+
+def build_attendance_calendar(employee_id, year, month, today=None):
+    """
+    Build the per-day calendar payload for one employee and month.
+
+    Present records take priority over late marks, which take priority over
+    absences. Months that ended before ``today`` are cached.
+    """
+    today = today or timezone.now().date()
+    first_day, last_day = month_bounds(year, month)
+    is_past_month = last_day < today
+
+    if is_past_month:
+        cached = cache.get(calendar_cache_key(employee_id, year, month))
+        if cached is not None:
+            return cached
+
+    date_range = [first_day, last_day]
+
+    present_by_date = {
+        row['attendance_date']: row
+        for row in PresentRecord.objects.filter(
+            employee_id=employee_id, attendance_date__range=date_range
+        ).values('id', 'attendance_date', 'check_in_time', 'marked_time')
+    }
+    late_by_date = {
+        row['attendance_date']: row
+        for row in LateMarkRecord.objects.filter(
+            employee_id=employee_id, attendance_date__range=date_range
+        ).values('id', 'attendance_date', 'late_minutes', 'actual_check_in_time')
+    }
+    absent_by_date = {
+        row['attendance_date']: row
+        for row in AbsentRecord.objects.filter(
+            employee_id=employee_id, attendance_date__range=date_range
+        ).values('id', 'attendance_date', 'reason', 'marked_time')
+    }
+
+    calendar_data = []
+    current_date = first_day
+    while current_date <= last_day:
+        status = 'no_record'
+        record_id = None
+        details = {}
+
+        present = present_by_date.get(current_date)
+        late_mark = late_by_date.get(current_date)
+        absent = absent_by_date.get(current_date)
+
+        if present:
+            status = 'present'
+            record_id = present['id']
+            details = {
+                'check_in_time': _format(present['check_in_time'], '%H:%M:%S'),
+                'marked_time': _format(present['marked_time'], '%Y-%m-%d %H:%M:%S')
+            }
+        elif late_mark:
+            status = 'late_mark'
+            record_id = late_mark['id']
+            details = {
+                'late_minutes': late_mark['late_minutes'],
+                'actual_check_in_time': _format(late_mark['actual_check_in_time'], '%H:%M:%S')
+            }
+        elif absent:
+            status = 'absent'
+            record_id = absent['id']
+            details = {
+                'reason': absent['reason'],
+                'marked_time': _format(absent['marked_time'], '%Y-%m-%d %H:%M:%S')
+            }
+
+        calendar_data.append({
+            'date': current_date.strftime('%Y-%m-%d'),
+            'day': current_date.day,
+            'status': status,
+            'record_id': record_id,
+            'details': details,
+            'is_past': current_date < today,
+            'is_today': current_date == today,
+            'is_weekend': current_date.weekday() >= 5  # Saturday = 5, Sunday = 6
+        })
+
+        current_date += timedelta(days=1)
+
+    payload = {
+        'calendar_data': calendar_data,
+        'month': month,
+        'year': year,
+        'month_name': calendar.month_name[month],
+        'first_day': first_day.strftime('%Y-%m-%d'),
+        'last_day': last_day.strftime('%Y-%m-%d')
+    }
+
+    if is_past_month:
+        cache.set(
+            calendar_cache_key(employee_id, year, month), payload,
+            cache_timeout(CALENDAR_CACHE_TIMEOUT, CALENDAR_LOCAL_CACHE_TIMEOUT)
+        )
+    return payload
+
+
+# ============================================================================
+# ATTENDANCE MATRIX (EMPLOYEES x DAYS)
+# ============================================================================
+
+ATTENDANCE_PAGE_SIZES = [10, 20, 50, 100]
+
+
+def dates_between(from_date, to_date):
+    """Every date from ``from_date`` to ``to_date`` inclusive"""
+    return [from_date + timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
+
+
+def _empty_cell(day):
+    return {
+        'date': day,
+        'status': 'No Record',
+        'time': '',
+        'details': '',
+        'work_completion': None
+    }
+
+
+def load_attendance_index(employee_ids, from_date, to_date):
+    """
+    Index every attendance record in the range by (employee_id, date).
+
+    Four queries in total (present, late mark, absent, work completion). When
+    a day has several records the later checks win, matching the original
+    table: absent over late mark over present.
+    """
+    date_range = [from_date, to_date]
+    index = {}
+
+    def cell(employee_id, day):
+        key = (employee_id, day)
+        if key not in index:
+            index[key] = _empty_cell(day)
+        return index[key]
+
+    for row in PresentRecord.objects.filter(
+        employee_id__in=employee_ids, attendance_date__range=date_range
+    ).values('employee_id', 'attendance_date', 'marked_time', 'check_in_time'):
+        record = cell(row['employee_id'], row['attendance_date'])
+        record['status'] = 'Present'
+        record['time'] = _format(row['marked_time'], '%H:%M:%S')
+        record['details'] = f"Checked in at {_format(row['check_in_time'], '%H:%M:%S') or 'N/A'}"
+
+    for row in LateMarkRecord.objects.filter(
+        employee_id__in=employee_ids, attendance_date__range=date_range
+    ).values('employee_id', 'attendance_date', 'marked_time', 'late_minutes'):
+        record = cell(row['employee_id'], row['attendance_date'])
+        record['status'] = 'Late Mark'
+        record['time'] = _format(row['marked_time'], '%H:%M:%S')
+        record['details'] = f"Late by {row['late_minutes']} minutes"
+
+    for row in AbsentRecord.objects.filter(
+        employee_id__in=employee_ids, attendance_date__range=date_range
+    ).values('employee_id', 'attendance_date', 'marked_time', 'reason'):
+        record = cell(row['employee_id'], row['attendance_date'])
+        record['status'] = 'Absent'
+        record['time'] = _format(row['marked_time'], '%H:%M:%S')
+        record['details'] = row['reason'] or 'No reason provided'
+
+    for row in DailyWorkCompletion.objects.filter(
+        employee_id__in=employee_ids, work_date__range=date_range
+    ).values('id', 'employee_id', 'work_date', 'status', 'work_completion_time'):
+        cell(row['employee_id'], row['work_date'])['work_completion'] = row
+
+    return index
+
+
+def attendance_status_counts(employee_ids, from_date, to_date):
+    """
+    Day counts per resolved status for the whole range, without loading record details.
+
+    Returns ``{employee_id: {'Present': n, 'Late Mark': n, 'Absent': n}}``.
+    """
+    date_range = [from_date, to_date]
+    statuses = {}
+    for model, status in ((PresentRecord, 'Present'), (LateMarkRecord, 'Late Mark'), (AbsentRecord, 'Absent')):
+        for key in model.objects.filter(
+            employee_id__in=employee_ids, attendance_date__range=date_range
+        ).values_list('employee_id', 'attendance_date'):
+            statuses[key] = status
+
+    counts = {employee_id: {'Present': 0, 'Late Mark': 0, 'Absent': 0} for employee_id in employee_ids}
+    for (employee_id, _), status in statuses.items():
+        counts[employee_id][status] += 1
+    return counts
+
+
+def build_attendance_matrix(employees, from_date, to_date, today=None):
+    """
+    One row per employee with a cell for every day in the range.
+
+    Each row has ``employee``, ``cells`` (day-ordered), ``records`` (the cells
+    that have an attendance record), ``today`` (the cell for today or None) and
+    per-status ``counts``. Pass only the employees on the current page.
+    """
+    today = today or timezone.now().date()
+    days = dates_between(from_date, to_date)
+    index = load_attendance_index([employee.id for employee in employees], from_date, to_date)
+
+    rows = []
+    for employee in employees:
+        cells = [index.get((employee.id, day)) or _empty_cell(day) for day in days]
+        counts = {'Present': 0, 'Late Mark': 0, 'Absent': 0, 'No Record': 0}
+        for record in cells:
+            counts[record['status']] += 1
+        rows.append({
+            'employee': employee,
+            'cells': cells,
+            'records': [record for record in cells if record['status'] != 'No Record'],
+            'today': index.get((employee.id, today)) if from_date <= today <= to_date else None,
+            'counts': counts,
+        })
+    return rows
+
+
+def page_numbers_for(page, total_pages):
+    """Compact page list for pagination controls, e.g. [1, '...', 4, 5, 6, '...', 12]"""
+    if total_pages <= 7:
+        return list(range(1, total_pages + 1))
+    if page <= 4:
+        return [1, 2, 3, 4, 5, '...', total_pages]
+    if page >= total_pages - 3:
+        return [1, '...', total_pages - 4, total_pages - 3, total_pages - 2, total_pages - 1, total_pages]
+    return [1, '...', page - 1, page, page + 1, '...', total_pages]
+
+
+def paginate_attendance_employees(request, employees, default_page_size=20):
+    """Paginate an employee queryset in the database using ``?page=`` and ``?page_size=``"""
+    try:
+        page_size = int(request.GET.get('page_size', default_page_size))
+    except ValueError:
+        page_size = default_page_size
+    if page_size not in ATTENDANCE_PAGE_SIZES:
+        page_size = default_page_size
+    return Paginator(employees, page_size).get_page(request.GET.get('page'))
+
+
+def attendance_range_summary(from_date, to_date, employees=None):
+    """
+    Headline counts and the five latest present / late mark records for a date range.
+
+    ``employees`` optionally limits the records to a queryset of employees.
+    """
+    date_range = [from_date, to_date]
+    querysets = {
+        'present': PresentRecord.objects.filter(attendance_date__range=date_range),
+        'absent': AbsentRecord.objects.filter(attendance_date__range=date_range),
+        'late_mark': LateMarkRecord.objects.filter(attendance_date__range=date_range),
+    }
+    if employees is not None:
+        querysets = {name: queryset.filter(employee__in=employees) for name, queryset in querysets.items()}
+
+    recent = {
+        name: list(queryset.select_related('employee').order_by('-attendance_date', '-marked_time')[:5])
+        for name, queryset in querysets.items() if name != 'absent'
+    }
+    return {
+        'total_present': querysets['present'].count(),
+        'total_absent': querysets['absent'].count(),
+        'total_late_mark': querysets['late_mark'].count(),
+        'present_records': recent['present'],
+        'late_mark_records': recent['late_mark'],
+    }
@@ -0,0 +1,27 @@
+"""
+Cache backend checks for caches that are invalidated explicitly
+
+Attendance calendars, principal snapshots and dashboard fragments are
+deleted or re-keyed by model signals when their data changes. That only
+works when every worker reads the same cache (Redis, Memcached, database).
+With a process-local backend (the LocMemCache default, or DummyCache) a
+signal in one gunicorn worker leaves every other worker's copy in place, so
+callers use a short timeout, or skip caching, instead.
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def cache_is_shared(alias='default'):
+    """True when invalidations made by this process are seen by every other worker"""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def cache_timeout(timeout, local_timeout, alias='default'):
+    """``timeout`` on a shared cache, ``local_timeout`` when each process has its own"""
+    return timeout if cache_is_shared(alias) else local_timeout
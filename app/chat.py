@@ -0,0 +1,328 @@
+"""
+Team chat helpers shared by the chat API views
+
+Incremental sync walks a participant's messages in (updated_at, id) order
+from an opaque cursor. Each side of the conversation (messages sent, messages
+received) is one range scan on a (participant, updated_at) index, so a poll
+with nothing new costs two empty index probes.
+
+A row can commit after a client already synced past its updated_at (the
+timestamp is taken before a slow transaction commits). Sync cursors therefore
+remember the newest updated_at delivered plus the (id, updated_at) versions
+delivered within SYNC_OVERLAP of it; each poll re-reads that window and skips
+the versions already sent, so late rows are picked up without duplicates.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TeamChat, ChatUnreadCounter, ProjectAssignment
+from .realtime import publish, user_channel, project_channel
+
+
+SYNC_DEFAULT_LIMIT = 100
+SYNC_MAX_LIMIT = 500
+
+# How far below the newest delivered updated_at each sync re-reads for late commits
+SYNC_OVERLAP = timedelta(seconds=10)
+# Delivered versions remembered in a cursor, to keep it well inside URL limits; past this
+# the cursor stops re-reading below the oldest one it forgot (its "floor")
+SYNC_MAX_SEEN = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Participant columns per side, by the role of the user syncing
+PARTICIPANT_FIELDS = {
+    'employee': ('sender_employee_id', 'receiver_employee_id'),
+    'tl': ('sender_tl_id', 'receiver_tl_id'),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(updated_at, message_id):
+    payload = json.dumps({'u': updated_at.isoformat(), 'i': message_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (updated_at, message_id) from a cursor produced by ``encode_cursor``"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(payload['u']), int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid sync cursor: {e}")
+
+
+def _micros(value):
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def encode_sync_cursor(high_water, seen, floor=None):
+    """
+    Chat sync cursor. ``high_water`` is the newest updated_at delivered,
+    ``seen`` the (message id, updated_at microseconds) versions delivered within
+    SYNC_OVERLAP of it and ``floor`` an optional (microseconds, id) keyset
+    position below which nothing is re-read.
+    """
+    high = _micros(high_water)
+    window = _micros(high_water - SYNC_OVERLAP)
+    recent = sorted(((micros, message_id) for message_id, micros in seen if micros >= window), reverse=True)
+    if len(recent) > SYNC_MAX_SEEN:
+        # Forget the oldest versions and raise the floor past them, so paging always moves forward
+        dropped = recent[SYNC_MAX_SEEN]
+        floor = max(floor, dropped) if floor else dropped
+        recent = recent[:SYNC_MAX_SEEN]
+
+    payload = {'u': high_water.isoformat(), 's': [[message_id, high - micros] for micros, message_id in recent]}
+    if floor and floor[0] >= window:
+        payload['f'] = [high - floor[0], floor[1]]
+    payload = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """
+    Return (high_water, seen, floor) from ``encode_sync_cursor``. Plain
+    ``encode_cursor`` cursors from older clients keep their strict keyset
+    position as the floor.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        high_water = datetime.fromisoformat(payload['u'])
+        high = _micros(high_water)
+        if 's' not in payload:
+            return high_water, set(), (high, int(payload['i']))
+        seen = {(int(message_id), high - int(offset)) for message_id, offset in payload['s']}
+        floor = (high - int(payload['f'][0]), int(payload['f'][1])) if 'f' in payload else None
+        return high_water, seen, floor
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        raise InvalidCursor(f"Invalid sync cursor: {e}")
+
+
+def serialize_chat_message(chat):
+    """JSON shape used by get_conversations and the sync endpoint"""
+    return {
+        'id': chat.id,
+        'chat_type': chat.chat_type,
+        'subject': chat.subject,
+        'message': chat.message,
+        'priority': chat.priority,
+        'status': chat.status,
+        'is_read': chat.is_read,
+        'read_at': chat.read_at.strftime('%Y-%m-%d %H:%M:%S') if chat.read_at else None,
+        'created_at': chat.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': chat.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'sender': {
+            'id': chat.sender_employee.id if chat.sender_employee else chat.sender_tl.id,
+            'name': chat.get_sender_name(),
+            'type': 'employee' if chat.sender_employee else 'tl',
+            'image': chat.sender_employee.image.url if chat.sender_employee and chat.sender_employee.image else (
+                chat.sender_tl.employee.image.url if chat.sender_tl and chat.sender_tl.employee.image else None
+            )
+        },
+        'receiver': {
+            'id': chat.receiver_employee.id if chat.receiver_employee else chat.receiver_tl.id,
+            'name': chat.get_receiver_name(),
+            'type': 'employee' if chat.receiver_employee else 'tl'
+        },
+        'has_attachment': bool(chat.attachment),
+        'attachment_name': chat.attachment_name,
+        'replies_count': chat.replies_count,
+        'likes_count': chat.likes_count,
+        'is_reply': bool(chat.parent_message_id),
+        'parent_message_id': chat.parent_message_id
+    }
+
+
+def serialize_project_discussion(discussion):
+    """JSON shape used by get_project_discussions and project discussion push events"""
+    if discussion.sender_employee:
+        sender_name = f"{discussion.sender_employee.first_name} {discussion.sender_employee.last_name}"
+        sender_type = 'employee'
+    elif discussion.sender_tl:
+        sender_name = f"TL {discussion.sender_tl.employee.first_name} {discussion.sender_tl.employee.last_name}"
+        sender_type = 'tl'
+    else:
+        sender_name = 'Unknown'
+        sender_type = 'unknown'
+
+    return {
+        'id': discussion.id,
+        'sender_name': sender_name,
+        'sender_type': sender_type,
+        'subject': discussion.subject,
+        'content': discussion.content,
+        'priority': discussion.priority,
+        'priority_display': discussion.get_priority_display(),
+        'message_type': discussion.message_type,
+        'message_type_display': discussion.get_message_type_display(),
+        'created_at': discussion.created_at.isoformat(),
+        'created_at_human': discussion.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'has_attachment': bool(discussion.attachment),
+        'attachment_url': discussion.attachment.url if discussion.attachment else None,
+        'attachment_name': discussion.attachment_name,
+    }
+
+
+def _participant_sides(role, profile_id):
+    sender_field, receiver_field = PARTICIPANT_FIELDS[role]
+    return [
+        TeamChat.objects.filter(**{sender_field: profile_id}),
+        TeamChat.objects.filter(**{receiver_field: profile_id}),
+    ]
+
+
+def head_cursor(role, profile_id):
+    """Sync cursor just past the participant's most recent change"""
+    recent = []
+    for side in _participant_sides(role, profile_id):
+        recent += side.order_by('-updated_at', '-id').values_list('updated_at', 'id')[:SYNC_MAX_SEEN]
+    high_water = max((updated_at for updated_at, _ in recent), default=_EPOCH)
+    return encode_sync_cursor(high_water, {(message_id, _micros(updated_at)) for updated_at, message_id in recent})
+
+
+def chat_changes(role, profile_id, cursor=None, since_id=None, limit=SYNC_DEFAULT_LIMIT):
+    """
+    Messages created, edited or marked read after ``cursor`` for one participant.
+
+    ``since_id`` is accepted instead of a cursor for clients that only track
+    the last message id; it returns messages with a greater id. Returns
+    (messages, next_cursor, has_more).
+    """
+    sides = _participant_sides(role, profile_id)
+
+    if cursor:
+        high_water, seen, floor = decode_sync_cursor(cursor)
+        sides = [side.filter(updated_at__gte=high_water - SYNC_OVERLAP) for side in sides]
+        if floor:
+            floor_at = _EPOCH + timedelta(microseconds=floor[0])
+            sides = [side.filter(Q(updated_at__gt=floor_at) | Q(updated_at=floor_at, id__gt=floor[1])) for side in sides]
+    elif since_id is not None:
+        high_water, seen, floor = _EPOCH, set(), None
+        sides = [side.filter(id__gt=since_id) for side in sides]
+    else:
+        return [], head_cursor(role, profile_id), False
+
+    # Each side is limited separately; merging and re-limiting keeps the keyset order exact.
+    # Already delivered versions in the overlap window are skipped, so fetch that many more.
+    candidates = {}
+    for side in sides:
+        for chat in side.select_related(
+            'sender_employee', 'sender_tl__employee', 'receiver_employee', 'receiver_tl__employee'
+        ).order_by('updated_at', 'id')[:limit + 1 + len(seen)]:
+            if (chat.id, _micros(chat.updated_at)) not in seen:
+                candidates[chat.id] = chat
+
+    ordered = sorted(candidates.values(), key=lambda chat: (chat.updated_at, chat.id))
+    has_more = len(ordered) > limit
+    messages = ordered[:limit]
+
+    if messages:
+        high_water = max(high_water, messages[-1].updated_at)
+        seen |= {(chat.id, _micros(chat.updated_at)) for chat in messages}
+        next_cursor = encode_sync_cursor(high_water, seen, floor)
+    elif cursor:
+        next_cursor = cursor
+    else:
+        next_cursor = head_cursor(role, profile_id)
+    return messages, next_cursor, has_more
+
+
+def chat_unread_count(role, profile_id):
+    """Unread messages addressed to the participant (read from ChatUnreadCounter)"""
+    return ChatUnreadCounter.get_count(role, profile_id)
+
+
+def mark_chat_read(role, profile_id, message_ids):
+    """
+    Mark messages addressed to the participant as read and decrement their
+    unread counter by the rows actually changed. Bumps updated_at so syncing
+    clients see the change.
+    """
+    receiver_field = PARTICIPANT_FIELDS[role][1]
+    now = timezone.now()
+    with transaction.atomic():
+        updated_count = TeamChat.objects.filter(id__in=message_ids, **{receiver_field: profile_id}, is_read=False).update(
+            is_read=True,
+            read_at=now,
+            updated_at=now
+        )
+        if updated_count:
+            ChatUnreadCounter.apply(role, profile_id, -updated_count)
+    return updated_count
+
+
+def record_unread_message(chat):
+    """Count a newly sent message against its receiver's unread counter"""
+    if chat.receiver_employee_id:
+        ChatUnreadCounter.apply('employee', chat.receiver_employee_id, 1)
+    if chat.receiver_tl_id:
+        ChatUnreadCounter.apply('tl', chat.receiver_tl_id, 1)
+
+
+# ============================================================================
+# PUSH NOTIFICATIONS (see app.realtime)
+# ============================================================================
+
+def chat_stream_channels(role, profile_id):
+    """Channels an event stream subscribes to: the user's own plus their projects'"""
+    if role == 'employee':
+        project_ids = ProjectAssignment.objects.filter(team_members__id=profile_id).values_list('id', flat=True)
+    else:
+        project_ids = ProjectAssignment.objects.filter(team_leader_id=profile_id).values_list('id', flat=True)
+    return [user_channel(role, profile_id)] + [project_channel(project_id) for project_id in project_ids]
+
+
+def _chat_participants(chat):
+    """[(role, profile_id, is_receiver)] for both ends of a message"""
+    participants = []
+    if chat.sender_tl_id:
+        participants.append(('tl', chat.sender_tl_id, False))
+    elif chat.sender_employee_id:
+        participants.append(('employee', chat.sender_employee_id, False))
+    if chat.receiver_employee_id:
+        participants.append(('employee', chat.receiver_employee_id, True))
+    if chat.receiver_tl_id:
+        participants.append(('tl', chat.receiver_tl_id, True))
+    return participants
+
+
+def unread_event(role, profile_id):
+    return {'type': 'chat.unread', 'unread_count': chat_unread_count(role, profile_id)}
+
+
+def notify_unread_count(role, profile_id):
+    """Push the participant's current unread count once the transaction commits"""
+    transaction.on_commit(lambda: publish(user_channel(role, profile_id), unread_event(role, profile_id)))
+
+
+def notify_chat_message(chat):
+    """Push a new message to both participants, and the new unread count to the receiver"""
+    def send():
+        event = {'type': 'chat.message', 'message': serialize_chat_message(chat)}
+        for role, profile_id, is_receiver in _chat_participants(chat):
+            publish(user_channel(role, profile_id), event)
+            if is_receiver:
+                publish(user_channel(role, profile_id), unread_event(role, profile_id))
+    transaction.on_commit(send)
+
+
+def notify_project_discussion(discussion):
+    """Push a new project discussion message to everyone subscribed to the project"""
+    def send():
+        publish(project_channel(discussion.project_id), {
+            'type': 'project.discussion',
+            'project_id': discussion.project_id,
+            'discussion': serialize_project_discussion(discussion),
+        })
+    transaction.on_commit(send)
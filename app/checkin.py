@@ -0,0 +1,330 @@
+"""
+Check-in / check-out for the simple employee attendance flow
+
+Each action is a single guarded write on the employee's Attendance row for
+the day: check-in INSERTs it (or, when an older page view already created
+the row, UPDATEs it on ``check_in_time IS NULL``), check-out UPDATEs it on
+``check_out_time IS NULL``. The guards make double clicks and concurrent
+requests safe without locking. Worked hours for an open day are computed when
+read and never written back by a page view.
+
+Rows still open at AUTO_CHECKOUT_TIME are closed in bulk by the
+``auto_checkout`` management command (``close_open_attendance``), not by
+whoever loads the page next.
+"""
+
+from collections import Counter
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, Count, DecimalField, Q, TextField, Value, When
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from .fragments import bump_employees
+from .models import Attendance, AttendanceCheckLog, DailyAttendanceRollup, Employee
+
+
+OFFICIAL_START_TIME = time(10, 45)   # Late arrival after this
+CHECK_IN_OPENS = time(10, 0)
+REQUIRED_WORK_HOURS = 8.0
+HALF_DAY_HOURS = 4.0
+AUTO_CHECKOUT_TIME = time(18, 30)
+
+# Rows shown in "My Attendance Record"
+RECENT_HISTORY_LIMIT = 90
+
+PRESENT_STATUSES = ['present', 'late', 'half_day']
+
+ROW_FIELDS = ['id', 'attendance_date', 'check_in_time', 'check_out_time', 'status', 'total_worked_hours', 'remarks']
+
+
+class CheckResult:
+    """Outcome of a check-in / check-out attempt"""
+
+    def __init__(self, ok, code, message, attendance=None, worked_hours=None):
+        self.ok = ok
+        self.code = code
+        self.message = message
+        self.attendance = attendance
+        self.worked_hours = worked_hours
+
+    def __bool__(self):
+        return self.ok
+
+
+def is_working_day(day):
+    """Monday to Saturday"""
+    return day.weekday() < 6
+
+
+def hours_between(day, start, end):
+    return (datetime.combine(day, end) - datetime.combine(day, start)).total_seconds() / 3600
+
+
+def worked_hours(row, now_time):
+    """Hours worked for an attendance row (dict or instance); open days count up to ``now_time``"""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    check_in = get('check_in_time')
+    if not check_in:
+        return 0.0
+    return max(hours_between(get('attendance_date'), check_in, get('check_out_time') or now_time), 0.0)
+
+
+def checkout_status(hours):
+    if hours >= REQUIRED_WORK_HOURS:
+        return 'present'
+    if hours >= HALF_DAY_HOURS:
+        return 'half_day'
+    return 'early_departure'
+
+
+def auto_checkout_hours(day, check_in_time):
+    """Hours credited by the automatic check-out: a full day to anyone who worked at least a half day"""
+    hours = max(hours_between(day, check_in_time, AUTO_CHECKOUT_TIME), 0.0)
+    return max(hours, REQUIRED_WORK_HOURS) if hours >= HALF_DAY_HOURS else hours
+
+
+def auto_checkout_remark(hours):
+    note = {'present': 'Completed', 'half_day': 'Half day -', 'early_departure': 'Early -'}[checkout_status(hours)]
+    return f" | Auto checkout at 6:30 PM ({note} {hours:.1f}h)"
+
+
+def _log(employee, check_type, now, request_meta=None, **extra):
+    request_meta = request_meta or {}
+    AttendanceCheckLog.objects.create(
+        employee=employee,
+        check_type=check_type,
+        check_time=now,
+        attendance_date=now.date(),
+        ip_address=request_meta.get('REMOTE_ADDR'),
+        user_agent=request_meta.get('HTTP_USER_AGENT'),
+        **extra
+    )
+
+
+def _after_update(employee, day, old_status, new_status):
+    """
+    Do what the Attendance signals would have done for a queryset UPDATE: keep
+    DailyAttendanceRollup in step and make the employee's dashboard widgets stale
+    """
+    bump_employees([employee.id])
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        DailyAttendanceRollup.apply(day, employee.department, old_status, delta=-1)
+    DailyAttendanceRollup.apply(day, employee.department, new_status, delta=1)
+
+
+def check_in(employee, now, request_meta=None):
+    """Check ``employee`` in at ``now`` (an aware local datetime)"""
+    today, current_time = now.date(), now.time().replace(microsecond=0)
+
+    if not is_working_day(today):
+        return CheckResult(False, 'not_working_day', "Check-in not allowed on weekends!")
+    if current_time < CHECK_IN_OPENS:
+        return CheckResult(False, 'too_early', "Check-in is only allowed after 10:00 AM.")
+
+    is_late = current_time > OFFICIAL_START_TIME
+    status = 'half_day' if is_late else 'present'
+    remarks = f"Checked in at {current_time.strftime('%H:%M:%S')}"
+
+    try:
+        # Common case: first action of the day is a single INSERT (rollup updated by the model signal)
+        with transaction.atomic():
+            attendance = Attendance.objects.create(
+                employee=employee,
+                attendance_date=today,
+                check_in_time=current_time,
+                status=status,
+                shift_type='full_time',
+                remarks=remarks,
+                is_check_in_allowed=False,
+                can_check_out=False,
+            )
+    except IntegrityError:
+        # Row already exists (created by the attendance page or HR); claim it only if nobody checked in yet
+        previous_status = Attendance.objects.filter(employee=employee, attendance_date=today).values_list('status', flat=True).first()
+        updated = Attendance.objects.filter(
+            employee=employee, attendance_date=today, check_in_time__isnull=True
+        ).update(
+            check_in_time=current_time,
+            status=status,
+            remarks=remarks,
+            is_check_in_allowed=False,
+            updated_at=now,
+        )
+        if not updated:
+            return CheckResult(False, 'already_checked_in', "You have already checked-in today!")
+        _after_update(employee, today, previous_status, status)
+        attendance = None
+
+    _log(employee, 'check_in', now, request_meta, is_denied=False)
+
+    if is_late:
+        message = "Checked in successfully! You arrived late (after 10:45 AM). Status: Half Day"
+    else:
+        message = f"Checked in successfully at {current_time.strftime('%H:%M:%S')}!"
+    return CheckResult(True, 'late' if is_late else 'checked_in', message, attendance, 0.0)
+
+
+def check_out(employee, now, request_meta=None):
+    """Check ``employee`` out at ``now``; the required hours must have been worked"""
+    today, current_time = now.date(), now.time().replace(microsecond=0)
+
+    row = Attendance.objects.filter(employee=employee, attendance_date=today).values(*ROW_FIELDS).first()
+    if not row or not row['check_in_time']:
+        return CheckResult(False, 'not_checked_in', "You need to check-in first before checking out!")
+    if row['check_out_time']:
+        return CheckResult(False, 'already_checked_out', "You have already checked-out today!")
+
+    hours = worked_hours(row, current_time)
+    if hours < REQUIRED_WORK_HOURS:
+        return CheckResult(
+            False, 'insufficient_hours',
+            f"Cannot check-out yet! You need to complete at least {REQUIRED_WORK_HOURS} hours. Current: {hours:.1f} hours",
+            worked_hours=hours
+        )
+
+    status = checkout_status(hours)
+    suffix = f" | Checked out at {current_time.strftime('%H:%M:%S')} (Completed {hours:.1f}h)"
+
+    updated = Attendance.objects.filter(id=row['id'], check_out_time__isnull=True).update(
+        check_out_time=current_time,
+        total_worked_hours=Decimal(f"{hours:.2f}"),
+        status=status,
+        can_check_out=False,
+        remarks=Concat(Coalesce('remarks', Value('')), Value(suffix)),
+        updated_at=now,
+    )
+    if not updated:
+        return CheckResult(False, 'already_checked_out', "You have already checked-out today!")
+    _after_update(employee, today, row['status'], status)
+
+    _log(
+        employee, 'check_out', now, request_meta,
+        worked_hours_at_check=round(hours, 2), required_work_hours=REQUIRED_WORK_HOURS
+    )
+    return CheckResult(True, 'checked_out', f"Checked out successfully! You worked for {hours:.1f} hours today.", worked_hours=hours)
+
+
+def close_open_attendance(day, batch_size=500):
+    """
+    Automatically check out every row of ``day`` that was checked in but not
+    out, as of AUTO_CHECKOUT_TIME. Returns the number of rows closed; running
+    it again closes nothing.
+
+    Each batch is one UPDATE (per-row hours and status chosen by CASE on
+    check_in_time, which is all they depend on) plus one bulk INSERT of check
+    logs. Rows are locked while the batch is written, so a concurrent manual
+    check-out either lands first and the row is skipped, or waits and finds
+    the row closed.
+    """
+    now = timezone.now()
+    check_out_at = timezone.make_aware(datetime.combine(day, AUTO_CHECKOUT_TIME))
+    open_rows = Attendance.objects.filter(
+        attendance_date=day, check_in_time__isnull=False, check_out_time__isnull=True
+    ).order_by('id')
+
+    closed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                open_rows.filter(id__gt=last_id).select_for_update()
+                .values('id', 'employee_id', 'check_in_time', 'status')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            hours_by_check_in = {row['check_in_time']: auto_checkout_hours(day, row['check_in_time']) for row in rows}
+
+            def by_check_in(value, output_field):
+                return Case(
+                    *[When(check_in_time=check_in, then=Value(value(hours))) for check_in, hours in hours_by_check_in.items()],
+                    output_field=output_field,
+                )
+
+            Attendance.objects.filter(id__in=[row['id'] for row in rows]).update(
+                check_out_time=AUTO_CHECKOUT_TIME,
+                total_worked_hours=by_check_in(lambda hours: Decimal(f"{hours:.2f}"), DecimalField(max_digits=4, decimal_places=2)),
+                status=by_check_in(checkout_status, CharField()),
+                can_check_out=False,
+                remarks=Concat(Coalesce('remarks', Value('')), by_check_in(auto_checkout_remark, TextField()), output_field=TextField()),
+                updated_at=now,
+            )
+
+            departments = dict(
+                Employee.objects.filter(id__in={row['employee_id'] for row in rows}).values_list('id', 'department')
+            )
+            moves = Counter(
+                (departments.get(row['employee_id']), row['status'], checkout_status(hours_by_check_in[row['check_in_time']]))
+                for row in rows
+            )
+            for (department, old_status, new_status), count in moves.items():
+                if old_status == new_status:
+                    continue
+                DailyAttendanceRollup.apply(day, department, old_status, delta=-count)
+                DailyAttendanceRollup.apply(day, department, new_status, delta=count)
+
+            bump_employees([row['employee_id'] for row in rows])
+
+            AttendanceCheckLog.objects.bulk_create([
+                AttendanceCheckLog(
+                    employee_id=row['employee_id'],
+                    check_type='check_out',
+                    check_time=check_out_at,
+                    attendance_date=day,
+                    device_info='auto_checkout',
+                    worked_hours_at_check=round(hours_by_check_in[row['check_in_time']], 2),
+                    required_work_hours=REQUIRED_WORK_HOURS,
+                )
+                for row in rows
+            ])
+            closed += len(rows)
+    return closed
+
+
+# ============================================================================
+# READS
+# ============================================================================
+
+def today_status(employee_id, now):
+    """Today's row plus the derived check-in / check-out state (one indexed read, no writes)"""
+    today, current_time = now.date(), now.time()
+    row = Attendance.objects.filter(employee_id=employee_id, attendance_date=today).values(*ROW_FIELDS).first()
+
+    hours = worked_hours(row, current_time) if row else 0.0
+    checked_in = bool(row and row['check_in_time'])
+    checked_out = bool(row and row['check_out_time'])
+    return {
+        'attendance': row,
+        'is_working_day': is_working_day(today),
+        'can_check_in': is_working_day(today) and current_time >= CHECK_IN_OPENS and not checked_in,
+        'can_check_out': checked_in and not checked_out and hours >= REQUIRED_WORK_HOURS,
+        'checked_in': checked_in,
+        'checked_out': checked_out,
+        'worked_hours': round(hours, 2),
+        'remaining_hours': round(max(REQUIRED_WORK_HOURS - hours, 0), 2) if checked_in and not checked_out else REQUIRED_WORK_HOURS,
+        'is_late_arrival': bool(checked_in and row['check_in_time'] > OFFICIAL_START_TIME),
+    }
+
+
+def recent_attendance(employee_id, limit=RECENT_HISTORY_LIMIT):
+    """The employee's most recent present / late / half-day rows, newest first"""
+    return Attendance.objects.filter(
+        employee_id=employee_id, status__in=PRESENT_STATUSES
+    ).order_by('-attendance_date')[:limit]
+
+
+def attendance_counts(employee_id, month_start):
+    """Present-day totals overall and for the month starting at ``month_start``, in one query"""
+    this_month = Q(attendance_date__gte=month_start)
+    return Attendance.objects.filter(employee_id=employee_id, status__in=PRESENT_STATUSES).aggregate(
+        total_days=Count('id'),
+        month_days=Count('id', filter=this_month),
+        month_present=Count('id', filter=this_month & Q(status='present')),
+        month_half_days=Count('id', filter=this_month & Q(status='half_day')),
+    )
@@ -0,0 +1,219 @@
+"""
+Widgets for the employee and team leader dashboards
+
+Every widget is computed with grouped queries (no per-member or per-leave-type
+loops) and served from the versioned fragment cache in app.fragments, so a
+dashboard reload normally costs a handful of cache reads plus the few queries
+that depend on the clock (today's check-in state).
+"""
+
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+from .fragments import cached_fragment
+from .models import Announcement, Attendance, LeaveApply, LeaveBalanceLedger, LeaveDay
+from .team import TeamSnapshot
+
+
+MAX_LEAVES_PER_MONTH = 10  # Policy: 10 days per month
+
+
+def _month_start(today):
+    return today.replace(day=1)
+
+
+def _next_month_start(today):
+    return (_month_start(today) + timedelta(days=32)).replace(day=1)
+
+
+def working_days_in_month(today):
+    """Monday to Saturday days in the month containing ``today``"""
+    _, num_days = monthrange(today.year, today.month)
+    return sum(1 for day in range(1, num_days + 1) if date(today.year, today.month, day).weekday() < 6)
+
+
+# ============================================================================
+# SHARED
+# ============================================================================
+
+def announcements_widget(today):
+    """The five newest published, unexpired announcements"""
+    def build():
+        return list(
+            Announcement.objects.filter(status='published').filter(
+                Q(expiry_date__isnull=True) | Q(expiry_date__gte=today)
+            ).order_by('-created_at')[:5]
+        )
+    return cached_fragment('announcements', [('announcements', 0)], build, key_parts=[today])
+
+
+# ============================================================================
+# EMPLOYEE DASHBOARD
+# ============================================================================
+
+def employee_attendance_widget(employee_id, today):
+    """This month's present / half days, attendance rate and the last 10 attendance rows"""
+    def build():
+        counts = Attendance.objects.filter(
+            employee_id=employee_id,
+            attendance_date__gte=_month_start(today),
+            attendance_date__lt=_next_month_start(today),
+        ).aggregate(
+            present_days=Count('id', filter=Q(status__in=['present', 'late'])),
+            half_days=Count('id', filter=Q(status='half_day')),
+        )
+        working_days = working_days_in_month(today)
+        present_this_month = counts['present_days'] + counts['half_days']  # Include half days as present
+        return {
+            'present_days': counts['present_days'],
+            'half_days': counts['half_days'],
+            'present_this_month': present_this_month,
+            'working_days_this_month': working_days,
+            'attendance_rate': round((present_this_month / working_days) * 100, 1) if working_days else 0.0,
+            'recent_attendance': list(
+                Attendance.objects.filter(employee_id=employee_id).select_related('approval').order_by('-attendance_date')[:10]
+            ),
+        }
+    return cached_fragment('employee_attendance', [('employee', employee_id)], build, key_parts=[today])
+
+
+def employee_leave_widget(employee_id, today):
+    """Pending count, recent applications and the leave statistics panel"""
+    def build():
+        leaves = LeaveApply.objects.filter(employee_id=employee_id)
+        ledger = LeaveBalanceLedger.objects.filter(employee_id=employee_id)
+        month_start, next_month = _month_start(today), _next_month_start(today)
+        last_30_days = timezone.make_aware(datetime.combine(today - timedelta(days=30), datetime.min.time()))
+
+        # This month's leave days (including leaves that started last month) and the first approved one
+        month_days = LeaveDay.objects.filter(
+            employee_id=employee_id, date__gte=month_start, date__lt=next_month
+        ).aggregate(
+            approved=Sum('weight', filter=Q(status='approved')),
+            pending=Sum('weight', filter=Q(status='pending')),
+            next_leave_date=Min('date', filter=Q(status='approved')),
+        )
+        pending_leaves = ledger.aggregate(pending=Sum('pending_count'))['pending'] or 0
+        recent_activity_count = leaves.filter(applied_at__gte=last_30_days).count()
+
+        # Leave type distribution for the current year, in choice order; only types that were used
+        by_type = {
+            row['leave_type']: row
+            for row in ledger.filter(
+                period__gte=date(today.year, 1, 1), period__lt=date(today.year + 1, 1, 1), approved_count__gt=0
+            ).values('leave_type').annotate(count=Sum('approved_count'), days=Sum('approved_days')).order_by()
+        }
+        leave_type_stats = {
+            display: {'count': by_type[leave_type]['count'], 'days': by_type[leave_type]['days']}
+            for leave_type, display in LeaveApply.LEAVE_TYPE_CHOICES
+            if leave_type in by_type
+        }
+
+        total_leave_days_approved = LeaveDay.as_days(month_days['approved'])
+        pending_leave_days = LeaveDay.as_days(month_days['pending'])
+        leaves_used_this_month = total_leave_days_approved + pending_leave_days
+        return {
+            'pending_leaves': pending_leaves,
+            'recent_leave_applications': list(leaves.order_by('-applied_at')[:5]),
+            'leave_statistics': {
+                'leaves_used_this_month': leaves_used_this_month,
+                'max_leaves_per_month': MAX_LEAVES_PER_MONTH,
+                'remaining_leaves': max(0, MAX_LEAVES_PER_MONTH - leaves_used_this_month),
+                'total_leave_days_approved': total_leave_days_approved,
+                'pending_leave_days': pending_leave_days,
+                'total_approved_days_year': sum(row['days'] or 0 for row in by_type.values()),
+                'leave_type_stats': leave_type_stats,
+                'recent_activity_count': recent_activity_count,
+                'next_leave_date': month_days['next_leave_date'],
+            },
+        }
+    return cached_fragment('employee_leave', [('employee', employee_id)], build, key_parts=[today])
+
+
+# ============================================================================
+# TEAM LEADER DASHBOARD
+# ============================================================================
+
+def team_attendance_widget(tl_id, today):
+    """Team assignments and today's present / absent counts (no record counts as absent)"""
+    def build():
+        snapshot = TeamSnapshot.load(tl_id, today, today, leaves=False)
+        team_assignments = snapshot.assignments
+        present_today = snapshot.present_today
+        absent_today = snapshot.absent_today + snapshot.unmarked_today
+        return {
+            'team_assignments': team_assignments,
+            'total_team_members': len(team_assignments),
+            'present_today': present_today,
+            'absent_today': absent_today,
+        }
+    return cached_fragment('team_attendance', [('team', tl_id)], build, key_parts=[today])
+
+
+def team_leave_widget(tl_id, team_assignments, today):
+    """Pending team leave and the monthly leave statistics panel"""
+    def build():
+        team_employee_ids = [assignment.employee_id for assignment in team_assignments]
+        team_leaves = LeaveApply.objects.filter(employee_id__in=team_employee_ids)
+        month_start = timezone.make_aware(datetime.combine(_month_start(today), datetime.min.time()))
+        monthly_team_leaves = team_leaves.filter(applied_at__gte=month_start)
+
+        team_leave_applications = list(
+            team_leaves.filter(status='pending').select_related('employee').order_by('-applied_at')[:5]
+        )
+
+        totals = monthly_team_leaves.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            approved=Count('id', filter=Q(status='approved')),
+            rejected=Count('id', filter=Q(status='rejected')),
+            approved_days=Sum('total_days', filter=Q(status='approved')),
+        )
+
+        # Team member leave usage this month, one grouped query for the whole team
+        usage = {
+            row['employee_id']: row
+            for row in monthly_team_leaves.values('employee_id').annotate(
+                leaves_used=Count('id'),
+                leave_days=Sum('total_days', filter=Q(status='approved')),
+                pending_leaves=Count('id', filter=Q(status='pending')),
+            ).order_by()
+        }
+        team_member_leave_usage = []
+        for assignment in team_assignments:
+            row = usage.get(assignment.employee_id, {})
+            leaves_used = row.get('leaves_used', 0)
+            team_member_leave_usage.append({
+                'employee': assignment.employee,
+                'leaves_used': leaves_used,
+                'leave_days': row.get('leave_days') or 0,
+                'pending_leaves': row.get('pending_leaves', 0),
+                'has_over_limit': leaves_used > 1  # Monthly limit check
+            })
+
+        type_counts = dict(
+            monthly_team_leaves.values('leave_type').annotate(count=Count('id')).values_list('leave_type', 'count').order_by()
+        )
+
+        return {
+            'team_leave_applications': team_leave_applications,
+            'pending_approvals': len(team_leave_applications),
+            'leave_statistics': {
+                'pending_leaves_month': totals['pending'],
+                'approved_leaves_month': totals['approved'],
+                'rejected_leaves_month': totals['rejected'],
+                'total_leave_days_month': totals['approved_days'] or 0,
+                'team_member_leave_usage': team_member_leave_usage,
+                'team_leave_types': {
+                    display: type_counts.get(leave_type, 0) for leave_type, display in LeaveApply.LEAVE_TYPE_CHOICES
+                },
+                'recent_tl_decisions': list(
+                    team_leaves.filter(tl_approved_by__isnull=False).select_related('employee').order_by('-tl_approval_date')[:5]
+                ),
+                'team_compliance_rate': round((totals['approved'] / totals['total']) * 100, 1) if totals['total'] else 100,
+            },
+        }
+    return cached_fragment('team_leave', [('team', tl_id)], build, key_parts=[today])
@@ -0,0 +1,88 @@
+"""
+Employee directory for the HR employee pages and the directory API
+
+Pages walk employees newest first in (created_at, id) order from an opaque
+cursor, so page N costs the same index range scan as page 1 however deep it
+is. Rows load only DIRECTORY_FIELDS - never passwords, addresses or
+certifications. Search is a prefix match on first name, last name or
+company id, and the department facets for the current search come from one
+grouped query.
+"""
+
+from django.db.models import Count, Q
+
+from .chat import decode_cursor, encode_cursor
+from .models import Employee
+
+
+DIRECTORY_DEFAULT_LIMIT = 50
+DIRECTORY_MAX_LIMIT = 200
+
+# Columns a directory row shows; anything else is loaded on demand (get_employee)
+DIRECTORY_FIELDS = [
+    'id', 'first_name', 'last_name', 'email', 'company_id',
+    'department', 'designation', 'image', 'resigned_date', 'created_at',
+]
+
+STATUS_FILTERS = {
+    'active': Q(resigned_date__isnull=True),
+    'resigned': Q(resigned_date__isnull=False),
+}
+
+
+def directory_queryset(search='', status=None):
+    """Employees matching the search and status filters (no department filter, no ordering)"""
+    employees = Employee.objects.all()
+    search = (search or '').strip()
+    if search:
+        employees = employees.filter(
+            Q(first_name__istartswith=search) |
+            Q(last_name__istartswith=search) |
+            Q(company_id__istartswith=search)
+        )
+    if status in STATUS_FILTERS:
+        employees = employees.filter(STATUS_FILTERS[status])
+    return employees
+
+
+def directory_page(search='', department=None, status=None, cursor=None, limit=DIRECTORY_DEFAULT_LIMIT):
+    """
+    One page of the directory after ``cursor``, newest first. Raises
+    InvalidCursor for a cursor not produced here. Returns
+    (employees, next_cursor, has_more); next_cursor is None on the last page.
+    """
+    employees = directory_queryset(search, status)
+    if department:
+        employees = employees.filter(department=department)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        employees = employees.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+
+    rows = list(employees.only(*DIRECTORY_FIELDS).order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return rows, next_cursor, has_more
+
+
+def department_facets(search='', status=None):
+    """[{'department', 'count'}] for the employees matching the search, in one grouped query"""
+    return list(
+        directory_queryset(search, status).order_by('department').values('department').annotate(count=Count('id'))
+    )
+
+
+def serialize_directory_employee(employee):
+    """JSON shape of one directory row"""
+    return {
+        'id': employee.id,
+        'first_name': employee.first_name,
+        'last_name': employee.last_name,
+        'email': employee.email,
+        'company_id': employee.company_id,
+        'department': employee.department,
+        'designation': employee.designation,
+        'image': employee.image.url if employee.image else '',
+        'status': 'resigned' if employee.resigned_date else 'active',
+        'created_at': employee.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
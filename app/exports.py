@@ -0,0 +1,242 @@
+"""
+Streaming Excel export engine
+
+Rows are pulled from chunked ``.iterator()`` querysets and written to an
+openpyxl write-only worksheet, which spools them to a temporary file instead
+of keeping every cell in memory. Column widths are sized from a sample of the
+first rows, and the finished file is sent back with a StreamingHttpResponse.
+"""
+
+import itertools
+import os
+import tempfile
+from wsgiref.util import FileWrapper
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as XLImage
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from .models import Employee, Payroll
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows fetched per database round trip while exporting
+EXPORT_CHUNK_SIZE = 2000
+
+# Number of leading rows used to size the columns
+WIDTH_SAMPLE_ROWS = 200
+MAX_COLUMN_WIDTH = 60
+
+# Bytes per chunk when streaming the finished file to the client
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class ExcelExport:
+    """
+    Description of one export: sheet title, header row and a row generator.
+
+    ``rows`` is a callable returning an iterable of lists. When ``image_column``
+    is set, the value at that index is an image path (or None); it is embedded
+    as a picture and the cell itself is left blank.
+    """
+
+    def __init__(self, file_prefix, sheet_title, headers, rows, image_column=None):
+        self.file_prefix = file_prefix
+        self.sheet_title = sheet_title
+        self.headers = headers
+        self.rows = rows
+        self.image_column = image_column
+
+    def file_name(self):
+        return f"{self.file_prefix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+def write_xlsx(export, target):
+    """Write ``export`` into ``target`` (a path or binary file object); returns the number of data rows"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(export.sheet_title)
+
+    rows = iter(export.rows())
+    sample = list(itertools.islice(rows, WIDTH_SAMPLE_ROWS))
+
+    # Column widths must be set before the first row in write-only mode
+    for index, width in enumerate(_sample_column_widths(export.headers, sample), start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.freeze_panes = "A2"
+
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_fill = PatternFill(start_color="0b7368", end_color="0b7368", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    header_cells = []
+    for title in export.headers:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    row_count = 0
+    for values in itertools.chain(sample, rows):
+        row_count += 1
+        if export.image_column is not None:
+            values = list(values)
+            image_path = values[export.image_column]
+            values[export.image_column] = ""
+            _add_image(ws, image_path, f"{get_column_letter(export.image_column + 1)}{row_count + 1}")
+        ws.append(values)
+
+    wb.save(target)
+    return row_count
+
+
+def streaming_xlsx_response(export):
+    """Build the workbook in a temporary file and stream it back as an attachment"""
+    spool = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        write_xlsx(export, spool)
+        size = spool.tell()
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+
+    # FileWrapper.close() closes (and so deletes) the temporary file once the response is done
+    response = StreamingHttpResponse(FileWrapper(spool, STREAM_BLOCK_SIZE), content_type=XLSX_CONTENT_TYPE)
+    response["Content-Length"] = str(size)
+    response["Content-Disposition"] = f"attachment; filename={export.file_name()}"
+    return response
+
+
+def _sample_column_widths(headers, sample):
+    widths = [len(str(title)) for title in headers]
+    for values in sample:
+        for index, value in enumerate(values[:len(widths)]):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    return [min(width + 3, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def _add_image(ws, image_path, anchor):
+    if not image_path or not os.path.exists(image_path):
+        return
+    try:
+        img = XLImage(image_path)
+        img.width = 60     # resize image width
+        img.height = 60    # resize image height
+        ws.add_image(img, anchor)
+    except Exception:
+        pass
+
+
+# ============================================================================
+# EXPORT DEFINITIONS
+# ============================================================================
+
+def employee_export():
+    """All employees, one row each, with profile pictures embedded"""
+    headers = [
+        "Employee ID",
+        "First Name",
+        "Last Name",
+        "Email",
+        "Contact Number",
+        "Family Contact",
+        "Family Relation",
+        "Designation",
+        "Department",
+        "Package",
+        "Contract Years",
+        "Certifications",
+        "Address",
+        "Image",
+        "Created At",
+    ]
+
+    def rows():
+        employees = Employee.objects.only(
+            "company_id", "first_name", "last_name", "email", "contact_number",
+            "family_contact_number", "family_relation", "designation", "department",
+            "package", "contract_years", "certifications", "address", "image", "created_at",
+        ).order_by("id")
+
+        for emp in employees.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [
+                emp.company_id.replace("=", ""),
+                emp.first_name,
+                emp.last_name,
+                emp.email.replace("=", ""),
+                emp.contact_number,
+                emp.family_contact_number,
+                emp.family_relation,
+                emp.designation,
+                emp.department,
+                str(emp.package),
+                emp.contract_years,
+                emp.certifications,
+                emp.address,
+                emp.image.path if emp.image else None,
+                emp.created_at.strftime("%Y-%m-%d %H:%M"),
+            ]
+
+    return ExcelExport("Employees", "Employees Data", headers, rows, image_column=headers.index("Image"))
+
+
+def payroll_export():
+    """Every payroll record with the employee details HR needs alongside it"""
+    headers = [
+        "Payroll ID",
+        "Employee ID",
+        "Employee Name",
+        "Email",
+        "Department",
+        "Designation",
+        "Contact Number",
+        "Company Package",
+        "Salary Month",
+        "Base Salary",
+        "PF Deduction",
+        "Final Salary",
+        "Created By",
+        "Created Date",
+        "Processed Date",
+        "Status",
+    ]
+
+    def rows():
+        payrolls = Payroll.objects.select_related("employee").only(
+            "id", "month", "base_salary", "pf_deduction", "final_salary", "created_by",
+            "created_at", "processed_date",
+            "employee__company_id", "employee__first_name", "employee__last_name",
+            "employee__email", "employee__department", "employee__designation",
+            "employee__contact_number", "employee__package",
+        ).order_by("-created_at")
+
+        for payroll in payrolls.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            employee = payroll.employee
+            yield [
+                payroll.id,
+                employee.company_id,
+                f"{employee.first_name} {employee.last_name}",
+                employee.email,
+                employee.department,
+                employee.designation,
+                employee.contact_number or "N/A",
+                float(employee.package),
+                payroll.month,
+                float(payroll.base_salary),
+                float(payroll.pf_deduction),
+                float(payroll.final_salary),
+                payroll.created_by,
+                payroll.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                payroll.processed_date.strftime("%Y-%m-%d %H:%M:%S") if payroll.processed_date else "",
+                "Processed",
+            ]
+
+    return ExcelExport("Complete_Payroll_Records", "Payroll Records", headers, rows)
@@ -0,0 +1,90 @@
+"""
+Versioned fragment cache for the employee and team leader dashboards
+
+Each dashboard widget is built by a function and cached under a key that
+embeds the current "generation" of every scope it reads from: one counter per
+employee, one per team (keyed by team leader id) and one for announcements.
+Model signals bump the counters when Attendance, LeaveApply, Announcement,
+TeamAssignment or Employee rows change (and app.checkin bumps them after its
+queryset updates), so a cached widget is never served after its data changed
+and no TTL has to be guessed. Old generations are never deleted; they simply
+stop being read and age out of the cache.
+
+This needs a cache shared by every worker (REDIS_URL in hrms/settings.py): a
+bump made in one worker's LocMemCache would leave the others serving old
+widgets, so with a process-local backend fragments are built on every request.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import cache_is_shared
+from .models import TeamAssignment
+
+
+# Upper bound only - correctness comes from the generation counters
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _generation_key(scope, scope_id):
+    return f"fragment_generation:{scope}:{scope_id}"
+
+
+def _incr_generation(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); a missing generation is already "new"
+        cache.set(key, 1, None)
+
+
+def bump_generation(scope, scope_id=0):
+    """
+    Make every cached fragment that depends on this scope stale. The bump waits
+    for the current transaction to commit, so a concurrent request cannot
+    rebuild the fragment from pre-commit data under the new generation.
+    """
+    key = _generation_key(scope, scope_id)
+    transaction.on_commit(lambda: _incr_generation(key))
+
+
+def bump_employees(employee_ids):
+    """Bump the employees' own generations and those of the teams they belong to"""
+    employee_ids = set(employee_ids)
+    if not employee_ids:
+        return
+    for employee_id in employee_ids:
+        bump_generation('employee', employee_id)
+    team_leader_ids = set(
+        TeamAssignment.objects.filter(employee_id__in=employee_ids).values_list('team_leader_id', flat=True)
+    )
+    for team_leader_id in team_leader_ids:
+        bump_generation('team', team_leader_id)
+
+
+def cached_fragment(name, scopes, build, key_parts=(), timeout=FRAGMENT_CACHE_TIMEOUT):
+    """
+    Return ``build()`` cached under ``name``.
+
+    ``scopes`` is a list of (scope, scope_id) pairs the fragment reads from;
+    ``key_parts`` adds anything else the result depends on, such as today's date.
+    Not cached at all when the cache is process-local (see module docstring).
+    """
+    if not cache_is_shared():
+        return build()
+
+    generation_keys = [_generation_key(scope, scope_id) for scope, scope_id in scopes]
+    generations = cache.get_many(generation_keys)
+    key = ':'.join(
+        ['fragment', name]
+        + [f"{scope}-{scope_id}-{generations.get(generation_key, 0)}"
+           for (scope, scope_id), generation_key in zip(scopes, generation_keys)]
+        + [str(part) for part in key_parts]
+    )
+
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,221 @@
+"""
+Database-backed background jobs
+
+Views call ``enqueue()`` and return immediately; the ``run_jobs`` management
+command claims queued rows and executes them in a process pool. Handlers are
+registered per job type and return a small JSON-serialisable summary; export
+handlers also write their file under PRIVATE_MEDIA_ROOT/job_results/, which is
+only served through the HR-checked download_job_result view.
+"""
+
+import os
+import secrets
+import socket
+import traceback
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundJob, Employee
+from .exports import write_xlsx, employee_export, payroll_export
+from .payroll import calculate_month_payroll, MONTH_NAMES
+
+
+JOB_RESULTS_DIR = 'job_results'
+
+JOB_HANDLERS = {}
+
+# job_type -> function validating and normalising params at enqueue time
+JOB_PARAM_CLEANERS = {}
+
+
+def job_handler(job_type, clean=None):
+    """Register a function as the handler for ``job_type`` (``clean`` validates its params)"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        if clean is not None:
+            JOB_PARAM_CLEANERS[job_type] = clean
+        return func
+    return decorator
+
+
+def enqueue(job_type, params=None, requested_by='', requested_by_hr=None):
+    """
+    Queue a job and return it; the web request only pays for this INSERT.
+    Raises ValueError for an unknown job type or invalid params, so a bad
+    request fails here instead of inside the worker.
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    params = params or {}
+    if not isinstance(params, dict):
+        raise ValueError("Job params must be an object")
+    if job_type in JOB_PARAM_CLEANERS:
+        params = JOB_PARAM_CLEANERS[job_type](params)
+    return BackgroundJob.objects.create(
+        job_type=job_type,
+        params=params,
+        requested_by=requested_by,
+        requested_by_hr=requested_by_hr,
+    )
+
+
+def worker_name():
+    """Identifies one run_jobs process in BackgroundJob.claimed_by"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(worker=''):
+    """
+    Atomically move the oldest queued job to 'running', owned by ``worker``,
+    and return it (or None).
+
+    The conditional UPDATE means two workers racing for the same row cannot
+    both win, without relying on SELECT ... FOR UPDATE SKIP LOCKED support.
+    """
+    candidates = BackgroundJob.objects.filter(status='queued').order_by('created_at', 'id').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            started_at=now,
+            claimed_by=worker,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job_id):
+    """Execute one claimed job and record its outcome; safe to call from a worker process"""
+    job = BackgroundJob.objects.get(id=job_id)
+    handler = JOB_HANDLERS.get(job.job_type)
+
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job type: {job.job_type}")
+        job.result = handler(job) or {}
+        job.status = 'completed'
+        job.error = None
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'result_file', 'error', 'finished_at'])
+    return job.status
+
+
+def mark_failed(job_id, error):
+    """Record a failure that happened outside the handler (e.g. a crashed worker process)"""
+    BackgroundJob.objects.filter(id=job_id).update(
+        status='failed',
+        error=error,
+        finished_at=timezone.now(),
+    )
+
+
+def heartbeat(worker, job_ids):
+    """Mark ``worker``'s running jobs as still alive"""
+    if not job_ids:
+        return 0
+    return BackgroundJob.objects.filter(id__in=job_ids, status='running', claimed_by=worker).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Put 'running' jobs whose owner stopped sending heartbeats before
+    ``older_than`` back in the queue; returns the count. Jobs another live
+    run_jobs process is still executing keep fresh heartbeats and are left
+    alone, however long they have been running.
+    """
+    return BackgroundJob.objects.filter(
+        Q(heartbeat_at__lt=older_than) | Q(heartbeat_at__isnull=True, started_at__lt=older_than),
+        status='running',
+    ).update(
+        status='queued',
+        started_at=None,
+        claimed_by='',
+        heartbeat_at=None,
+    )
+
+
+def _write_export_result(job, export):
+    """
+    Write an export under PRIVATE_MEDIA_ROOT/job_results/ and attach it to the
+    job. The file on disk gets a random name; ``file_name`` in the result is
+    the name the download is offered under.
+    """
+    file_name = f"{os.path.splitext(export.file_name())[0]}_job{job.id}.xlsx"
+    relative_path = os.path.join(JOB_RESULTS_DIR, f"{secrets.token_hex(16)}.xlsx")
+    full_path = job.result_file.storage.path(relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    row_count = write_xlsx(export, full_path)
+    job.result_file.name = relative_path
+    return {'rows': row_count, 'file_name': file_name}
+
+
+# ============================================================================
+# JOB HANDLERS
+# ============================================================================
+
+@job_handler('export_employees')
+def export_employees_job(job):
+    return _write_export_result(job, employee_export())
+
+
+@job_handler('export_payroll')
+def export_payroll_job(job):
+    return _write_export_result(job, payroll_export())
+
+
+def clean_payroll_params(params):
+    """Validate payroll_calculation params: a month name, an integer year and optional integer employee ids"""
+    month = params.get('month')
+    if month not in MONTH_NAMES:
+        raise ValueError(f"Invalid month: {month!r}")
+    try:
+        year = int(params.get('year'))
+        employee_ids = [int(employee_id) for employee_id in params.get('employee_ids') or []]
+        allowances = float(params.get('allowances') or 0)
+        overtime_amount = float(params.get('overtime_amount') or 0)
+    except (TypeError, ValueError):
+        raise ValueError("year and employee_ids must be integers, allowances and overtime_amount numbers")
+    if not 1900 <= year <= 9999:
+        raise ValueError(f"Invalid year: {year}")
+
+    cleaned = {'month': month, 'year': year}
+    if employee_ids:
+        cleaned['employee_ids'] = employee_ids
+    # Allowance and overtime are one employee's amounts; batch runs keep each employee's own
+    if len(employee_ids) == 1:
+        cleaned.update(allowances=allowances, overtime_amount=overtime_amount)
+    return cleaned
+
+
+@job_handler('payroll_calculation', clean=clean_payroll_params)
+def payroll_calculation_job(job):
+    """
+    Calculate payroll for a month. Params: ``month`` (e.g. "January"), ``year``,
+    optional ``employee_ids`` (defaults to every active employee), ``allowances``
+    and ``overtime_amount`` (single-employee runs only).
+    """
+    params = job.params
+
+    employees = Employee.objects.filter(resigned_date__isnull=True)
+    if params.get('employee_ids'):
+        employees = employees.filter(id__in=params['employee_ids'])
+
+    summary = calculate_month_payroll(
+        params['month'], int(params['year']), job.requested_by,
+        employees=employees,
+        allowances=params.get('allowances'),
+        overtime_amount=params.get('overtime_amount'),
+    )
+    summary.pop('payrolls')
+    return summary
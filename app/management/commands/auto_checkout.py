@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app.checkin import AUTO_CHECKOUT_TIME, close_open_attendance
+
+
+class Command(BaseCommand):
+    help = 'Automatically check out every attendance row still open at 6:30 PM (safe to run repeatedly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Attendance date to close (YYYY-MM-DD). Defaults to today.'
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=0,
+            help='Also close rows left open on this many days before --date (catches up missed runs)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows closed per UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.localtime()
+        day = self.parse_date(options.get('date'), '--date') or now.date()
+        if options['days_back'] < 0:
+            raise CommandError('--days-back must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        days = [day - timedelta(days=offset) for offset in range(options['days_back'], -1, -1)]
+        if days[-1] > now.date() or (days[-1] == now.date() and now.time() < AUTO_CHECKOUT_TIME):
+            # Today's rows stay open until the auto check-out time
+            self.stdout.write(self.style.WARNING(
+                f'INFO: Rows for {days[-1]} stay open until {AUTO_CHECKOUT_TIME.strftime("%H:%M")}; skipping that day'
+            ))
+            days = [d for d in days if d < now.date()]
+
+        started = time.monotonic()
+        total_closed = 0
+        for attendance_date in days:
+            closed = close_open_attendance(attendance_date, batch_size=options['batch_size'])
+            total_closed += closed
+            if closed:
+                self.stdout.write(f'{attendance_date}: closed {closed} open rows')
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'SUCCESS: Auto checked out {total_closed} attendance rows in {elapsed:.2f}s')
+        )
+
+    def parse_date(self, value, option_name):
+        """Parse a YYYY-MM-DD option value"""
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{option_name} must be in YYYY-MM-DD format')
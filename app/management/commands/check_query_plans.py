@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from app.query_plans import HOT_QUERIES, check_hot_queries
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the registered hot queries and fail if any of them reads a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries',
+            nargs='*',
+            help=f'Query names to check (default: all). Registered: {", ".join(HOT_QUERIES)}'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to EXPLAIN against'
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print the full plan for every query'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['queries']) - set(HOT_QUERIES)
+        if unknown:
+            raise CommandError(f'Unknown queries: {", ".join(sorted(unknown))}')
+
+        started = time.monotonic()
+        # Session settings made for the check (PostgreSQL enable_seqscan) end with the transaction
+        with transaction.atomic(using=options['database']):
+            results = check_hot_queries(options['queries'], using=options['database'])
+        elapsed = time.monotonic() - started
+
+        regressions = []
+        for name, plan, scans in results:
+            if scans:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN: {name} reads all of {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'OK: {name}')
+            if options['show_plans'] or scans:
+                self.stdout.write(f'{plan}\n')
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} of {len(results)} hot queries regressed to a full scan')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'SUCCESS: {len(results)} hot queries use an index ({elapsed:.2f}s)')
+        )
@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.notifications import Dispatcher, purge_finished, requeue_stale
+
+
+# Seconds between purges of old sent and failed rows while polling
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails from the outbox over one reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Notifications claimed and sent per batch (default 50)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the outbox is empty'
+        )
+        parser.add_argument(
+            '--idle-disconnect',
+            type=float,
+            default=60.0,
+            help='Close the SMTP connection after this many idle seconds'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox once and exit instead of polling forever (useful from cron)'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=15,
+            help='Requeue notifications that have been sending longer than this on startup'
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=30,
+            help='Delete sent and failed notifications older than this many days (default 30)'
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = requeue_stale(stale_before)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale notifications'))
+
+        self.stdout.write('Starting notification dispatcher...')
+        dispatcher = Dispatcher(batch_size=max(1, options['batch_size']))
+        last_activity = time.monotonic()
+        last_purge = None
+
+        try:
+            while True:
+                if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL:
+                    self._purge(options['retention_days'])
+                    last_purge = time.monotonic()
+
+                sent, failed = dispatcher.dispatch_batch()
+                if sent or failed:
+                    last_activity = time.monotonic()
+                    self.stdout.write(f'INFO: Sent {sent}, failed {failed}')
+                    continue
+
+                if options['once']:
+                    break
+                # Do not hold an idle SMTP session open forever; the server would drop it anyway
+                if time.monotonic() - last_activity > options['idle_disconnect']:
+                    dispatcher.close()
+                time.sleep(options['poll_interval'])
+        finally:
+            dispatcher.close()
+
+        self.stdout.write(self.style.SUCCESS('SUCCESS: Notification dispatcher stopped: outbox drained.'))
+
+    def _purge(self, retention_days):
+        purged = purge_finished(timezone.now() - timedelta(days=retention_days))
+        if purged:
+            self.stdout.write(f'INFO: Purged {purged} finished notifications older than {retention_days} days')
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app.models import Employee
+from app.payroll import MONTH_NAMES
+from app.summaries import generate_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = 'Generate MonthlyAttendanceSummary rows for all active employees (or one employee)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            help='Month name, e.g. "January". Defaults to the current month.'
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Year, e.g. 2025. Defaults to the current year.'
+        )
+        parser.add_argument(
+            '--employee',
+            type=int,
+            help='Only generate the summary for this employee ID'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        month = (options.get('month') or MONTH_NAMES[today.month - 1]).capitalize()
+        year = options.get('year') or today.year
+
+        if month not in MONTH_NAMES:
+            raise CommandError(f'--month must be one of: {", ".join(MONTH_NAMES)}')
+
+        employees = None
+        if options.get('employee'):
+            employees = Employee.objects.filter(id=options['employee'])
+            if not employees.exists():
+                raise CommandError(f'Employee {options["employee"]} not found')
+
+        self.stdout.write(f'Generating monthly attendance summaries for {month} {year}...')
+        result = generate_monthly_summaries(month, year, employees=employees)
+
+        if result['skipped_finalized']:
+            self.stdout.write(f'INFO: Skipped {result["skipped_finalized"]} finalized summaries')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'SUCCESS: Generated {result["generated"]} summaries in {result["elapsed_seconds"]:.2f}s'
+            )
+        )
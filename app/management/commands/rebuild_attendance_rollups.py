@@ -0,0 +1,47 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from app.models import DailyAttendanceRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DailyAttendanceRollup rows from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='First attendance date to rebuild (YYYY-MM-DD). Defaults to the earliest record.'
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Last attendance date to rebuild (YYYY-MM-DD). Defaults to the latest record.'
+        )
+
+    def handle(self, *args, **options):
+        start_date = self.parse_date(options.get('start_date'), '--start-date')
+        end_date = self.parse_date(options.get('end_date'), '--end-date')
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must be on or before --end-date')
+
+        scope = f"{start_date or 'beginning'} to {end_date or 'latest'}"
+        self.stdout.write(f'Rebuilding attendance rollups ({scope})...')
+
+        started = time.monotonic()
+        rows_written = DailyAttendanceRollup.rebuild(start_date=start_date, end_date=end_date)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'SUCCESS: Wrote {rows_written} rollup rows in {elapsed:.2f}s')
+        )
+
+    def parse_date(self, value, option_name):
+        """Parse a YYYY-MM-DD option value"""
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{option_name} must be in YYYY-MM-DD format')
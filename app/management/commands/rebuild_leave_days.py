@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from app.models import LeaveDay
+
+
+class Command(BaseCommand):
+    help = 'Rebuild LeaveDay rows by expanding every pending and approved LeaveApply'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            dest='employees',
+            help='Only rebuild this employee id (repeatable). Defaults to every employee.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT'
+        )
+
+    def handle(self, *args, **options):
+        employees = options['employees']
+        scope = f"{len(employees)} employees" if employees else 'all employees'
+        self.stdout.write(f'Rebuilding leave days ({scope})...')
+
+        started = time.monotonic()
+        rows_written = LeaveDay.rebuild(employee_ids=employees, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'SUCCESS: Wrote {rows_written} leave day rows in {elapsed:.2f}s')
+        )
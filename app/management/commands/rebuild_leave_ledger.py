@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from app.models import LeaveBalanceLedger
+
+
+class Command(BaseCommand):
+    help = 'Verify LeaveBalanceLedger rows against LeaveApply and repair the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            dest='employees',
+            help='Only check this employee id (repeatable). Defaults to every employee.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted ledger rows without changing them'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        employees = options['employees']
+        scope = f"{len(employees)} employees" if employees else 'all employees'
+        self.stdout.write(f'Checking leave balance ledger ({scope})...')
+
+        started = time.monotonic()
+        checked, drifted = LeaveBalanceLedger.reconcile(employee_ids=employees, dry_run=dry_run)
+        elapsed = time.monotonic() - started
+
+        for employee_id, period, leave_type in drifted[:20]:
+            self.stdout.write(f'  drifted: employee {employee_id}, {period:%Y-%m}, {leave_type}')
+        if len(drifted) > 20:
+            self.stdout.write(f'  ... and {len(drifted) - 20} more')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f'SUCCESS: All {checked} ledger rows match ({elapsed:.2f}s)'))
+        elif dry_run:
+            self.stdout.write(f'INFO: {len(drifted)} of {checked} ledger rows drifted; run without --dry-run to repair')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'SUCCESS: Repaired {len(drifted)} of {checked} ledger rows in {elapsed:.2f}s')
+            )
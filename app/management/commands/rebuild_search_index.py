@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from app.models import TeamChat, ProjectDiscussion
+from app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the chat / project discussion search index (SearchToken rows)'
+
+    MODELS = {
+        'chat': TeamChat,
+        'discussions': ProjectDiscussion,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=sorted(self.MODELS),
+            help='Rebuild only team chat or only project discussions. Defaults to both.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows read and index entries written per batch (default 500)'
+        )
+
+    def handle(self, *args, **options):
+        names = [options['only']] if options.get('only') else sorted(self.MODELS)
+        for name in names:
+            self.stdout.write(f'Indexing {name}...')
+            started = time.monotonic()
+            model = self.MODELS[name]
+            indexed = rebuild_index(model, batch_size=options['batch_size'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                self.style.SUCCESS(f'SUCCESS: Indexed {indexed} {model._meta.verbose_name_plural} in {elapsed:.2f}s')
+            )
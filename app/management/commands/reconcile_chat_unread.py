@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from app.models import ChatUnreadCounter
+
+
+class Command(BaseCommand):
+    help = 'Repair ChatUnreadCounter rows that drifted from the unread TeamChat messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counters without changing them'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write('Checking chat unread counters...')
+
+        started = time.monotonic()
+        checked, drifted = ChatUnreadCounter.reconcile(dry_run=dry_run)
+        elapsed = time.monotonic() - started
+
+        for recipient in drifted[:20]:
+            self.stdout.write(f'  drifted: {recipient}')
+        if len(drifted) > 20:
+            self.stdout.write(f'  ... and {len(drifted) - 20} more')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f'SUCCESS: All {checked} counters match ({elapsed:.2f}s)'))
+        elif dry_run:
+            self.stdout.write(f'INFO: {len(drifted)} of {checked} counters drifted; run without --dry-run to repair')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'SUCCESS: Repaired {len(drifted)} of {checked} counters in {elapsed:.2f}s')
+            )
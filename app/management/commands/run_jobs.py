@@ -0,0 +1,112 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from app.jobs import claim_next_job, run_job, mark_failed, requeue_stale_jobs, heartbeat, worker_name
+
+# Seconds between heartbeats for this process's running jobs (and stale job checks)
+HEARTBEAT_INTERVAL = 30
+
+
+def _init_worker():
+    """Pool initializer: make Django usable in the child and drop inherited DB connections"""
+    django.setup()
+    connections.close_all()
+
+
+def _run_in_worker(job_id):
+    try:
+        return run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (exports, payroll runs) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: number of CPUs on this host)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling forever (useful from cron)'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=5,
+            help='Requeue running jobs whose worker has not sent a heartbeat for this long'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        stale_after = timedelta(minutes=options['stale_minutes'])
+        worker = worker_name()
+        self._requeue_stale(stale_after)
+
+        self.stdout.write(f'Starting job worker {worker} with {workers} processes...')
+
+        # Connections must not be shared with forked children
+        connections.close_all()
+
+        in_flight = {}
+        last_heartbeat = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            while True:
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                    heartbeat(worker, list(in_flight.values()))
+                    self._requeue_stale(stale_after)
+                    last_heartbeat = time.monotonic()
+
+                # Fill free worker slots with newly claimed jobs
+                while len(in_flight) < workers:
+                    job = claim_next_job(worker)
+                    if job is None:
+                        break
+                    self.stdout.write(f'INFO: Running job #{job.id} ({job.job_type})')
+                    in_flight[pool.submit(_run_in_worker, job.id)] = job.id
+
+                if not in_flight:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        mark_failed(job_id, f'Worker process error: {e}')
+                        status = 'failed'
+
+                    style = self.style.SUCCESS if status == 'completed' else self.style.ERROR
+                    self.stdout.write(style(f'Job #{job_id} {status}'))
+
+        self.stdout.write(self.style.SUCCESS('Job worker stopped: queue drained.'))
+
+    def _requeue_stale(self, stale_after):
+        requeued = requeue_stale_jobs(timezone.now() - stale_after)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale running jobs'))
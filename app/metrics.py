@@ -0,0 +1,315 @@
+"""
+In-process metrics registry with Prometheus text exposition
+
+Each process keeps counters and histograms in memory and periodically writes
+a JSON snapshot to ``METRICS_DIR`` (``/dev/shm/hrms_metrics`` by default, the
+same tmpfs gunicorn uses as worker_tmp_dir). The ``/metrics`` view merges the
+snapshots of every worker, plus an archive of workers that have exited, so a
+single scrape covers the whole gunicorn pool.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run a single process anyway
+    fcntl = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Seconds between snapshot writes for one process
+FLUSH_INTERVAL = 2.0
+
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+METRIC_HELP = {
+    'hrms_http_requests_total': ('counter', 'HTTP requests by view, method and status'),
+    'hrms_http_request_duration_seconds': ('histogram', 'Request latency by view'),
+    'hrms_db_queries_per_request': ('histogram', 'SQL statements per request by view'),
+    'hrms_db_query_seconds_per_request': ('histogram', 'Time spent in SQL per request by view'),
+    'hrms_template_render_seconds': ('histogram', 'Template render time by template'),
+    'hrms_cache_requests_total': ('counter', 'Cache lookups by cache backend and result'),
+}
+
+
+def metrics_dir():
+    default = '/dev/shm/hrms_metrics' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'hrms_metrics')
+    try:
+        configured = getattr(settings, 'METRICS_DIR', None)
+    except ImproperlyConfigured:
+        # gunicorn hooks may run before DJANGO_SETTINGS_MODULE is set
+        configured = None
+    return configured or default
+
+
+def _label_key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+class MetricsRegistry:
+    """Counters and fixed-bucket histograms for the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def _check_fork(self):
+        # preload_app forks workers from the master; each one starts from zero
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._check_fork()
+            key = _label_key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            self._check_fork()
+            key = _label_key(name, labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            index = bisect_left(histogram['buckets'], value)
+            if index < len(histogram['counts']):
+                histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {
+                'counters': dict(self.counters),
+                'histograms': {key: dict(value, counts=list(value['counts'])) for key, value in self.histograms.items()},
+            }
+
+    def flush(self, force=False):
+        """Write this process's snapshot to METRICS_DIR (at most every FLUSH_INTERVAL seconds)"""
+        now = time.monotonic()
+        if not force and now - self.last_flush < FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'worker_{os.getpid()}.json')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry()
+
+
+# ============================================================================
+# AGGREGATION ACROSS WORKERS
+# ============================================================================
+
+@contextmanager
+def _dir_lock(directory, exclusive):
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(target, snapshot):
+    for key, value in snapshot.get('counters', {}).items():
+        target['counters'][key] = target['counters'].get(key, 0) + value
+    for key, value in snapshot.get('histograms', {}).items():
+        existing = target['histograms'].get(key)
+        if existing is None or existing['buckets'] != value['buckets']:
+            target['histograms'][key] = dict(value, counts=list(value['counts']))
+            continue
+        existing['counts'] = [a + b for a, b in zip(existing['counts'], value['counts'])]
+        existing['sum'] += value['sum']
+        existing['count'] += value['count']
+    return target
+
+
+def collect():
+    """Merge the archive and every live worker snapshot into one snapshot"""
+    registry.flush(force=True)
+    directory = metrics_dir()
+    merged = {'counters': {}, 'histograms': {}}
+    with _dir_lock(directory, exclusive=False):
+        for path in [os.path.join(directory, ARCHIVE_FILE)] + sorted(glob.glob(os.path.join(directory, 'worker_*.json'))):
+            snapshot = _read_json(path)
+            if snapshot:
+                _merge(merged, snapshot)
+    return merged
+
+
+def archive_worker(pid):
+    """Fold an exited worker's snapshot into the archive (called from gunicorn's child_exit hook)"""
+    directory = metrics_dir()
+    path = os.path.join(directory, f'worker_{pid}.json')
+    if not os.path.exists(path):
+        return
+    with _dir_lock(directory, exclusive=True):
+        snapshot = _read_json(path)
+        if snapshot:
+            archive_path = os.path.join(directory, ARCHIVE_FILE)
+            archive = _merge(_read_json(archive_path) or {'counters': {}, 'histograms': {}}, snapshot)
+            with open(archive_path + '.tmp', 'w') as handle:
+                json.dump(archive, handle)
+            os.replace(archive_path + '.tmp', archive_path)
+        os.unlink(path)
+
+
+def reset_metrics_dir():
+    """Remove snapshots left over from a previous server run (called when gunicorn starts)"""
+    for path in glob.glob(os.path.join(metrics_dir(), '*.json')):
+        os.unlink(path)
+
+
+# ============================================================================
+# PROMETHEUS TEXT FORMAT
+# ============================================================================
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot):
+    """Render a merged snapshot in the Prometheus text exposition format (version 0.0.4)"""
+    series = {}
+    for key, value in snapshot['counters'].items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append(('counter', labels, value))
+    for key, value in snapshot['histograms'].items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append(('histogram', labels, value))
+
+    lines = []
+    for name in sorted(series):
+        metric_type, help_text = METRIC_HELP.get(name, (series[name][0][0], name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for kind, labels, value in sorted(series[name], key=lambda item: item[1]):
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(value['buckets'], value['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels + [["le", bound]])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels + [["le", "+Inf"]])} {value["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value["sum"])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+
+    # Derived gauge so dashboards do not need to compute the ratio themselves
+    lookups = {}
+    for key, value in snapshot['counters'].items():
+        name, labels = json.loads(key)
+        if name == 'hrms_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['backend'], (0, 0))
+            lookups[labels['backend']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    if lookups:
+        lines.append('# HELP hrms_cache_hit_ratio Cache hits divided by lookups since start')
+        lines.append('# TYPE hrms_cache_hit_ratio gauge')
+        for backend, (hits, total) in sorted(lookups.items()):
+            lines.append(f'hrms_cache_hit_ratio{_format_labels([["backend", backend]])} {_format_value(hits / total if total else 0.0)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# INSTRUMENTATION HOOKS
+# ============================================================================
+
+_installed = False
+_MISSING = object()
+
+
+def install_instrumentation():
+    """Time Django template rendering and count cache hits/misses (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from django.core.cache import caches
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            registry.observe(
+                'hrms_template_render_seconds',
+                {'template': self.origin.template_name or 'unknown'},
+                time.perf_counter() - started
+            )
+
+    Template.render = timed_render
+
+    patched_classes = set()
+    for alias in settings.CACHES:
+        cache_class = type(caches[alias])
+        if cache_class in patched_classes:
+            continue
+        patched_classes.add(cache_class)
+        _instrument_cache_class(cache_class)
+
+
+def _instrument_cache_class(cache_class):
+    original_get = cache_class.get
+
+    def counted_get(self, key, default=None, version=None):
+        value = original_get(self, key, _MISSING, version=version)
+        result = 'miss' if value is _MISSING else 'hit'
+        registry.inc('hrms_cache_requests_total', {'backend': cache_class.__name__, 'result': result})
+        return default if value is _MISSING else value
+
+    cache_class.get = counted_get
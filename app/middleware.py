@@ -0,0 +1,109 @@
+"""
+Project middleware
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from .principal import get_principal
+from .metrics import registry, install_instrumentation, QUERY_COUNT_BUCKETS
+from .query_budget import QueryRecorder, DEFAULT_MAX_QUERIES, DEFAULT_MAX_REPEATS
+
+
+logger = logging.getLogger('app.query_budget')
+
+
+class QueryBudgetMiddleware:
+    """
+    Query Budget Middleware - opt-in N+1 detector.
+
+    Records every SQL statement of a request, logs a warning (with the view
+    name and the most repeated query shapes) when the request goes over
+    QUERY_BUDGET_MAX_QUERIES or repeats one shape more than
+    QUERY_BUDGET_MAX_REPEATS times, and adds X-Query-* headers when DEBUG is on.
+    Enabled with QUERY_BUDGET_ENABLED = True.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'QUERY_BUDGET_MAX_QUERIES', DEFAULT_MAX_QUERIES)
+        self.max_repeats = getattr(settings, 'QUERY_BUDGET_MAX_REPEATS', DEFAULT_MAX_REPEATS)
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        problems = recorder.violations(self.max_queries, self.max_repeats)
+        if problems:
+            match = getattr(request, 'resolver_match', None)
+            view_name = (match.view_name or match._func_path) if match else request.path
+            logger.warning(
+                "Query budget exceeded in %s (%s %s): %s queries in %.1fms\n  %s",
+                view_name, request.method, request.path,
+                recorder.count, recorder.total_time * 1000,
+                "\n  ".join(problems)
+            )
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f"{recorder.total_time * 1000:.1f}"
+            response['X-Query-Max-Repeat'] = str(max(recorder.shapes().values(), default=0))
+            response['X-Query-Budget'] = 'exceeded' if problems else 'ok'
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Metrics Middleware - per-view latency, status and SQL instrumentation.
+
+    Feeds the process metrics registry served by the /metrics endpoint and
+    installs template render timing and cache hit counting on first use.
+    Disabled with METRICS_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_instrumentation()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        # Unresolved paths share one label so 404 scans cannot blow up cardinality
+        view_name = (match.view_name or match._func_path) if match else 'unresolved'
+
+        registry.inc('hrms_http_requests_total', {'view': view_name, 'method': request.method, 'status': str(response.status_code)})
+        registry.observe('hrms_http_request_duration_seconds', {'view': view_name}, elapsed)
+        registry.observe('hrms_db_queries_per_request', {'view': view_name}, recorder.count, buckets=QUERY_COUNT_BUCKETS)
+        registry.observe('hrms_db_query_seconds_per_request', {'view': view_name}, recorder.total_time)
+        registry.flush()
+
+        return response
+
+
+class PrincipalMiddleware:
+    """
+    Principal Middleware - attaches request.principal (see app.principal).
+
+    Resolved lazily, so requests that never look at it cost nothing. Must come
+    after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request))
+        return self.get_response(request)
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 02:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rollups(apps, schema_editor):
+    Attendance = apps.get_model('app', 'Attendance')
+    DailyAttendanceRollup = apps.get_model('app', 'DailyAttendanceRollup')
+
+    grouped = Attendance.objects.order_by().values(
+        'attendance_date', 'employee__department'
+    ).annotate(
+        total_count=Count('id'),
+        present_count=Count('id', filter=Q(status='present')),
+        absent_count=Count('id', filter=Q(status='absent')),
+        half_day_count=Count('id', filter=Q(status='half_day')),
+        late_count=Count('id', filter=Q(status='late')),
+    )
+    DailyAttendanceRollup.objects.bulk_create([
+        DailyAttendanceRollup(
+            date=row['attendance_date'],
+            department=row['employee__department'] or '',
+            total_count=row['total_count'],
+            present_count=row['present_count'],
+            absent_count=row['absent_count'],
+            half_day_count=row['half_day_count'],
+            late_count=row['late_count'],
+        )
+        for row in grouped
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0032_teamchatsettings_teamchat_presentrecord_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(max_length=150)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('half_day_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'department'],
+                'unique_together': {('date', 'department')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 02:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_dailyattendancerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('export_employees', 'Export Employees'), ('export_payroll', 'Export Payroll'), ('payroll_calculation', 'Payroll Calculation')], max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('requested_by', models.CharField(max_length=200)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('result_file', models.FileField(blank=True, null=True, upload_to='job_results/')),
+                ('error', models.TextField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by_hr', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to='app.hrprofile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='app_backgro_status_262aaf_idx'), models.Index(fields=['requested_by_hr', 'created_at'], name='app_backgro_request_f15a22_idx')],
+            },
+        ),
+    ]
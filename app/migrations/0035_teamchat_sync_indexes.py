@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0034_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teamchat',
+            index=models.Index(fields=['sender_employee', 'updated_at', 'id'], name='teamchat_sender_emp_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamchat',
+            index=models.Index(fields=['sender_tl', 'updated_at', 'id'], name='teamchat_sender_tl_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamchat',
+            index=models.Index(fields=['receiver_employee', 'updated_at', 'id'], name='teamchat_recv_emp_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamchat',
+            index=models.Index(fields=['receiver_tl', 'updated_at', 'id'], name='teamchat_recv_tl_sync_idx'),
+        ),
+    ]
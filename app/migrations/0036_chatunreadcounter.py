@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 02:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_unread_counters(apps, schema_editor):
+    TeamChat = apps.get_model('app', 'TeamChat')
+    ChatUnreadCounter = apps.get_model('app', 'ChatUnreadCounter')
+    counters = []
+    for role, field in (('employee', 'receiver_employee_id'), ('tl', 'receiver_tl_id')):
+        grouped = TeamChat.objects.filter(is_read=False, **{f'{field}__isnull': False}).order_by().values(field).annotate(unread=Count('id'))
+        counters.extend(ChatUnreadCounter(recipient=f"{role}:{row[field]}", unread_count=row['unread']) for row in grouped)
+    ChatUnreadCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0035_teamchat_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUnreadCounter',
+            fields=[
+                ('recipient', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_unread_counters, migrations.RunPython.noop),
+    ]
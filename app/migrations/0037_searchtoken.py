@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0036_chatunreadcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('discussion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='app.projectdiscussion')),
+                ('team_chat', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='app.teamchat')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'team_chat'], name='searchtoken_term_chat_idx'), models.Index(fields=['term', 'discussion'], name='searchtoken_term_disc_idx')],
+            },
+        ),
+    ]
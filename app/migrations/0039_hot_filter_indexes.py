@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0038_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['attendance_date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['resigned_date'], name='employee_resigned_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapply',
+            index=models.Index(fields=['status', 'tl_approved', 'applied_at'], name='leave_status_tl_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapply',
+            index=models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['month', 'year'], name='payroll_month_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['employee', 'month', 'year'], name='payroll_emp_month_year_idx'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-18 02:58
+
+import calendar
+from datetime import date
+
+from django.db import migrations, models
+
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(calendar.month_name) if name}
+
+
+def parse_period(month, year):
+    """Same rules as app.models.month_period, frozen for this migration"""
+    parts = (month or '').split()
+    if not parts or parts[0].capitalize() not in MONTH_NUMBERS:
+        return None
+    if len(parts) > 1 and parts[1].isdigit():
+        year = int(parts[1])
+    if not year:
+        return None
+    return date(int(year), MONTH_NUMBERS[parts[0].capitalize()], 1)
+
+
+def backfill_periods(apps, schema_editor):
+    # One UPDATE per distinct (month label, year) pair rather than per row
+    for model_name, month_field, year_field in [
+        ('Payroll', 'month', 'year'),
+        ('MonthlyAttendanceSummary', 'month', 'year'),
+        ('SalaryProcessing', 'salary_month', 'salary_year'),
+    ]:
+        model = apps.get_model('app', model_name)
+        labels = model.objects.filter(period__isnull=True).values_list(month_field, year_field).distinct().order_by()
+        for month, year in list(labels):
+            period = parse_period(month, year)
+            if period is not None:
+                model.objects.filter(
+                    **{month_field: month, year_field: year, 'period__isnull': True}
+                ).update(period=period)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0039_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='monthlyattendancesummary',
+            options={'ordering': ['-period', '-year']},
+        ),
+        migrations.AlterModelOptions(
+            name='salaryprocessing',
+            options={'ordering': ['-period', '-salary_year']},
+        ),
+        migrations.AddField(
+            model_name='monthlyattendancesummary',
+            name='period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salaryprocessing',
+            name='period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyattendancesummary',
+            index=models.Index(fields=['period'], name='summary_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyattendancesummary',
+            index=models.Index(fields=['employee', 'period'], name='summary_emp_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['period'], name='payroll_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['employee', 'period'], name='payroll_emp_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryprocessing',
+            index=models.Index(fields=['period'], name='salaryprocessing_period_idx'),
+        ),
+        migrations.RunPython(backfill_periods, migrations.RunPython.noop),
+    ]
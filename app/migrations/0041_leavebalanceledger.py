@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-18 03:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def seed_leave_ledger(apps, schema_editor):
+    LeaveApply = apps.get_model('app', 'LeaveApply')
+    LeaveBalanceLedger = apps.get_model('app', 'LeaveBalanceLedger')
+    grouped = LeaveApply.objects.filter(status__in=['approved', 'pending']).order_by().values(
+        'employee_id', 'leave_type', month=TruncMonth('start_date')
+    ).annotate(
+        approved_count=Count('id', filter=Q(status='approved')),
+        approved_days=Sum('total_days', filter=Q(status='approved')),
+        pending_count=Count('id', filter=Q(status='pending')),
+        pending_days=Sum('total_days', filter=Q(status='pending')),
+    )
+    LeaveBalanceLedger.objects.bulk_create([
+        LeaveBalanceLedger(
+            employee_id=row['employee_id'],
+            period=row['month'],
+            leave_type=row['leave_type'],
+            approved_count=row['approved_count'],
+            approved_days=row['approved_days'] or 0,
+            pending_count=row['pending_count'],
+            pending_days=row['pending_days'] or 0,
+        )
+        for row in grouped
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0040_period_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalanceLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('leave_type', models.CharField(choices=[('annual', 'Annual Leave'), ('sick', 'Sick Leave'), ('casual', 'Casual Leave'), ('maternity', 'Maternity Leave'), ('paternity', 'Paternity Leave'), ('emergency', 'Emergency Leave'), ('unpaid', 'Unpaid Leave'), ('half_day', 'Half Day Leave'), ('compensatory', 'Compensatory Off'), ('work_from_home', 'Work From Home'), ('bereavement', 'Bereavement Leave'), ('study', 'Study Leave'), ('marriage', 'Marriage Leave'), ('medical', 'Medical Leave')], max_length=30)),
+                ('approved_count', models.PositiveIntegerField(default=0)),
+                ('approved_days', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('pending_days', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='app.employee')),
+            ],
+            options={
+                'ordering': ['-period', 'employee', 'leave_type'],
+                'indexes': [models.Index(fields=['period', 'leave_type'], name='leave_ledger_period_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'period', 'leave_type'), name='leave_ledger_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(seed_leave_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 03:08
+
+import django.db.models.deletion
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def expand_leave_days(apps, schema_editor):
+    LeaveApply = apps.get_model('app', 'LeaveApply')
+    LeaveDay = apps.get_model('app', 'LeaveDay')
+    batch = []
+    for leave in LeaveApply.objects.filter(status__in=['pending', 'approved']).order_by('pk').iterator(chunk_size=1000):
+        weight = Decimal('0.5') if leave.half_day or leave.leave_type == 'half_day' else Decimal('1')
+        batch.extend(
+            LeaveDay(
+                leave_id=leave.pk,
+                employee_id=leave.employee_id,
+                date=leave.start_date + timedelta(days=offset),
+                leave_type=leave.leave_type,
+                status=leave.status,
+                weight=weight,
+            )
+            for offset in range((leave.end_date - leave.start_date).days + 1)
+        )
+        if len(batch) >= 1000:
+            LeaveDay.objects.bulk_create(batch)
+            batch = []
+    LeaveDay.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0041_leavebalanceledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('leave_type', models.CharField(choices=[('annual', 'Annual Leave'), ('sick', 'Sick Leave'), ('casual', 'Casual Leave'), ('maternity', 'Maternity Leave'), ('paternity', 'Paternity Leave'), ('emergency', 'Emergency Leave'), ('unpaid', 'Unpaid Leave'), ('half_day', 'Half Day Leave'), ('compensatory', 'Compensatory Off'), ('work_from_home', 'Work From Home'), ('bereavement', 'Bereavement Leave'), ('study', 'Study Leave'), ('marriage', 'Marriage Leave'), ('medical', 'Medical Leave')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled'), ('revoked', 'Revoked')], max_length=20)),
+                ('weight', models.DecimalField(decimal_places=1, default=Decimal('1'), max_digits=2)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_days', to='app.employee')),
+                ('leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_days', to='app.leaveapply')),
+            ],
+            options={
+                'ordering': ['employee', 'date'],
+                'indexes': [models.Index(fields=['employee', 'date'], name='leave_day_emp_date_idx'), models.Index(fields=['date', 'status', 'leave_type'], name='leave_day_date_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('leave', 'date'), name='leave_day_unique')],
+            },
+        ),
+        migrations.RunPython(expand_leave_days, migrations.RunPython.noop),
+    ]
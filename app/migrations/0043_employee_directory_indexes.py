@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0042_leaveday'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['-created_at', '-id'], name='employee_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', '-created_at', '-id'], name='employee_dept_created_idx'),
+        ),
+    ]
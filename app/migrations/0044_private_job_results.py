@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 03:20
+
+import app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0043_employee_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='result_file',
+            field=models.FileField(blank=True, null=True, storage=app.models.private_storage, upload_to='job_results/'),
+        ),
+    ]
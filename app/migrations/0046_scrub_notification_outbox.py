@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 05:10
+
+from django.db import migrations
+
+
+def scrub_outbox(apps, schema_editor):
+    """Drop credentials and tracebacks persisted by earlier versions of the outbox"""
+    NotificationOutbox = apps.get_model('app', 'NotificationOutbox')
+    HRProfile = apps.get_model('app', 'HRProfile')
+    NotificationOutbox.objects.filter(status='sent').update(context={}, last_error=None)
+    for notification in NotificationOutbox.objects.exclude(last_error=None):
+        # Keep the exception line a traceback ends with
+        lines = [line for line in notification.last_error.splitlines() if line.strip()]
+        notification.last_error = lines[-1][:1000] if lines else None
+        notification.save(update_fields=['last_error'])
+
+    # Unsent welcome emails keep only a reference; the dispatcher reads the profile at send time
+    for notification in NotificationOutbox.objects.filter(kind='hr_welcome').exclude(status='sent'):
+        username = notification.context.get('username')
+        hr_id = HRProfile.objects.filter(username=username).values_list('id', flat=True).first() if username else None
+        notification.context = {'hr_id': hr_id}
+        if hr_id is None:
+            notification.status = 'failed'
+        notification.save(update_fields=['context', 'status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0045_background_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(scrub_outbox, migrations.RunPython.noop),
+    ]
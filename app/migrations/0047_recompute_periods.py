@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 05:40
+
+import calendar
+from datetime import date
+
+from django.db import migrations
+
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(calendar.month_name) if name}
+
+
+def parse_period(month, year):
+    """Same rules as app.models.month_period, frozen for this migration"""
+    parts = (month or '').split()
+    if not parts or parts[0].capitalize() not in MONTH_NUMBERS:
+        return None
+    if len(parts) > 1 and parts[1].isdigit():
+        year = int(parts[1])
+    if not year:
+        return None
+    return date(int(year), MONTH_NUMBERS[parts[0].capitalize()], 1)
+
+
+def recompute_periods(apps, schema_editor):
+    # Rows whose month / year were edited after period was first set kept the old period
+    for model_name, month_field, year_field in [
+        ('Payroll', 'month', 'year'),
+        ('MonthlyAttendanceSummary', 'month', 'year'),
+        ('SalaryProcessing', 'salary_month', 'salary_year'),
+    ]:
+        model = apps.get_model('app', model_name)
+        labels = model.objects.values_list(month_field, year_field).distinct().order_by()
+        for month, year in list(labels):
+            period = parse_period(month, year)
+            rows = model.objects.filter(**{month_field: month, year_field: year})
+            if period is None:
+                rows.filter(period__isnull=False).update(period=None)
+            else:
+                rows.exclude(period=period).update(period=period)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0046_scrub_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_periods, migrations.RunPython.noop),
+    ]
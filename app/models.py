@@ -1,5 +1,30 @@
-from django.db import models
-from datetime import time
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F, Count, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.utils import timezone
+from datetime import date, time, timedelta
+from decimal import Decimal
+import calendar
+
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(calendar.month_name) if name}
+
+
+def month_period(month, year=None):
+    """
+    First day of the month named by a label such as "January" or "January 2025".
+    A year inside the label wins over ``year``; None when the label cannot be parsed.
+    """
+    parts = (month or '').split()
+    if not parts or parts[0].capitalize() not in MONTH_NUMBERS:
+        return None
+    if len(parts) > 1 and parts[1].isdigit():
+        year = int(parts[1])
+    if not year:
+        return None
+    return date(int(year), MONTH_NUMBERS[parts[0].capitalize()], 1)
 
 
 
@@ -87,6 +112,14 @@ class Employee(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['resigned_date'], name='employee_resigned_date_idx'),
+            # Directory keyset pages: newest first, optionally within one department
+            models.Index(fields=['-created_at', '-id'], name='employee_created_id_idx'),
+            models.Index(fields=['department', '-created_at', '-id'], name='employee_dept_created_idx'),
+        ]
+
 
 
 
@@ -144,6 +177,7 @@ class Payroll(models.Model):
 
     month = models.CharField(max_length=20)          # Example: "January 2025"
     year = models.PositiveIntegerField(default=2025)
+    period = models.DateField(null=True, blank=True)  # First day of the month, parsed from month / year
     base_salary = models.DecimalField(max_digits=10, decimal_places=2)
     pf_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     professional_tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -167,6 +201,19 @@ class Payroll(models.Model):
     def __str__(self):
         return f"{self.employee.first_name} {self.employee.last_name} - {self.month} {self.year}"
 
+    def save(self, *args, **kwargs):
+        # Re-derived on every save so an edited month / year never leaves a stale period
+        self.period = month_period(self.month, self.year)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['month', 'year'], name='payroll_month_year_idx'),
+            models.Index(fields=['employee', 'month', 'year'], name='payroll_emp_month_year_idx'),
+            models.Index(fields=['period'], name='payroll_period_idx'),
+            models.Index(fields=['employee', 'period'], name='payroll_emp_period_idx'),
+        ]
+
 
 # ============================================================================
 # NEW COMPREHENSIVE MODELS FOR HR SYSTEM
@@ -242,6 +289,9 @@ class Attendance(models.Model):
     class Meta:
         ordering = ['-attendance_date']
         unique_together = ['employee', 'attendance_date']
+        indexes = [
+            models.Index(fields=['attendance_date', 'status'], name='attendance_date_status_idx'),
+        ]
 
 
 class LeaveApply(models.Model):
@@ -326,8 +376,17 @@ class LeaveApply(models.Model):
     def __str__(self):
         return f"{self.employee.first_name} {self.employee.last_name} - {self.leave_type} ({self.start_date} to {self.end_date})"
     
+    def save(self, *args, **kwargs):
+        # The save signals update LeaveBalanceLedger and LeaveDay; commit them with the leave
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['-applied_at']
+        indexes = [
+            models.Index(fields=['status', 'tl_approved', 'applied_at'], name='leave_status_tl_applied_idx'),
+            models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+        ]
 
 
 class LeaveApproval(models.Model):
@@ -397,6 +456,234 @@ class LeaveApproval(models.Model):
         ordering = ['-assigned_at']
 
 
+class LeaveBalanceLedger(models.Model):
+    """
+    Leave Balance Ledger - Approved and pending leave per employee, month and
+    leave type, kept in step with LeaveApply saves/deletes (see app/signals.py)
+    and verified against LeaveApply by the rebuild_leave_ledger command
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger')
+    period = models.DateField()  # First day of the month the leave starts in
+    leave_type = models.CharField(max_length=30, choices=LeaveApply.LEAVE_TYPE_CHOICES)
+
+    # Counters
+    approved_count = models.PositiveIntegerField(default=0)
+    approved_days = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    pending_days = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # LeaveApply.status -> (count field, days field); other statuses are not counted
+    STATUS_FIELDS = {
+        'approved': ('approved_count', 'approved_days'),
+        'pending': ('pending_count', 'pending_days'),
+    }
+    COUNTER_FIELDS = ['approved_count', 'approved_days', 'pending_count', 'pending_days']
+
+    def __str__(self):
+        return f"Leave ledger - {self.employee_id} - {self.period:%Y-%m} - {self.leave_type}"
+
+    @staticmethod
+    def bucket(leave):
+        """(employee_id, period, leave_type, status, total_days) of a LeaveApply"""
+        return (leave.employee_id, leave.start_date.replace(day=1), leave.leave_type, leave.status, leave.total_days or 0)
+
+    @classmethod
+    def apply(cls, employee_id, period, leave_type, status, days, delta):
+        """Add ``delta`` (+1/-1) leaves of ``days`` days to one bucket's counters"""
+        if status not in cls.STATUS_FIELDS:
+            return
+        count_field, days_field = cls.STATUS_FIELDS[status]
+        # Clamp at zero so a decrement against a not-yet-rebuilt bucket cannot go negative
+        change = {
+            count_field: Greatest(F(count_field) + delta, 0),
+            days_field: Greatest(F(days_field) + delta * days, 0),
+        }
+        rows = cls.objects.filter(employee_id=employee_id, period=period, leave_type=leave_type)
+        if not rows.update(**change) and delta > 0:
+            cls.objects.get_or_create(employee_id=employee_id, period=period, leave_type=leave_type)
+            rows.update(**change)
+
+    @classmethod
+    def totals(cls, **filters):
+        """Summed counters over the ledger rows matching ``filters`` (zeros when none match)"""
+        totals = cls.objects.filter(**filters).aggregate(**{field: Sum(field) for field in cls.COUNTER_FIELDS})
+        return {field: value or 0 for field, value in totals.items()}
+
+    @classmethod
+    def expected(cls, employee_ids=None):
+        """Ledger rows recomputed from LeaveApply in one grouped query, keyed by (employee_id, period, leave_type)"""
+        leaves = LeaveApply.objects.filter(status__in=cls.STATUS_FIELDS)
+        if employee_ids is not None:
+            leaves = leaves.filter(employee_id__in=employee_ids)
+        counters = {}
+        for status, (count_field, days_field) in cls.STATUS_FIELDS.items():
+            counters[count_field] = Count('id', filter=Q(status=status))
+            counters[days_field] = Coalesce(Sum('total_days', filter=Q(status=status)), 0)
+        grouped = leaves.order_by().values(
+            'employee_id', 'leave_type', month=TruncMonth('start_date')
+        ).annotate(**counters)
+        return {
+            (row['employee_id'], row['month'], row['leave_type']): tuple(row[field] for field in cls.COUNTER_FIELDS)
+            for row in grouped
+        }
+
+    @classmethod
+    def reconcile(cls, employee_ids=None, dry_run=False):
+        """
+        Compare every ledger row with LeaveApply and repair the ones that
+        drifted: missing rows are created, wrong counters are overwritten and
+        rows with nothing left behind them are zeroed. Returns (checked, drifted).
+        """
+        expected = cls.expected(employee_ids)
+        stored_rows = cls.objects.all()
+        if employee_ids is not None:
+            stored_rows = stored_rows.filter(employee_id__in=employee_ids)
+        stored = {
+            (row[0], row[1], row[2]): tuple(row[3:])
+            for row in stored_rows.values_list('employee_id', 'period', 'leave_type', *cls.COUNTER_FIELDS)
+        }
+
+        zero = (0,) * len(cls.COUNTER_FIELDS)
+        keys = expected.keys() | stored.keys()
+        drifted = sorted(key for key in keys if expected.get(key, zero) != stored.get(key, zero))
+        if not dry_run and drifted:
+            with transaction.atomic():
+                cls.objects.bulk_create([
+                    cls(employee_id=employee_id, period=period, leave_type=leave_type)
+                    for employee_id, period, leave_type in drifted if (employee_id, period, leave_type) not in stored
+                ], ignore_conflicts=True)
+                for employee_id, period, leave_type in drifted:
+                    counters = expected.get((employee_id, period, leave_type), zero)
+                    cls.objects.filter(employee_id=employee_id, period=period, leave_type=leave_type).update(
+                        **dict(zip(cls.COUNTER_FIELDS, counters)), updated_at=timezone.now()
+                    )
+
+        return len(keys), drifted
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'period', 'leave_type'], name='leave_ledger_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'leave_type'], name='leave_ledger_period_type_idx'),
+        ]
+        ordering = ['-period', 'employee', 'leave_type']
+
+
+class LeaveDay(models.Model):
+    """
+    Leave Day - One row per calendar day covered by a pending or approved
+    LeaveApply, so overlap checks and per-month leave days (including leaves
+    that cross a month boundary) are indexed lookups on (employee, date).
+    Kept in step with LeaveApply saves (see app/signals.py); rebuilt by the
+    rebuild_leave_days command.
+    """
+    leave = models.ForeignKey(LeaveApply, on_delete=models.CASCADE, related_name='leave_days')
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_days')
+    date = models.DateField()
+    leave_type = models.CharField(max_length=30, choices=LeaveApply.LEAVE_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=LeaveApply.STATUS_CHOICES)
+    weight = models.DecimalField(max_digits=2, decimal_places=1, default=Decimal('1'))  # 0.5 for half days
+
+    # Leaves in any other status hold no days
+    ACTIVE_STATUSES = ['pending', 'approved']
+
+    def __str__(self):
+        return f"Leave day - {self.employee_id} - {self.date} - {self.leave_type} ({self.status})"
+
+    @staticmethod
+    def weight_for(leave):
+        return Decimal('0.5') if leave.half_day or leave.leave_type == 'half_day' else Decimal('1')
+
+    @classmethod
+    def rows_for(cls, leave):
+        """Unsaved LeaveDay rows for every date from the leave's start to its end"""
+        weight = cls.weight_for(leave)
+        return [
+            cls(
+                leave_id=leave.pk,
+                employee_id=leave.employee_id,
+                date=leave.start_date + timedelta(days=offset),
+                leave_type=leave.leave_type,
+                status=leave.status,
+                weight=weight,
+            )
+            for offset in range((leave.end_date - leave.start_date).days + 1)
+        ]
+
+    @classmethod
+    def sync(cls, leave, previous=None):
+        """
+        Bring one leave's rows in line with its saved state. ``previous`` is the
+        row as stored before the save; when only the status moved between
+        pending and approved the rows are updated in place.
+        """
+        rows = cls.objects.filter(leave_id=leave.pk)
+        if leave.status not in cls.ACTIVE_STATUSES:
+            rows.delete()
+            return
+
+        def span(row):
+            return (row.employee_id, row.start_date, row.end_date, row.leave_type, cls.weight_for(row))
+
+        if previous and previous.status in cls.ACTIVE_STATUSES and span(previous) == span(leave):
+            if previous.status != leave.status:
+                rows.update(status=leave.status)
+            return
+
+        rows.delete()
+        cls.objects.bulk_create(cls.rows_for(leave))
+
+    @staticmethod
+    def as_days(total):
+        """A summed weight as an int, or a float when half days leave a fraction"""
+        total = total or Decimal('0')
+        return int(total) if total == int(total) else float(total)
+
+    @classmethod
+    def days_between(cls, start_date, end_date, **filters):
+        """Weighted leave days from ``start_date`` to ``end_date`` for the rows matching ``filters``"""
+        rows = cls.objects.filter(date__gte=start_date, date__lte=end_date, **filters)
+        return cls.as_days(rows.aggregate(days=Sum('weight'))['days'])
+
+    @classmethod
+    def rebuild(cls, employee_ids=None, batch_size=1000):
+        """Re-expand every pending / approved leave (optionally for some employees); returns rows written"""
+        leaves = LeaveApply.objects.filter(status__in=cls.ACTIVE_STATUSES).only(
+            'employee', 'start_date', 'end_date', 'leave_type', 'status', 'half_day'
+        ).order_by('pk')
+        existing = cls.objects.all()
+        if employee_ids is not None:
+            leaves = leaves.filter(employee_id__in=employee_ids)
+            existing = existing.filter(employee_id__in=employee_ids)
+
+        written = 0
+        with transaction.atomic():
+            existing.delete()
+            batch = []
+            for leave in leaves.iterator(chunk_size=batch_size):
+                batch.extend(cls.rows_for(leave))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch, batch_size=batch_size)
+                    written += len(batch)
+                    batch = []
+            cls.objects.bulk_create(batch, batch_size=batch_size)
+            written += len(batch)
+        return written
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leave', 'date'], name='leave_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='leave_day_emp_date_idx'),
+            models.Index(fields=['date', 'status', 'leave_type'], name='leave_day_date_status_idx'),
+        ]
+        ordering = ['employee', 'date']
+
+
 class Announcement(models.Model):
     """
     Enhanced Announcement Model for company-wide communications
@@ -719,6 +1006,7 @@ class MonthlyAttendanceSummary(models.Model):
     # Month and Year
     month = models.CharField(max_length=20)  # Example: "January"
     year = models.PositiveIntegerField()
+    period = models.DateField(null=True, blank=True)  # First day of the month, parsed from month / year
     
     # Attendance Statistics
     total_working_days = models.PositiveIntegerField(default=0)
@@ -755,9 +1043,17 @@ class MonthlyAttendanceSummary(models.Model):
     def __str__(self):
         return f"{self.employee.first_name} {self.employee.last_name} - {self.month} {self.year}"
     
+    def save(self, *args, **kwargs):
+        self.period = month_period(self.month, self.year)
+        super().save(*args, **kwargs)
+    
     class Meta:
         unique_together = ['employee', 'month', 'year']
-        ordering = ['-year', '-month']
+        ordering = ['-period', '-year']
+        indexes = [
+            models.Index(fields=['period'], name='summary_period_idx'),
+            models.Index(fields=['employee', 'period'], name='summary_emp_period_idx'),
+        ]
 
 
 class AttendanceApproval(models.Model):
@@ -866,6 +1162,7 @@ class SalaryProcessing(models.Model):
     # Salary period
     salary_month = models.CharField(max_length=20)  # e.g., "November 2025"
     salary_year = models.PositiveIntegerField()
+    period = models.DateField(null=True, blank=True)  # First day of the month, parsed from salary_month / salary_year
     
     # Processing details
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -895,9 +1192,16 @@ class SalaryProcessing(models.Model):
     def __str__(self):
         return f"Salary Processing - {self.employee.first_name} {self.employee.last_name} - {self.salary_month} {self.salary_year}"
     
+    def save(self, *args, **kwargs):
+        self.period = month_period(self.salary_month, self.salary_year)
+        super().save(*args, **kwargs)
+    
     class Meta:
-        ordering = ['-salary_year', '-salary_month']
+        ordering = ['-period', '-salary_year']
         unique_together = ['employee', 'salary_month', 'salary_year']
+        indexes = [
+            models.Index(fields=['period'], name='salaryprocessing_period_idx'),
+        ]
 
 
 class AttendanceCheckLog(models.Model):
@@ -958,6 +1262,105 @@ class AttendanceCheckLog(models.Model):
         ordering = ['-check_time']
 
 
+# ============================================================================
+# PRECOMPUTED ATTENDANCE ROLLUPS
+# ============================================================================
+
+class DailyAttendanceRollup(models.Model):
+    """
+    Daily Attendance Rollup - Per-day, per-department attendance counters kept
+    in step with Attendance saves/deletes (see app/signals.py)
+    """
+    date = models.DateField()
+    department = models.CharField(max_length=150)
+
+    # Status counters
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    half_day_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)  # All attendance rows, any status
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Attendance.status -> counter field
+    STATUS_FIELDS = {
+        'present': 'present_count',
+        'absent': 'absent_count',
+        'half_day': 'half_day_count',
+        'late': 'late_count',
+    }
+
+    def __str__(self):
+        return f"Rollup - {self.date} - {self.department} ({self.total_count} records)"
+
+    @classmethod
+    def apply(cls, date, department, status, delta):
+        """Add ``delta`` (+1/-1) to the counters of one attendance row's bucket"""
+        department = department or ''
+        if delta > 0:
+            cls.objects.get_or_create(date=date, department=department)
+
+        # Clamp at zero so a decrement against a not-yet-rebuilt bucket cannot go negative
+        fields = ['total_count']
+        if status in cls.STATUS_FIELDS:
+            fields.append(cls.STATUS_FIELDS[status])
+        cls.objects.filter(date=date, department=department).update(
+            **{field: Greatest(F(field) + delta, 0) for field in fields}
+        )
+
+    @classmethod
+    def move_employee(cls, employee_id, old_department, new_department):
+        """Move every attendance row of one employee from the old department's buckets to the new one's"""
+        rows = Attendance.objects.filter(employee_id=employee_id).order_by().values(
+            'attendance_date', 'status'
+        ).annotate(count=Count('id'))
+        with transaction.atomic():
+            for row in rows:
+                cls.apply(row['attendance_date'], old_department, row['status'], delta=-row['count'])
+                cls.apply(row['attendance_date'], new_department, row['status'], delta=row['count'])
+
+    @classmethod
+    def rebuild(cls, start_date=None, end_date=None):
+        """Recompute rollups from Attendance in one grouped query; returns rows written"""
+        attendance = Attendance.objects.all()
+        rollups = cls.objects.all()
+        if start_date:
+            attendance = attendance.filter(attendance_date__gte=start_date)
+            rollups = rollups.filter(date__gte=start_date)
+        if end_date:
+            attendance = attendance.filter(attendance_date__lte=end_date)
+            rollups = rollups.filter(date__lte=end_date)
+
+        counters = {
+            field: Count('id', filter=Q(status=status))
+            for status, field in cls.STATUS_FIELDS.items()
+        }
+        grouped = attendance.order_by().values(
+            'attendance_date', 'employee__department'
+        ).annotate(total_count=Count('id'), **counters)
+
+        new_rows = [
+            cls(
+                date=row['attendance_date'],
+                department=row['employee__department'] or '',
+                total_count=row['total_count'],
+                **{field: row[field] for field in cls.STATUS_FIELDS.values()}
+            )
+            for row in grouped
+        ]
+
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create(new_rows, batch_size=1000)
+
+        return len(new_rows)
+
+    class Meta:
+        unique_together = ['date', 'department']
+        ordering = ['-date', 'department']
+
+
 # ============================================================================
 # NEW ATTENDANCE MODELS FOR ENHANCED SYSTEM
 # ============================================================================
@@ -1193,6 +1596,11 @@ class TeamChat(models.Model):
             models.Index(fields=['receiver_employee', 'created_at']),
             models.Index(fields=['receiver_tl', 'created_at']),
             models.Index(fields=['created_at']),
+            # Keyset scans for the chat sync endpoint: (participant, updated_at, id)
+            models.Index(fields=['sender_employee', 'updated_at', 'id'], name='teamchat_sender_emp_sync_idx'),
+            models.Index(fields=['sender_tl', 'updated_at', 'id'], name='teamchat_sender_tl_sync_idx'),
+            models.Index(fields=['receiver_employee', 'updated_at', 'id'], name='teamchat_recv_emp_sync_idx'),
+            models.Index(fields=['receiver_tl', 'updated_at', 'id'], name='teamchat_recv_tl_sync_idx'),
         ]
 
 
@@ -1285,5 +1693,201 @@ class TeamChatSettings(models.Model):
         verbose_name_plural = 'Team Chat Settings'
 
 
+class ChatUnreadCounter(models.Model):
+    """
+    Chat Unread Counter - Unread TeamChat messages per recipient, kept in step
+    by send_team_message / mark_messages_read (repaired by reconcile_chat_unread)
+    """
+    recipient = models.CharField(max_length=40, primary_key=True)  # 'employee:<id>' or 'tl:<id>'
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Recipient role -> TeamChat receiver column
+    RECIPIENT_FIELDS = {
+        'employee': 'receiver_employee_id',
+        'tl': 'receiver_tl_id',
+    }
+
+    def __str__(self):
+        return f"Unread - {self.recipient}: {self.unread_count}"
+
+    @staticmethod
+    def recipient_key(role, profile_id):
+        return f"{role}:{profile_id}"
+
+    @classmethod
+    def get_count(cls, role, profile_id):
+        """Unread messages for one recipient (a primary key lookup)"""
+        count = cls.objects.filter(recipient=cls.recipient_key(role, profile_id)).values_list('unread_count', flat=True).first()
+        return count or 0
+
+    @classmethod
+    def apply(cls, role, profile_id, delta):
+        """Add ``delta`` to a recipient's counter in the database (no read-modify-write)"""
+        counter = cls.objects.filter(recipient=cls.recipient_key(role, profile_id))
+        # Clamp at zero so a decrement against a drifted counter cannot go negative
+        change = {'unread_count': Greatest(F('unread_count') + delta, 0)}
+        if not counter.update(**change) and delta > 0:
+            cls.objects.get_or_create(recipient=cls.recipient_key(role, profile_id))
+            counter.update(**change)
+
+    @classmethod
+    def reconcile(cls, dry_run=False):
+        """
+        Compare every counter with a COUNT over TeamChat and repair the ones that
+        drifted. Each repair is a single UPDATE with the count as a subquery, so
+        messages sent while it runs are not lost. Returns (checked, drifted).
+        """
+        actual = {}
+        for role, field in cls.RECIPIENT_FIELDS.items():
+            grouped = TeamChat.objects.filter(is_read=False, **{f'{field}__isnull': False}).order_by().values(field).annotate(unread=Count('id'))
+            actual.update({cls.recipient_key(role, row[field]): row['unread'] for row in grouped})
+        stored = dict(cls.objects.values_list('recipient', 'unread_count'))
+
+        drifted = sorted(key for key in actual.keys() | stored.keys() if actual.get(key, 0) != stored.get(key, 0))
+        if not dry_run and drifted:
+            cls.objects.bulk_create([cls(recipient=key) for key in drifted if key not in stored], ignore_conflicts=True)
+            for key in drifted:
+                role, profile_id = key.split(':', 1)
+                field = cls.RECIPIENT_FIELDS[role]
+                unread = TeamChat.objects.filter(is_read=False, **{field: profile_id}).order_by().values(field).annotate(unread=Count('id')).values('unread')
+                cls.objects.filter(recipient=key).update(unread_count=Coalesce(Subquery(unread), 0))
+
+        return len(actual.keys() | stored.keys()), drifted
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+class SearchToken(models.Model):
+    """
+    Search Token - Inverted index entry (term -> message) for chat and project
+    discussion search; maintained on save by app.search
+    """
+    term = models.CharField(max_length=64)
+    team_chat = models.ForeignKey(TeamChat, on_delete=models.CASCADE, related_name='search_tokens', null=True, blank=True)
+    discussion = models.ForeignKey(ProjectDiscussion, on_delete=models.CASCADE, related_name='search_tokens', null=True, blank=True)
+    weight = models.PositiveIntegerField(default=1)  # Occurrences, subject matches boosted
+
+    def __str__(self):
+        target = f"chat {self.team_chat_id}" if self.team_chat_id else f"discussion {self.discussion_id}"
+        return f"{self.term} -> {target}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'team_chat'], name='searchtoken_term_chat_idx'),
+            models.Index(fields=['term', 'discussion'], name='searchtoken_term_disc_idx'),
+        ]
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def private_storage():
+    """Storage outside MEDIA_ROOT for files only permission-checked views may serve"""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+class BackgroundJob(models.Model):
+    """
+    Background Job - Long-running work (exports, payroll runs) queued from a
+    request and executed by the ``run_jobs`` worker command
+    """
+    JOB_TYPE_CHOICES = [
+        ('export_employees', 'Export Employees'),
+        ('export_payroll', 'Export Payroll'),
+        ('payroll_calculation', 'Payroll Calculation'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=50, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True)
 
+    # Who asked for it
+    requested_by = models.CharField(max_length=200)
+    requested_by_hr = models.ForeignKey(HRProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs')
 
+    # Outcome
+    result = models.JSONField(default=dict, blank=True)
+    result_file = models.FileField(upload_to='job_results/', storage=private_storage, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    # Which run_jobs process is executing it; it refreshes heartbeat_at while the job runs
+    claimed_by = models.CharField(max_length=200, blank=True, default='')
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # Timing
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job #{self.pk} - {self.job_type} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['requested_by_hr', 'created_at']),
+        ]
+
+
+# ============================================================================
+# NOTIFICATION OUTBOX
+# ============================================================================
+
+class NotificationOutbox(models.Model):
+    """
+    Notification Outbox - Emails queued in the same transaction as the change
+    that triggers them and delivered by the ``dispatch_notifications`` command
+    """
+    KIND_CHOICES = [
+        ('leave_approved', 'Leave Approved'),
+        ('leave_rejected', 'Leave Rejected'),
+        ('hr_welcome', 'HR Welcome'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Message - the template is rendered by the dispatcher, not the request
+    recipients = models.JSONField(default=list)
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    template = models.CharField(max_length=200)
+    context = models.JSONField(default=dict, blank=True)
+
+    # Delivery
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Outbox #{self.pk} - {self.kind} to {', '.join(self.recipients)} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
@@ -0,0 +1,178 @@
+"""
+Transactional email outbox
+
+Views call ``queue_email()`` inside the transaction that makes the change the
+email is about, so the request only pays for one INSERT and a rolled back
+change never sends mail. The ``dispatch_notifications`` command claims pending
+rows in batches, renders their templates and sends them over one SMTP
+connection that stays open between batches. Failed sends are retried with
+exponential backoff until MAX_ATTEMPTS.
+
+Rows never hold secrets: a context that would carry credentials stores a
+reference and is expanded by a CONTEXT_BUILDERS entry at send time, sent rows
+are stripped of their context, ``last_error`` keeps only the exception summary
+(the traceback goes to the log) and ``purge_finished`` deletes old sent and
+failed rows.
+"""
+
+import logging
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import HRProfile, NotificationOutbox
+
+
+logger = logging.getLogger('app.notifications')
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+
+# Errors that mean the connection itself is unusable and must be reopened
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def queue_email(kind, recipients, subject, template, context=None, from_email=None):
+    """Queue an HTML email rendered from ``template`` with ``context`` (must be JSON-serialisable)"""
+    return NotificationOutbox.objects.create(
+        kind=kind,
+        recipients=list(recipients),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        template=template,
+        context=context or {},
+    )
+
+
+def hr_welcome_context(context):
+    hr = HRProfile.objects.get(pk=context['hr_id'])
+    return {
+        'name': hr.full_name,
+        'username': hr.username,
+        'password': hr.password,
+        'employee_id': hr.employee_id,  # This will be the Access ID
+        'email': hr.email,
+        'designation': hr.designation,
+    }
+
+
+# Kinds whose stored context is a reference, expanded into the template context when sent
+CONTEXT_BUILDERS = {
+    'hr_welcome': hr_welcome_context,
+}
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number ``attempts`` (exponential, capped, with jitter)"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(limit):
+    """
+    Move up to ``limit`` due pending rows to 'sending' and return them.
+
+    Uses the same conditional UPDATE as claim_next_job, so concurrent
+    dispatchers never claim the same row.
+    """
+    now = timezone.now()
+    candidates = list(
+        NotificationOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    # A per-claim timestamp tells this dispatcher's rows apart from a concurrent one's
+    token = now + timedelta(microseconds=random.randint(0, 999))
+    NotificationOutbox.objects.filter(id__in=candidates, status='pending').update(status='sending', claimed_at=token)
+    return list(NotificationOutbox.objects.filter(id__in=candidates, status='sending', claimed_at=token).order_by('id'))
+
+
+def requeue_stale(before):
+    """Return rows stuck in 'sending' (dispatcher killed mid-batch) to the queue"""
+    return NotificationOutbox.objects.filter(status='sending', claimed_at__lt=before).update(status='pending')
+
+
+def purge_finished(before):
+    """Delete sent and failed rows that finished before ``before``; returns the count"""
+    deleted, _ = NotificationOutbox.objects.filter(
+        Q(status='sent', sent_at__lt=before) | Q(status='failed', next_attempt_at__lt=before)
+    ).delete()
+    return deleted
+
+
+def build_message(notification, connection):
+    builder = CONTEXT_BUILDERS.get(notification.kind, dict)
+    html = render_to_string(notification.template, builder(notification.context))
+    message = EmailMultiAlternatives(
+        subject=notification.subject,
+        body=strip_tags(html),
+        from_email=notification.from_email,
+        to=notification.recipients,
+        connection=connection,
+    )
+    message.attach_alternative(html, 'text/html')
+    return message
+
+
+class Dispatcher:
+    """Sends claimed notifications over one SMTP connection reused across batches"""
+
+    def __init__(self, batch_size=50):
+        self.batch_size = batch_size
+        self.connection = None
+
+    def _connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def dispatch_batch(self):
+        """Send one batch; returns (sent, failed) counts"""
+        batch = claim_batch(self.batch_size)
+        sent = failed = 0
+        for notification in batch:
+            try:
+                build_message(notification, self._connection()).send()
+            except Exception as e:
+                if isinstance(e, CONNECTION_ERRORS):
+                    self.close()
+                logger.warning("Failed to send notification %s", notification.id, exc_info=True)
+                self._record_failure(notification, e)
+                failed += 1
+            else:
+                NotificationOutbox.objects.filter(id=notification.id).update(
+                    status='sent', sent_at=timezone.now(), attempts=notification.attempts + 1, last_error=None,
+                    context={}
+                )
+                sent += 1
+        return sent, failed
+
+    def _record_failure(self, notification, error):
+        attempts = notification.attempts + 1
+        # A referenced record that no longer exists will not come back on retry
+        give_up = attempts >= MAX_ATTEMPTS or isinstance(error, ObjectDoesNotExist)
+        NotificationOutbox.objects.filter(id=notification.id).update(
+            status='failed' if give_up else 'pending',
+            attempts=attempts,
+            last_error=f"{type(error).__name__}: {error}"[:1000],
+            next_attempt_at=timezone.now() + timedelta(seconds=backoff_delay(attempts)),
+        )
@@ -0,0 +1,238 @@
+"""
+Payroll calculation helpers shared by the HR payroll views and background jobs
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from .models import Attendance, Employee, LeaveDay, Payroll, PayrollDeduction
+
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+UNPAID_LEAVE_TYPES = ['unpaid', 'leave_without_pay']
+
+WORKING_DAYS_PER_MONTH = 26
+PF_RATE = 0.12
+PROFESSIONAL_TAX = 200
+
+# Rows per INSERT/UPDATE statement for bulk writes
+BULK_BATCH_SIZE = 500
+
+PAYROLL_FIELDS = [
+    'base_salary', 'allowances', 'overtime_amount', 'leave_deduction', 'half_day_deduction',
+    'late_arrival_deduction', 'pf_deduction', 'professional_tax', 'other_deductions',
+    'gross_salary', 'total_deductions', 'final_salary', 'created_by', 'is_processed', 'period',
+]
+
+
+def month_date_range(month, year):
+    """Return (first_day, last_day) for a month name such as "January" and a year"""
+    month_num = MONTH_NAMES.index(month) + 1
+    month_start = date(year, month_num, 1)
+    if month_num == 12:
+        month_end = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        month_end = date(year, month_num + 1, 1) - timedelta(days=1)
+    return month_start, month_end
+
+
+def _amount(value):
+    """Form amounts may arrive blank ('' or spaces); treat those as 0"""
+    if isinstance(value, str):
+        value = value.strip()
+    return float(value or 0)
+
+
+def compute_salary(package, half_days, absent_days, unpaid_leave_days, allowances=0, overtime_amount=0):
+    """
+    Pure salary maths for one employee-month.
+
+    Returns (payroll_values, deductions) where ``payroll_values`` maps Payroll
+    field names to amounts and ``deductions`` lists
+    (deduction_type, description, amount, calculation_basis, units) tuples.
+    """
+    base_salary = float(package)
+    daily_salary = base_salary / WORKING_DAYS_PER_MONTH
+
+    half_day_deduction = half_days * (daily_salary / 2)
+    absent_deduction = absent_days * daily_salary
+    unpaid_leave_deduction = unpaid_leave_days * daily_salary
+
+    # Standard deductions
+    pf_deduction = base_salary * PF_RATE
+    professional_tax = PROFESSIONAL_TAX
+
+    # Gross salary (base + allowances)
+    allowances = _amount(allowances)
+    overtime_amount = _amount(overtime_amount)
+    gross_salary = base_salary + allowances + overtime_amount
+
+    total_deductions = (half_day_deduction + absent_deduction + unpaid_leave_deduction +
+                        pf_deduction + professional_tax)
+
+    payroll_values = {
+        'base_salary': base_salary,
+        'allowances': allowances,
+        'overtime_amount': overtime_amount,
+        'leave_deduction': absent_deduction + unpaid_leave_deduction,
+        'half_day_deduction': half_day_deduction,
+        'late_arrival_deduction': 0,  # Late arrivals already handled in half day
+        'pf_deduction': pf_deduction,
+        'professional_tax': professional_tax,
+        'other_deductions': 0,
+        'gross_salary': gross_salary,
+        'total_deductions': total_deductions,
+        'final_salary': gross_salary - total_deductions,
+    }
+
+    deductions = [
+        ('half_day', f'Half day deduction for {half_days} half days', half_day_deduction, 'Half day rate', half_days),
+        ('absent', f'Absence deduction for {absent_days} absent days', absent_deduction, 'Per day salary', absent_days),
+        ('unpaid_leave', f'Unpaid leave deduction for {unpaid_leave_days} days', unpaid_leave_deduction, 'Per day salary', unpaid_leave_days),
+        ('pf', 'Provident Fund deduction', pf_deduction, '12% of base salary', None),
+        ('professional_tax', 'Professional Tax', professional_tax, 'Fixed amount', None),
+    ]
+    deductions = [deduction for deduction in deductions if deduction[2] > 0]
+
+    return payroll_values, deductions
+
+
+def calculate_month_payroll(month, year, created_by, employees=None, allowances=None, overtime_amount=None):
+    """
+    Calculate payroll for many employees at once (default: every active employee).
+
+    Attendance and approved unpaid leave are loaded with one grouped query each,
+    salaries are computed in memory, and Payroll / PayrollDeduction rows are
+    written with bulk_create / bulk_update inside a single transaction.
+
+    ``allowances`` and ``overtime_amount`` apply to every employee in the run,
+    so only pass them for single-employee runs; left as None, each employee
+    keeps the amounts on their existing Payroll row for the month (0 if new).
+
+    Returns a summary dict with counts, elapsed seconds and employees per second.
+    """
+    started = time.monotonic()
+    month_start, month_end = month_date_range(month, year)
+
+    if employees is None:
+        employees = Employee.objects.filter(resigned_date__isnull=True)
+    employees = list(employees.only('id', 'package').order_by('id'))
+    employee_ids = [employee.id for employee in employees]
+
+    # One grouped query for the month's attendance counters
+    attendance_counts = {
+        row['employee_id']: row
+        for row in Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            attendance_date__gte=month_start,
+            attendance_date__lte=month_end
+        ).values('employee_id').annotate(
+            half_days=Count('id', filter=Q(status='half_day')),
+            absent_days=Count('id', filter=Q(status='absent')),
+        ).order_by()
+    }
+
+    # One grouped query for approved unpaid leave days falling in the month (LeaveDay rows,
+    # so a leave that crosses the month boundary is split between both payrolls)
+    unpaid_leave_days = {
+        employee_id: LeaveDay.as_days(days)
+        for employee_id, days in LeaveDay.objects.filter(
+            employee_id__in=employee_ids,
+            date__gte=month_start,
+            date__lte=month_end,
+            status='approved',
+            leave_type__in=UNPAID_LEAVE_TYPES,
+        ).values('employee_id').annotate(days=Sum('weight')).values_list('employee_id', 'days').order_by()
+    }
+
+    existing = {
+        payroll.employee_id: payroll
+        for payroll in Payroll.objects.filter(employee_id__in=employee_ids, month=month, year=year)
+    }
+
+    to_create, to_update, deductions_by_employee = [], [], {}
+    for employee in employees:
+        counts = attendance_counts.get(employee.id, {})
+        payroll = existing.get(employee.id) or Payroll(employee_id=employee.id, month=month, year=year)
+        payroll_values, deductions = compute_salary(
+            employee.package,
+            counts.get('half_days', 0),
+            counts.get('absent_days', 0),
+            unpaid_leave_days.get(employee.id) or 0,
+            allowances=payroll.allowances if allowances is None else allowances,
+            overtime_amount=payroll.overtime_amount if overtime_amount is None else overtime_amount,
+        )
+
+        payroll.period = month_start
+        for field, value in payroll_values.items():
+            setattr(payroll, field, value)
+        payroll.created_by = created_by
+        payroll.is_processed = False
+
+        (to_update if payroll.pk else to_create).append(payroll)
+        deductions_by_employee[employee.id] = deductions
+
+    approved_date = timezone.now()
+    with transaction.atomic():
+        Payroll.objects.bulk_update(to_update, PAYROLL_FIELDS, batch_size=BULK_BATCH_SIZE)
+        Payroll.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+
+        # Backends without INSERT ... RETURNING (MySQL) leave new primary keys unset
+        if any(payroll.pk is None for payroll in to_create):
+            new_ids = dict(Payroll.objects.filter(
+                employee_id__in=[payroll.employee_id for payroll in to_create], month=month, year=year
+            ).values_list('employee_id', 'id'))
+            for payroll in to_create:
+                payroll.pk = new_ids[payroll.employee_id]
+
+        payrolls = to_update + to_create
+        PayrollDeduction.objects.filter(payroll__in=[payroll.pk for payroll in payrolls]).delete()
+        PayrollDeduction.objects.bulk_create([
+            PayrollDeduction(
+                payroll_id=payroll.pk,
+                employee_id=payroll.employee_id,
+                deduction_type=deduction_type,
+                description=description,
+                amount=amount,
+                calculation_basis=basis,
+                units_deducted=units,
+                approved_by=created_by,
+                approved_date=approved_date
+            )
+            for payroll in payrolls
+            for deduction_type, description, amount, basis, units in deductions_by_employee[payroll.employee_id]
+        ], batch_size=BULK_BATCH_SIZE)
+
+    elapsed = time.monotonic() - started
+    return {
+        'month': month,
+        'year': year,
+        'calculated': len(payrolls),
+        'created': len(to_create),
+        'updated': len(to_update),
+        'elapsed_seconds': round(elapsed, 3),
+        'employees_per_second': round(len(payrolls) / elapsed, 1) if elapsed > 0 else None,
+        'payrolls': payrolls,
+    }
+
+
+def calculate_employee_payroll(employee, month, year, created_by, allowances=0, overtime_amount=0):
+    """
+    Calculate (or recalculate) one employee's payroll for a month.
+
+    Deductions are based on half days, absences and approved unpaid leave, plus
+    PF and professional tax. Returns the saved Payroll record.
+    """
+    summary = calculate_month_payroll(
+        month, year, created_by,
+        employees=Employee.objects.filter(pk=employee.pk),
+        allowances=allowances,
+        overtime_amount=overtime_amount,
+    )
+    return summary['payrolls'][0]
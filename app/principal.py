@@ -0,0 +1,228 @@
+"""
+Logged-in principal resolution
+
+``PrincipalMiddleware`` attaches ``request.principal``: the HR, employee or team
+leader the session belongs to. A slim read-only snapshot (name, department,
+image URL, team ids) is cached per session and validated against a version
+counter per profile that model signals bump on save, so most requests need no
+profile query at all. Views that need the model instance use
+``current_profile()``, which loads it at most once per request.
+"""
+
+from django.core.cache import cache
+
+from .caching import cache_timeout
+from .models import HRProfile, Employee, TeamLeader, TeamAssignment
+
+
+# Version bumps only reach other workers through a shared cache; with a per-process
+# cache a snapshot can be stale in the other workers until it expires, so keep it short
+PRINCIPAL_CACHE_TIMEOUT = 60 * 60
+PRINCIPAL_LOCAL_CACHE_TIMEOUT = 30
+
+# Session key holding each role's profile id, in the order used when the session has no 'role'
+ROLE_SESSION_KEYS = {
+    'hr': 'hr_id',
+    'tl': 'tl_id',
+    'employee': 'employee_id',
+}
+
+ROLE_DISPLAY_NAMES = {
+    'hr': 'HR',
+    'tl': 'Team Leader',
+    'employee': 'Employee',
+}
+
+ROLE_MODELS = {
+    'hr': HRProfile,
+    'tl': TeamLeader,
+    'employee': Employee,
+}
+
+
+def _version_key(role, profile_id):
+    return f"principal_version:{role}:{profile_id}"
+
+
+def _snapshot_key(session_key):
+    return f"principal:{session_key}"
+
+
+def invalidate_principal(role, profile_id):
+    """Make every cached snapshot of this profile stale"""
+    key = _version_key(role, profile_id)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); a missing version is already "new"
+        cache.set(key, 1, None)
+
+
+class Principal:
+    """
+    Principal - the logged-in HR, employee or team leader for one request.
+
+    ``role`` is 'hr', 'employee', 'tl' or None for anonymous requests. For
+    team leaders ``team_member_ids`` lists their team; for employees
+    ``team_leader_ids`` lists the team leaders they are assigned to.
+    """
+
+    def __init__(self, role=None, id=None, name='', department='', image_url=None, company_id='',
+                 employee_id=None, team_member_ids=(), team_leader_ids=()):
+        self.role = role
+        self.id = id
+        self.name = name
+        self.department = department
+        self.image_url = image_url
+        self.company_id = company_id
+        self.employee_id = employee_id
+        self.team_member_ids = list(team_member_ids)
+        self.team_leader_ids = list(team_leader_ids)
+        self._profile = None
+
+    def __repr__(self):
+        return f"<Principal {self.role}:{self.id} {self.name}>"
+
+    @property
+    def is_authenticated(self):
+        return self.role is not None
+
+    @property
+    def role_display(self):
+        return ROLE_DISPLAY_NAMES.get(self.role, '')
+
+    @property
+    def is_hr(self):
+        return self.role == 'hr'
+
+    @property
+    def is_employee(self):
+        return self.role == 'employee'
+
+    @property
+    def is_team_leader(self):
+        return self.role == 'tl'
+
+    @property
+    def profile(self):
+        """The HRProfile / Employee / TeamLeader instance, fetched once per request"""
+        if self._profile is None:
+            model = ROLE_MODELS[self.role]
+            queryset = model.objects.select_related('employee') if self.role == 'tl' else model.objects
+            self._profile = queryset.get(id=self.id)
+        return self._profile
+
+    def to_snapshot(self):
+        return {
+            'role': self.role,
+            'id': self.id,
+            'name': self.name,
+            'department': self.department,
+            'image_url': self.image_url,
+            'company_id': self.company_id,
+            'employee_id': self.employee_id,
+            'team_member_ids': self.team_member_ids,
+            'team_leader_ids': self.team_leader_ids,
+        }
+
+    @classmethod
+    def from_profile(cls, role, profile):
+        """Build a principal (with its snapshot fields) from a freshly loaded profile"""
+        if role == 'hr':
+            principal = cls(
+                role=role,
+                id=profile.id,
+                name=profile.full_name,
+                department=profile.department,
+                image_url=profile.profile_image.url if profile.profile_image else None,
+                company_id=profile.employee_id,
+            )
+        else:
+            employee = profile.employee if role == 'tl' else profile
+            principal = cls(
+                role=role,
+                id=profile.id,
+                name=f"{employee.first_name} {employee.last_name}",
+                department=employee.department,
+                image_url=employee.image.url if employee.image else None,
+                company_id=employee.company_id,
+                employee_id=employee.id,
+            )
+            if role == 'tl':
+                principal.team_member_ids = list(
+                    TeamAssignment.objects.filter(team_leader_id=profile.id).values_list('employee_id', flat=True)
+                )
+            else:
+                principal.team_leader_ids = list(
+                    TeamAssignment.objects.filter(employee_id=employee.id).values_list('team_leader_id', flat=True)
+                )
+        principal._profile = profile
+        return principal
+
+
+ANONYMOUS = Principal()
+
+
+def _session_identity(session):
+    """(role, profile_id) for the session, preferring the role recorded at login"""
+    role = session.get('role')
+    if role in ROLE_SESSION_KEYS and session.get(ROLE_SESSION_KEYS[role]):
+        return role, session[ROLE_SESSION_KEYS[role]]
+    for role, session_key in ROLE_SESSION_KEYS.items():
+        if session.get(session_key):
+            return role, session[session_key]
+    return None, None
+
+
+def get_principal(request):
+    """Resolve the request's principal from the session, using the cached snapshot when it is current"""
+    role, profile_id = _session_identity(request.session)
+    if role is None:
+        return ANONYMOUS
+    try:
+        profile_id = int(profile_id)
+    except (TypeError, ValueError):
+        # Malformed or legacy session value: treat the request as anonymous rather than fail every page
+        return ANONYMOUS
+
+    session_key = request.session.session_key
+    version_key = _version_key(role, profile_id)
+
+    if session_key:
+        cached = cache.get_many([_snapshot_key(session_key), version_key])
+        snapshot = cached.get(_snapshot_key(session_key))
+        version = cached.get(version_key, 0)
+        if (snapshot and snapshot.get('version') == version
+                and snapshot['role'] == role and snapshot['id'] == profile_id):
+            snapshot = dict(snapshot)
+            snapshot.pop('version')
+            return Principal(**snapshot)
+    else:
+        version = cache.get(version_key, 0)
+
+    model = ROLE_MODELS[role]
+    queryset = model.objects.select_related('employee') if role == 'tl' else model.objects
+    try:
+        profile = queryset.get(id=profile_id)
+    except (model.DoesNotExist, ValueError):
+        return ANONYMOUS
+
+    principal = Principal.from_profile(role, profile)
+    if session_key:
+        cache.set(
+            _snapshot_key(session_key), dict(principal.to_snapshot(), version=version),
+            cache_timeout(PRINCIPAL_CACHE_TIMEOUT, PRINCIPAL_LOCAL_CACHE_TIMEOUT)
+        )
+    return principal
+
+
+def current_profile(request, model, profile_id):
+    """
+    ``model.objects.get(id=profile_id)`` that reuses the principal's profile when it
+    is the same record, so a request loads the logged-in profile at most once.
+    """
+    principal = getattr(request, 'principal', ANONYMOUS)
+    if principal.is_authenticated and ROLE_MODELS[principal.role] is model and str(principal.id) == str(profile_id):
+        return principal.profile
+    return model.objects.get(id=profile_id)
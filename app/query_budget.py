@@ -0,0 +1,111 @@
+"""
+SQL query recording for spotting N+1 patterns
+
+``QueryRecorder`` hooks ``connection.execute_wrapper`` so it works with DEBUG
+off, normalises each statement to a "shape" (literals and IN lists collapsed)
+and counts how often every shape ran. The query budget middleware and the
+``assert_query_budget`` test helper are both built on it.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_MAX_REPEATS = 10
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """Collapse literals and parameter lists so repeated queries compare equal"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Record every SQL statement run on the given database aliases.
+
+    Use as a context manager. Afterwards ``count`` is the number of queries,
+    ``total_time`` the seconds spent in the database and ``repeated()`` the
+    shapes that ran more than once.
+    """
+
+    def __init__(self, using=None):
+        self.using = using or list(connections)
+        self.queries = []
+        self._wrappers = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def __enter__(self):
+        for alias in self.using:
+            wrapper = connections[alias].execute_wrapper(self)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self._wrappers:
+            self._wrappers.pop().__exit__(*exc_info)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def shapes(self):
+        return Counter(query_shape(sql) for sql, _ in self.queries)
+
+    def repeated(self, threshold=2):
+        """[(shape, times)] for shapes run at least ``threshold`` times, most frequent first"""
+        return [(shape, times) for shape, times in self.shapes().most_common() if times >= threshold]
+
+    def violations(self, max_queries=DEFAULT_MAX_QUERIES, max_repeats=DEFAULT_MAX_REPEATS):
+        """Human readable list of budget violations (empty when within budget)"""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} queries (budget {max_queries})")
+        if max_repeats is not None:
+            for shape, times in self.repeated(max_repeats + 1):
+                problems.append(f"{times}x (budget {max_repeats}): {shape[:300]}")
+        return problems
+
+
+@contextmanager
+def assert_query_budget(max_queries=DEFAULT_MAX_QUERIES, max_repeats=DEFAULT_MAX_REPEATS, using=None):
+    """
+    Test helper: fail if the block runs more than ``max_queries`` statements or
+    repeats any single query shape more than ``max_repeats`` times.
+
+        with assert_query_budget(max_queries=15, max_repeats=2):
+            client.get('/hr-dashboard/')
+    """
+    with QueryRecorder(using=using) as recorder:
+        yield recorder
+    problems = recorder.violations(max_queries, max_repeats)
+    if problems:
+        raise QueryBudgetExceeded("Query budget exceeded:\n  " + "\n  ".join(problems))
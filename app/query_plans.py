@@ -0,0 +1,153 @@
+"""
+EXPLAIN checks for the hot dashboard, leave and payroll filters
+
+Each query registered with ``@hot_query`` returns a queryset shaped like one
+that app/views.py runs on every page load. ``explain()`` runs EXPLAIN on it and
+reports every table the planner would read in full, so the
+``check_query_plans`` command can fail when an index goes missing or stops
+being used.
+
+On PostgreSQL sequential scans are disabled for the check so small
+development tables still show which index the planner *can* use. MySQL and
+SQLite are checked as they plan.
+"""
+
+import json
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Attendance, Employee, LeaveApply, LeaveDay, Payroll
+
+
+HOT_QUERIES = {}
+
+# SQLite: "SCAN app_attendance" (a full table or full index walk) vs "SEARCH app_attendance USING INDEX ..."
+_SQLITE_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)")
+
+
+def hot_query(name):
+    """Register a function returning the queryset to EXPLAIN under ``name``"""
+    def register(build):
+        HOT_QUERIES[name] = build
+        return build
+    return register
+
+
+# ============================================================================
+# REGISTERED QUERIES
+# ============================================================================
+
+SAMPLE_DAY = date(2025, 1, 15)
+
+
+@hot_query('attendance_by_date_status')
+def _attendance_by_date_status():
+    # HR / TL dashboards: today's present, late and absent counts
+    return Attendance.objects.filter(attendance_date=SAMPLE_DAY, status='present')
+
+
+@hot_query('leave_pending_hr_approval')
+def _leave_pending_hr_approval():
+    # HR dashboard and leave approvals: TL-approved requests waiting for HR, newest first
+    return LeaveApply.objects.filter(status='pending', tl_approved=True).order_by('-applied_at')
+
+
+@hot_query('leave_employee_month')
+def _leave_employee_month():
+    # Employee dashboard: this month's pending / approved leave
+    return LeaveApply.objects.filter(
+        employee_id=1,
+        status__in=['approved', 'pending'],
+        start_date__gte=SAMPLE_DAY.replace(day=1),
+        start_date__lt=date(2025, 2, 1),
+    )
+
+
+@hot_query('leave_day_overlap')
+def _leave_day_overlap():
+    # Leave application: pending / approved leave days inside the requested range
+    return LeaveDay.objects.filter(employee_id=1, date__gte=SAMPLE_DAY, date__lte=date(2025, 1, 17))
+
+
+@hot_query('leave_days_month')
+def _leave_days_month():
+    # Payroll and leave approvals: approved (unpaid) leave days falling in a month
+    return LeaveDay.objects.filter(
+        date__gte=SAMPLE_DAY.replace(day=1), date__lte=date(2025, 1, 31), status='approved', leave_type='unpaid'
+    )
+
+
+@hot_query('payroll_by_month')
+def _payroll_by_month():
+    # analytics.payroll_by_month: one grouped read over the last n months
+    return Payroll.objects.filter(period__gte=date(2024, 2, 1), period__lte=SAMPLE_DAY.replace(day=1))
+
+
+@hot_query('payroll_employee_month')
+def _payroll_employee_month():
+    # Salary processing: the payroll row for one employee and month
+    return Payroll.objects.filter(employee_id=1, month='January 2025', year=2025)
+
+
+@hot_query('employee_resigned_since')
+def _employee_resigned_since():
+    # Reports: employees who left during a period
+    since = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    return Employee.objects.filter(resigned_date__isnull=False, resigned_date__gte=since)
+
+
+@hot_query('employee_directory_page')
+def _employee_directory_page():
+    # HR employee directory: a later keyset page within one department, newest first
+    after = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    return Employee.objects.filter(department='IT').filter(
+        Q(created_at__lt=after) | Q(created_at=after, id__lt=100)
+    ).order_by('-created_at', '-id')[:51]
+
+
+# ============================================================================
+# PLAN INSPECTION
+# ============================================================================
+
+def _walk(node):
+    """Every dict inside a decoded JSON plan"""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def explain(queryset, using='default'):
+    """(plan text, [fully scanned tables]) for ``queryset``"""
+    connection = connections[using]
+    queryset = queryset.using(using)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain(format='json')
+        scans = [node.get('Relation Name') for node in _walk(json.loads(plan)) if node.get('Node Type') == 'Seq Scan']
+    elif connection.vendor == 'mysql':
+        plan = queryset.explain(format='json')
+        scans = [node.get('table_name') for node in _walk(json.loads(plan)) if node.get('access_type') == 'ALL']
+    else:
+        plan = queryset.explain()
+        scans = _SQLITE_SCAN.findall(plan)
+    return plan, scans
+
+
+def check_hot_queries(names=None, using='default'):
+    """[(name, plan, fully scanned tables)] for the registered queries (all of them unless ``names``)"""
+    results = []
+    for name, build in HOT_QUERIES.items():
+        if names and name not in names:
+            continue
+        plan, scans = explain(build(), using)
+        results.append((name, plan, scans))
+    return results
@@ -0,0 +1,270 @@
+"""
+Server push for chat and project discussion events
+
+``hub`` keeps the in-process subscriptions: each open event stream subscribes
+to a few channels (its own user channel and the projects it belongs to) and
+receives events on an asyncio queue. Events are published through the backend
+named by ``REALTIME_BACKEND``:
+
+* ``LocalBackend`` delivers straight to this process's hub. It is the default
+  and the stand-in used by the development server and tests.
+* ``RedisBackend`` publishes to Redis pub/sub; a listener thread in every
+  process that holds streams feeds what it receives into that process's hub,
+  so an event published by any gunicorn or daphne process reaches streams held
+  by all of them. The listener starts with the first subscription and
+  resubscribes after a lost connection; events published while it is down are
+  missed, and clients catch up through /chat-sync/.
+
+The stream itself (``chat_stream`` view) is an async Server-Sent Events
+response served by the ASGI process (daphne hrms.asgi:application, the
+``stream`` entry in the Procfile and docker-compose), which nginx routes
+/chat-stream/ to. Under a sync WSGI worker every open stream would hold a
+worker, so the view refuses with 503 there.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger('app.realtime')
+
+# Events buffered per stream before it is told to resync instead
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+# Seconds between Redis resubscribe attempts, doubling up to the maximum
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+def user_channel(role, profile_id):
+    return f"user:{role}:{profile_id}"
+
+
+def project_channel(project_id):
+    return f"project:{project_id}"
+
+
+class Subscription:
+    """One open stream's queue; events may be put from any thread"""
+
+    def __init__(self, hub, channels, loop):
+        self.hub = hub
+        self.channels = tuple(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put_threadsafe(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client; drop events and ask it to resync through /chat-sync/
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """In-process channel -> subscriptions registry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channels):
+        """Subscribe the running event loop to ``channels``; call from async code"""
+        # Only processes that hold streams need to receive cross-worker events
+        try:
+            get_backend().start()
+        except Exception:
+            # Streams still get events published by this process
+            logger.exception("Failed to start realtime backend listener")
+        subscription = Subscription(self, channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_threadsafe(event)
+            except RuntimeError:
+                # Event loop already closed; the stream is going away
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscriptions.get(channel, ()))
+            return len({sub for subs in self._subscriptions.values() for sub in subs})
+
+
+hub = Hub()
+
+
+# ============================================================================
+# CROSS-WORKER BACKENDS
+# ============================================================================
+
+class LocalBackend:
+    """Deliver events to this process only (development server, tests)"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, channel, event):
+        self.hub.dispatch(channel, event)
+
+
+class RedisBackend:
+    """
+    Fan events out to every worker through Redis pub/sub.
+
+    Each process runs one listener thread on a pattern subscription covering
+    all channels; it is started by the first ``hub.subscribe``. Requires the
+    ``redis`` package and ``REALTIME_REDIS_URL``.
+    """
+
+    prefix = 'hrms:realtime:'
+
+    def __init__(self, hub):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBackend requires the 'redis' package")
+        url = getattr(settings, 'REALTIME_REDIS_URL', None)
+        if not url:
+            raise ImproperlyConfigured("RedisBackend requires REALTIME_REDIS_URL")
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self._connection_errors = (redis.ConnectionError, redis.TimeoutError)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def start(self):
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='realtime-redis-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.prefix + '*')
+                delay = RECONNECT_MIN_DELAY
+                for message in pubsub.listen():
+                    self._dispatch(message)
+            except self._connection_errors:
+                logger.warning("Realtime Redis connection lost, resubscribing in %.0fs", delay, exc_info=True)
+            except Exception:
+                logger.exception("Realtime Redis listener failed, resubscribing in %.0fs", delay)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _dispatch(self, message):
+        try:
+            channel = message['channel'].decode()[len(self.prefix):]
+            self.hub.dispatch(channel, json.loads(message['data']))
+        except (ValueError, KeyError, AttributeError):
+            logger.warning("Ignoring malformed realtime message: %r", message)
+
+    def publish(self, channel, event):
+        self.client.publish(self.prefix + channel, json.dumps(event))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_path = getattr(settings, 'REALTIME_BACKEND', 'app.realtime.LocalBackend')
+            _backend = import_string(backend_path)(hub)
+        return _backend
+
+
+def publish(channel, event):
+    """Publish ``event`` (a JSON-serialisable dict with a 'type') to every subscriber of ``channel``"""
+    try:
+        get_backend().publish(channel, event)
+    except Exception:
+        # Push is best effort: clients still catch up through /chat-sync/
+        logger.exception("Failed to publish realtime event to %s", channel)
+
+
+# ============================================================================
+# SERVER-SENT EVENTS
+# ============================================================================
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_events(channels, initial_events=(), heartbeat=15.0, retry_ms=5000):
+    """
+    Async iterator of SSE frames for a StreamingHttpResponse.
+
+    Subscribes when iteration starts (so the queue belongs to the loop that
+    streams the response) and unsubscribes when the client goes away.
+    """
+    subscription = hub.subscribe(channels)
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        for event in initial_events:
+            yield format_sse(event['type'], event)
+        while True:
+            try:
+                event = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield format_sse('resync', {'type': 'resync'})
+            yield format_sse(event['type'], event)
+    finally:
+        subscription.close()
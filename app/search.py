@@ -0,0 +1,207 @@
+"""
+Full-text search for team chat and project discussions
+
+An inverted index (``SearchToken``: term -> message, with a weight) is kept in
+the default database and updated from post_save signals, so searching is a
+grouped lookup on the term index instead of an ``icontains`` scan of every
+message. Queries match all of their words; the last word is treated as a
+prefix while it is still being typed. Results are ranked by summed term
+weight (subject matches count triple), newest first on ties.
+"""
+
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.utils.html import escape
+
+from .models import SearchToken, TeamChat, ProjectDiscussion
+
+
+TERM_MAX_LENGTH = 64
+SUBJECT_WEIGHT = 3
+MAX_QUERY_TERMS = 8
+
+# Past this many matches the total is reported as an estimate
+COUNT_CAP = 1000
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have i if in is it its me my no not of on or our so
+    that the their them then there these they this to us was we were what when which who will with you your
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+# Model -> (SearchToken foreign key, [(text field, weight)])
+INDEXED_FIELDS = {
+    TeamChat: ('team_chat', [('subject', SUBJECT_WEIGHT), ('message', 1)]),
+    ProjectDiscussion: ('discussion', [('subject', SUBJECT_WEIGHT), ('content', 1)]),
+}
+
+
+def tokenize(text):
+    """Lower-cased index terms of ``text`` (stop words and single characters dropped)"""
+    return [
+        word[:TERM_MAX_LENGTH]
+        for word in _WORD.findall((text or '').lower())
+        if len(word) > 1 and word not in STOP_WORDS
+    ]
+
+
+def document_terms(instance):
+    """{term: weight} for one TeamChat / ProjectDiscussion"""
+    _, fields = INDEXED_FIELDS[type(instance)]
+    weights = Counter()
+    for field, weight in fields:
+        for term in tokenize(getattr(instance, field)):
+            weights[term] += weight
+    return dict(weights)
+
+
+# ============================================================================
+# INDEX MAINTENANCE
+# ============================================================================
+
+def index_document(instance, update_fields=None):
+    """Bring one message's index entries in line with its text (no writes when unchanged)"""
+    token_field, fields = INDEXED_FIELDS[type(instance)]
+    if update_fields is not None and not {field for field, _ in fields} & set(update_fields):
+        return
+
+    wanted = document_terms(instance)
+    tokens = SearchToken.objects.filter(**{token_field: instance})
+    if dict(tokens.values_list('term', 'weight')) == wanted:
+        return
+
+    with transaction.atomic():
+        tokens.delete()
+        SearchToken.objects.bulk_create([
+            SearchToken(term=term, weight=weight, **{token_field: instance})
+            for term, weight in wanted.items()
+        ])
+
+
+def rebuild_index(model, batch_size=500):
+    """Re-index every row of ``model`` from scratch; returns the number of documents indexed"""
+    token_field, fields = INDEXED_FIELDS[model]
+    SearchToken.objects.filter(**{f'{token_field}__isnull': False}).delete()
+
+    indexed = 0
+    pending = []
+    for instance in model.objects.only('id', *[field for field, _ in fields]).order_by('id').iterator(chunk_size=batch_size):
+        pending.extend(
+            SearchToken(term=term, weight=weight, **{f'{token_field}_id': instance.id})
+            for term, weight in document_terms(instance).items()
+        )
+        indexed += 1
+        if len(pending) >= batch_size:
+            SearchToken.objects.bulk_create(pending, batch_size=batch_size)
+            pending = []
+    SearchToken.objects.bulk_create(pending, batch_size=batch_size)
+    return indexed
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def parse_query(text):
+    """
+    (exact_terms, prefix) for the search box text. The last word is a prefix
+    unless the text ends with whitespace (the user finished typing it).
+    """
+    text = text or ''
+    terms = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TERMS]
+    words = _WORD.findall(text.lower())
+    prefix = None
+    if terms and words and not text[-1:].isspace() and words[-1][:TERM_MAX_LENGTH] == terms[-1]:
+        prefix = terms.pop()
+        if prefix in terms:
+            prefix = None
+    return terms, prefix
+
+
+def search_documents(model, scope, text, offset=0, limit=20, select_related=()):
+    """
+    Rank ``model`` rows matching ``text`` within ``scope`` (a Q over SearchToken).
+
+    Returns (documents, total, total_is_estimate, (exact_terms, prefix)).
+    """
+    exact_terms, prefix = parse_query(text)
+    if not exact_terms and not prefix:
+        return [], 0, False, (exact_terms, prefix)
+
+    token_field, _ = INDEXED_FIELDS[model]
+    document_column = f'{token_field}_id'
+
+    match = Q(term__in=exact_terms) if exact_terms else Q()
+    annotations = {'score': Sum('weight')}
+    if exact_terms:
+        annotations['exact_hits'] = Count('term', distinct=True, filter=Q(term__in=exact_terms))
+    if prefix:
+        match = (match | Q(term__startswith=prefix)) if exact_terms else Q(term__startswith=prefix)
+        annotations['prefix_hits'] = Count('id', filter=Q(term__startswith=prefix))
+
+    matches = SearchToken.objects.filter(match, scope, **{f'{token_field}__isnull': False}).values(
+        document_column
+    ).annotate(**annotations)
+    if exact_terms:
+        matches = matches.filter(exact_hits=len(exact_terms))
+    if prefix:
+        matches = matches.filter(prefix_hits__gt=0)
+
+    page = list(matches.order_by('-score', f'-{document_column}')[offset:offset + limit])
+
+    if len(page) < limit and (page or offset == 0):
+        total, is_estimate = offset + len(page), False
+    else:
+        capped = matches.order_by()[:COUNT_CAP + 1].count()
+        total, is_estimate = min(capped, COUNT_CAP), capped > COUNT_CAP
+
+    ids = [row[document_column] for row in page]
+    documents = model.objects.select_related(*select_related).in_bulk(ids)
+    ordered = [documents[document_id] for document_id in ids if document_id in documents]
+    return ordered, total, is_estimate, (exact_terms, prefix)
+
+
+def search_team_chat(role, profile_id, text, offset=0, limit=20):
+    """Messages the participant sent or received that match ``text``"""
+    if role == 'employee':
+        scope = Q(team_chat__sender_employee_id=profile_id) | Q(team_chat__receiver_employee_id=profile_id)
+    else:
+        scope = Q(team_chat__sender_tl_id=profile_id) | Q(team_chat__receiver_tl_id=profile_id)
+    return search_documents(
+        TeamChat, scope, text, offset, limit,
+        select_related=('sender_employee', 'sender_tl__employee', 'receiver_employee', 'receiver_tl__employee')
+    )
+
+
+def search_project_discussions(project_ids, text, offset=0, limit=20):
+    """Project discussion messages in ``project_ids`` that match ``text``"""
+    scope = Q(discussion__project_id__in=project_ids)
+    return search_documents(
+        ProjectDiscussion, scope, text, offset, limit,
+        select_related=('sender_employee', 'sender_tl__employee')
+    )
+
+
+def highlight(text, exact_terms, prefix=None):
+    """HTML-escape ``text`` and wrap the words matching the query in <mark>"""
+    if not text:
+        return text
+    alternatives = [re.escape(term) + r'\b' for term in exact_terms]
+    if prefix:
+        alternatives.append(re.escape(prefix) + r'\w*')
+    if not alternatives:
+        return escape(text)
+
+    pattern = re.compile(r'\b(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+    parts = []
+    last = 0
+    for found in pattern.finditer(text):
+        parts.append(escape(text[last:found.start()]))
+        parts.append(f'<mark>{escape(found.group())}</mark>')
+        last = found.end()
+    parts.append(escape(text[last:]))
+    return ''.join(parts)
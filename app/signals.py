@@ -0,0 +1,232 @@
+"""
+Model signal handlers for keeping derived tables in sync
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .attendance import invalidate_attendance_calendar
+from .chat import notify_chat_message, notify_project_discussion
+from .fragments import bump_generation, bump_employees
+from .models import (
+    Attendance, DailyAttendanceRollup, PresentRecord, AbsentRecord, LateMarkRecord,
+    HRProfile, Employee, TeamLeader, TeamAssignment, TeamChat, ProjectDiscussion,
+    LeaveApply, LeaveBalanceLedger, LeaveDay, Announcement,
+)
+from .principal import invalidate_principal
+from .search import index_document
+
+
+# ============================================================================
+# DAILY ATTENDANCE ROLLUPS
+# ============================================================================
+
+@receiver(pre_save, sender=Attendance)
+def remember_attendance_rollup_bucket(sender, instance, **kwargs):
+    """Capture the row's current (date, department, status) before it changes"""
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = Attendance.objects.filter(pk=instance.pk).values_list(
+            'attendance_date', 'employee__department', 'status'
+        ).first()
+
+
+@receiver(post_save, sender=Attendance)
+def update_attendance_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the row between rollup buckets only when date, department or status changed"""
+    if raw:
+        return
+
+    current = (instance.attendance_date, instance.employee.department, instance.status)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous == current:
+        return
+
+    if previous:
+        DailyAttendanceRollup.apply(*previous, delta=-1)
+    DailyAttendanceRollup.apply(*current, delta=1)
+
+
+@receiver(post_delete, sender=Attendance)
+def update_attendance_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted attendance row from its rollup bucket"""
+    try:
+        department = instance.employee.department
+    except Attendance.employee.RelatedObjectDoesNotExist:
+        # Employee already removed by a cascade - the rollup rebuild will catch up
+        return
+    DailyAttendanceRollup.apply(instance.attendance_date, department, instance.status, delta=-1)
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_department(sender, instance, raw=False, **kwargs):
+    """Capture the employee's stored department before it changes"""
+    instance._previous_department = None
+    if instance.pk and not raw:
+        instance._previous_department = Employee.objects.filter(pk=instance.pk).values_list(
+            'department', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Employee)
+def move_attendance_rollups_on_department_change(sender, instance, created, raw=False, **kwargs):
+    """Move the employee's existing attendance rows to the new department's rollup buckets"""
+    previous = getattr(instance, '_previous_department', None)
+    if raw or created or previous is None or previous == instance.department:
+        return
+    DailyAttendanceRollup.move_employee(instance.pk, previous, instance.department)
+
+
+# ============================================================================
+# LEAVE BALANCE LEDGER AND LEAVE DAYS
+# ============================================================================
+
+@receiver(pre_save, sender=LeaveApply)
+def remember_previous_leave(sender, instance, raw=False, **kwargs):
+    """Capture (and lock) the leave's stored row before it changes"""
+    instance._previous_leave = None
+    if instance.pk and not raw:
+        instance._previous_leave = LeaveApply.objects.select_for_update().filter(pk=instance.pk).only(
+            'employee', 'start_date', 'end_date', 'leave_type', 'status', 'total_days', 'half_day'
+        ).first()
+
+
+@receiver(post_save, sender=LeaveApply)
+def update_leave_ledger_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the leave between ledger buckets when it is approved, rejected, cancelled or modified"""
+    if raw:
+        return
+
+    current = LeaveBalanceLedger.bucket(instance)
+    previous_leave = getattr(instance, '_previous_leave', None)
+    previous = LeaveBalanceLedger.bucket(previous_leave) if previous_leave else None
+    if previous == current:
+        return
+
+    if previous:
+        LeaveBalanceLedger.apply(*previous, delta=-1)
+    LeaveBalanceLedger.apply(*current, delta=1)
+
+
+@receiver(post_delete, sender=LeaveApply)
+def update_leave_ledger_on_delete(sender, instance, **kwargs):
+    LeaveBalanceLedger.apply(*LeaveBalanceLedger.bucket(instance), delta=-1)
+
+
+@receiver(post_save, sender=LeaveApply)
+def update_leave_days_on_save(sender, instance, raw=False, **kwargs):
+    """Expand the leave into LeaveDay rows while it is pending or approved (rows cascade on delete)"""
+    if not raw:
+        LeaveDay.sync(instance, previous=getattr(instance, '_previous_leave', None))
+
+
+# ============================================================================
+# CACHED ATTENDANCE CALENDARS
+# ============================================================================
+
+@receiver(post_save, sender=PresentRecord)
+@receiver(post_save, sender=AbsentRecord)
+@receiver(post_save, sender=LateMarkRecord)
+@receiver(post_delete, sender=PresentRecord)
+@receiver(post_delete, sender=AbsentRecord)
+@receiver(post_delete, sender=LateMarkRecord)
+def invalidate_cached_attendance_calendar(sender, instance, **kwargs):
+    """Back-dated or edited records must not be hidden by a cached past month"""
+    invalidate_attendance_calendar(instance.employee_id, instance.attendance_date)
+
+
+
+# ============================================================================
+# CACHED PRINCIPAL SNAPSHOTS
+# ============================================================================
+
+@receiver(post_save, sender=HRProfile)
+@receiver(post_delete, sender=HRProfile)
+def invalidate_hr_principal(sender, instance, **kwargs):
+    invalidate_principal('hr', instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_principal(sender, instance, **kwargs):
+    invalidate_principal('employee', instance.pk)
+    # A team leader's name, department and image come from their employee record
+    for tl_id in TeamLeader.objects.filter(employee_id=instance.pk).values_list('id', flat=True):
+        invalidate_principal('tl', tl_id)
+
+
+@receiver(post_save, sender=TeamLeader)
+@receiver(post_delete, sender=TeamLeader)
+def invalidate_team_leader_principal(sender, instance, **kwargs):
+    invalidate_principal('tl', instance.pk)
+
+
+@receiver(post_save, sender=TeamAssignment)
+@receiver(post_delete, sender=TeamAssignment)
+def invalidate_team_principals(sender, instance, **kwargs):
+    """Team ids are part of both the leader's and the member's snapshot"""
+    invalidate_principal('tl', instance.team_leader_id)
+    invalidate_principal('employee', instance.employee_id)
+
+
+# ============================================================================
+# CHAT PUSH EVENTS
+# ============================================================================
+
+@receiver(post_save, sender=TeamChat)
+def push_new_team_chat(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notify_chat_message(instance)
+
+
+@receiver(post_save, sender=ProjectDiscussion)
+def push_new_project_discussion(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notify_project_discussion(instance)
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+@receiver(post_save, sender=TeamChat)
+@receiver(post_save, sender=ProjectDiscussion)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index a message when its subject or text changes (index rows cascade on delete)"""
+    if not raw:
+        index_document(instance, update_fields)
+
+
+# ============================================================================
+# DASHBOARD FRAGMENT GENERATIONS
+# ============================================================================
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=LeaveApply)
+@receiver(post_delete, sender=LeaveApply)
+def bump_employee_dashboard(sender, instance, raw=False, **kwargs):
+    """The employee's own widgets and their team leaders' team widgets read these rows"""
+    if not raw:
+        bump_employees([instance.employee_id])
+
+
+@receiver(post_save, sender=Employee)
+def bump_employee_teams(sender, instance, raw=False, **kwargs):
+    """Team widgets show member names"""
+    if not raw:
+        bump_employees([instance.pk])
+
+
+@receiver(post_save, sender=TeamAssignment)
+@receiver(post_delete, sender=TeamAssignment)
+def bump_team_dashboard(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_generation('team', instance.team_leader_id)
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def bump_announcements(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_generation('announcements')
@@ -0,0 +1,145 @@
+"""
+Bulk generation of MonthlyAttendanceSummary rows
+
+Computes summaries for every requested employee in a month from three grouped
+queries (attendance, the leave balance ledger, late-arrival approvals) and
+upserts them against the (employee, month, year) unique constraint.
+"""
+
+import time
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from django.db import connection
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Attendance, AttendanceApproval, Employee, LeaveBalanceLedger, MonthlyAttendanceSummary
+from .payroll import MONTH_NAMES, UNPAID_LEAVE_TYPES, WORKING_DAYS_PER_MONTH, month_date_range
+
+
+# 10% of a day's salary per late arrival
+LATE_ARRIVAL_DEDUCTION_RATE = 0.1
+
+SUMMARY_FIELDS = [
+    'total_working_days', 'present_days', 'absent_days', 'half_days', 'late_arrivals',
+    'approved_leaves', 'unpaid_leaves', 'weekend_days', 'total_worked_hours',
+    'salary_deduction_for_absences', 'salary_deduction_for_half_days',
+    'salary_deduction_for_late_arrivals', 'period', 'updated_at',
+]
+
+
+def working_and_weekend_days(month, year):
+    """Working days (Monday to Saturday) and Sundays in a month"""
+    month_num = MONTH_NAMES.index(month) + 1
+    _, num_days = monthrange(year, month_num)
+    weekend_days = sum(1 for day in range(1, num_days + 1) if date(year, month_num, day).weekday() == 6)
+    return num_days - weekend_days, weekend_days
+
+
+def generate_monthly_summaries(month, year, employees=None):
+    """
+    Generate (or refresh) monthly attendance summaries in bulk.
+
+    ``employees`` defaults to every active employee. Summaries that are already
+    finalized are left untouched. Returns a dict with ``generated``,
+    ``skipped_finalized`` and ``elapsed_seconds``.
+    """
+    started = time.monotonic()
+    month_start, month_end = month_date_range(month, year)
+    working_days, weekend_days = working_and_weekend_days(month, year)
+
+    if employees is None:
+        employees = Employee.objects.filter(resigned_date__isnull=True)
+
+    finalized_ids = set(MonthlyAttendanceSummary.objects.filter(
+        month=month, year=year, is_finalized=True
+    ).values_list('employee_id', flat=True))
+
+    candidates = list(employees.only('id', 'package').order_by('id'))
+    employees = [employee for employee in candidates if employee.id not in finalized_ids]
+    employee_ids = [employee.id for employee in employees]
+
+    attendance = {
+        row['employee_id']: row
+        for row in Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            attendance_date__gte=month_start,
+            attendance_date__lte=month_end
+        ).values('employee_id').annotate(
+            present_days=Count('id', filter=Q(status__in=['present', 'late'])),
+            half_days=Count('id', filter=Q(status='half_day')),
+            absent_days=Count('id', filter=Q(status='absent')),
+            worked_hours=Sum('total_worked_hours'),
+        ).order_by()
+    }
+
+    leaves = {
+        row['employee_id']: row
+        for row in LeaveBalanceLedger.objects.filter(
+            employee_id__in=employee_ids,
+            period=month_start,
+        ).values('employee_id').annotate(
+            total=Sum('approved_count'),
+            unpaid=Coalesce(Sum('approved_count', filter=Q(leave_type__in=UNPAID_LEAVE_TYPES)), 0),
+        ).order_by()
+    }
+
+    # Late arrivals come from TL approval records reviewed during the month
+    review_start = timezone.make_aware(datetime.combine(month_start, datetime.min.time()))
+    review_end = review_start + timedelta(days=(month_end - month_start).days + 1)
+    late_arrivals = dict(
+        AttendanceApproval.objects.filter(
+            attendance__employee_id__in=employee_ids,
+            is_late_arrival=True,
+            reviewed_at__gte=review_start,
+            reviewed_at__lt=review_end
+        ).values('attendance__employee_id').annotate(
+            count=Count('id')
+        ).values_list('attendance__employee_id', 'count').order_by()
+    )
+
+    summaries = []
+    for employee in employees:
+        counts = attendance.get(employee.id, {})
+        leave_counts = leaves.get(employee.id, {})
+        late = late_arrivals.get(employee.id, 0)
+
+        daily_salary = float(employee.package) / WORKING_DAYS_PER_MONTH
+        absent_days = counts.get('absent_days', 0)
+        half_days = counts.get('half_days', 0)
+        unpaid = leave_counts.get('unpaid', 0)
+
+        summaries.append(MonthlyAttendanceSummary(
+            employee_id=employee.id,
+            month=month,
+            year=year,
+            period=month_start,
+            total_working_days=working_days,
+            present_days=counts.get('present_days', 0),
+            absent_days=absent_days,
+            half_days=half_days,
+            late_arrivals=late,
+            approved_leaves=leave_counts.get('total', 0) - unpaid,
+            unpaid_leaves=unpaid,
+            weekend_days=weekend_days,
+            total_worked_hours=round(float(counts.get('worked_hours') or 0), 2),
+            salary_deduction_for_absences=round(absent_days * daily_salary, 2),
+            salary_deduction_for_half_days=round(half_days * daily_salary / 2, 2),
+            salary_deduction_for_late_arrivals=round(late * daily_salary * LATE_ARRIVAL_DEDUCTION_RATE, 2),
+        ))
+
+    # MySQL's ON DUPLICATE KEY UPDATE picks the conflicting key itself and rejects unique_fields
+    upsert_options = {'update_conflicts': True, 'update_fields': SUMMARY_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        upsert_options['unique_fields'] = ['employee', 'month', 'year']
+    MonthlyAttendanceSummary.objects.bulk_create(summaries, batch_size=500, **upsert_options)
+
+    return {
+        'month': month,
+        'year': year,
+        'generated': len(summaries),
+        'skipped_finalized': len(candidates) - len(employees),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
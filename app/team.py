@@ -0,0 +1,158 @@
+"""
+Team-scoped batch loader for the team leader views
+
+``TeamSnapshot.load`` reads a team and every per-member metric the TL pages
+show - the attendance row for one day, attendance counts and leave totals
+over a date range, and the approved leave-type breakdown - in a fixed number
+of grouped queries, whatever the team size:
+
+    1. the team's assignments with their employees
+    2. the attendance rows for ``day``
+    3. attendance counts per member over [start, end] (skipped when the
+       range is ``day`` itself; counted from query 2 instead)
+    4. leave counts and days per member, leave type and status for leaves
+       overlapping [start, end] (only with ``leaves=True``)
+
+The result is a list of compact ``MemberSnapshot`` records in team order.
+"""
+
+from django.db.models import Count, Sum
+
+from .checkin import PRESENT_STATUSES
+from .models import Attendance, LeaveApply, TeamAssignment
+
+
+def team_employee_ids(tl_id):
+    """Employee ids of the team led by ``tl_id``, without loading the employees"""
+    return list(TeamAssignment.objects.filter(team_leader_id=tl_id).values_list('employee_id', flat=True))
+
+
+class MemberSnapshot:
+    """One team member's metrics for a TeamSnapshot"""
+
+    __slots__ = (
+        'assignment', 'employee', 'attendance',
+        'present_days', 'half_days', 'absent_days',
+        'approved_leaves', 'approved_leave_days', 'pending_leaves', 'leave_types',
+    )
+
+    def __init__(self, assignment):
+        self.assignment = assignment
+        self.employee = assignment.employee
+        self.attendance = None          # Attendance row for the snapshot day, if any
+        self.present_days = 0           # present / late / half day rows in the range
+        self.half_days = 0
+        self.absent_days = 0
+        self.approved_leaves = 0
+        self.approved_leave_days = 0
+        self.pending_leaves = 0
+        self.leave_types = {}           # leave_type -> {'count', 'days'} for approved leaves
+
+    @property
+    def status(self):
+        """Attendance status for the snapshot day (None when no row exists)"""
+        return self.attendance.status if self.attendance else None
+
+
+class TeamSnapshot:
+    """Per-member attendance and leave metrics for one team and date range"""
+
+    def __init__(self, tl_id, start, end, day, members):
+        self.tl_id = tl_id
+        self.start = start
+        self.end = end
+        self.day = day
+        self.members = members
+        self._by_employee = {member.employee.id: member for member in members}
+
+    @classmethod
+    def load(cls, tl_id, start, end, day=None, leaves=True):
+        """
+        Load the team led by ``tl_id``. ``day`` (default ``end``) is the day
+        whose attendance rows are attached to the members; ``leaves=False``
+        skips the leave query for pages that only show attendance.
+        """
+        day = day or end
+        assignments = TeamAssignment.objects.filter(team_leader_id=tl_id).select_related('employee').order_by(
+            'employee__first_name', 'employee_id'
+        )
+        members = [MemberSnapshot(assignment) for assignment in assignments]
+        snapshot = cls(tl_id, start, end, day, members)
+        if not members:
+            return snapshot
+
+        employee_ids = list(snapshot._by_employee)
+        for attendance in Attendance.objects.filter(employee_id__in=employee_ids, attendance_date=day):
+            member = snapshot._by_employee[attendance.employee_id]
+            attendance.employee = member.employee
+            member.attendance = attendance
+
+        if start == end == day:
+            for member in members:
+                snapshot._count_status(member, member.status, 1)
+        else:
+            rows = Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                attendance_date__gte=start,
+                attendance_date__lte=end,
+            ).values('employee_id', 'status').annotate(days=Count('id')).order_by()
+            for row in rows:
+                snapshot._count_status(snapshot._by_employee[row['employee_id']], row['status'], row['days'])
+
+        if leaves:
+            rows = LeaveApply.objects.filter(
+                employee_id__in=employee_ids,
+                start_date__lte=end,
+                end_date__gte=start,
+            ).values('employee_id', 'leave_type', 'status').annotate(
+                count=Count('id'), days=Sum('total_days')
+            ).order_by()
+            for row in rows:
+                member = snapshot._by_employee[row['employee_id']]
+                if row['status'] == 'approved':
+                    member.approved_leaves += row['count']
+                    member.approved_leave_days += row['days'] or 0
+                    member.leave_types[row['leave_type']] = {'count': row['count'], 'days': row['days'] or 0}
+                elif row['status'] == 'pending':
+                    member.pending_leaves += row['count']
+
+        return snapshot
+
+    @staticmethod
+    def _count_status(member, status, days):
+        if status in PRESENT_STATUSES:
+            member.present_days += days
+        if status == 'half_day':
+            member.half_days += days
+        elif status == 'absent':
+            member.absent_days += days
+
+    def member(self, employee_id):
+        return self._by_employee.get(employee_id)
+
+    @property
+    def employee_ids(self):
+        return list(self._by_employee)
+
+    @property
+    def assignments(self):
+        return [member.assignment for member in self.members]
+
+    @property
+    def total_members(self):
+        return len(self.members)
+
+    @property
+    def present_today(self):
+        """Members present, late or on a half day on ``day``"""
+        return sum(1 for member in self.members if member.status in PRESENT_STATUSES)
+
+    @property
+    def absent_today(self):
+        """Members marked absent on ``day``"""
+        return sum(1 for member in self.members if member.status == 'absent')
+
+    @property
+    def unmarked_today(self):
+        """Members with no attendance row for ``day``"""
+        return sum(1 for member in self.members if member.attendance is None)
@@ -1,3 +1,470 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .jobs import claim_next_job, enqueue, heartbeat, requeue_stale_jobs
+from .models import (
+    Attendance, BackgroundJob, DailyAttendanceRollup, Employee, HRProfile, LeaveApply, NotificationOutbox, Payroll,
+    PayrollDeduction, TeamAssignment, TeamChat, TeamLeader,
+)
+from .notifications import Dispatcher, purge_finished, queue_email
+from .payroll import calculate_employee_payroll, calculate_month_payroll
+from .principal import ANONYMOUS, get_principal
+from .query_budget import assert_query_budget
+from .realtime import LocalBackend, format_sse, hub, publish, sse_events, user_channel
+from .team import TeamSnapshot
+
+
+def make_employee(index, department='IT', **fields):
+    return Employee.objects.create(
+        first_name=f'Test{index}',
+        last_name='Employee',
+        email=f'test{index}@example.com',
+        password='test',
+        company_id=f'TEST{index:04d}',
+        designation='Engineer',
+        department=department,
+        package=fields.pop('package', Decimal('520000')),
+        **fields
+    )
+
+
+def session_client(**session_values):
+    """Test client logged in the way the login views do it: ids and role in the session"""
+    client = Client()
+    session = client.session
+    session.update(session_values)
+    session.save()
+    client.cookies['sessionid'] = session.session_key
+    return client
+
+
+# ============================================================================
+# DAILY ATTENDANCE ROLLUPS
+# ============================================================================
+
+def rollup_state():
+    """Non-empty rollup buckets as comparable tuples (signal updates leave zeroed rows behind)"""
+    return sorted(
+        DailyAttendanceRollup.objects.filter(total_count__gt=0).values_list(
+            'date', 'department', 'present_count', 'absent_count', 'half_day_count', 'late_count', 'total_count'
+        )
+    )
+
+
+class AttendanceRollupSignalTests(TestCase):
+    """Signal-maintained rollups must always equal a rebuild from Attendance"""
+
+    def setUp(self):
+        self.employee = make_employee(1, department='IT')
+        self.colleague = make_employee(2, department='IT')
+
+    def assertRollupsMatchRebuild(self):
+        maintained = rollup_state()
+        DailyAttendanceRollup.rebuild()
+        self.assertEqual(maintained, rollup_state())
+
+    def test_create_and_change_status(self):
+        attendance = Attendance.objects.create(employee=self.employee, attendance_date=date(2025, 3, 3), status='present')
+        Attendance.objects.create(employee=self.colleague, attendance_date=date(2025, 3, 3), status='late')
+        self.assertRollupsMatchRebuild()
+
+        attendance.status = 'half_day'
+        attendance.save()
+        self.assertRollupsMatchRebuild()
+        bucket = DailyAttendanceRollup.objects.get(date=date(2025, 3, 3), department='IT')
+        self.assertEqual((bucket.present_count, bucket.half_day_count, bucket.late_count, bucket.total_count), (0, 1, 1, 2))
+
+    def test_change_date(self):
+        attendance = Attendance.objects.create(employee=self.employee, attendance_date=date(2025, 3, 3), status='absent')
+        attendance.attendance_date = date(2025, 3, 4)
+        attendance.save()
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(DailyAttendanceRollup.objects.get(date=date(2025, 3, 4), department='IT').absent_count, 1)
+
+    def test_delete(self):
+        attendance = Attendance.objects.create(employee=self.employee, attendance_date=date(2025, 3, 3), status='present')
+        Attendance.objects.create(employee=self.colleague, attendance_date=date(2025, 3, 3), status='present')
+        attendance.delete()
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(DailyAttendanceRollup.objects.get(date=date(2025, 3, 3), department='IT').present_count, 1)
+
+    def test_department_change_moves_existing_rows(self):
+        first = Attendance.objects.create(employee=self.employee, attendance_date=date(2025, 3, 3), status='present')
+        Attendance.objects.create(employee=self.employee, attendance_date=date(2025, 3, 4), status='absent')
+        Attendance.objects.create(employee=self.colleague, attendance_date=date(2025, 3, 3), status='present')
+
+        self.employee.department = 'HR'
+        self.employee.save()
+        self.assertRollupsMatchRebuild()
+
+        # Later edits and deletes of the moved rows land in the new department's buckets
+        first.refresh_from_db()
+        first.status = 'late'
+        first.save()
+        self.assertRollupsMatchRebuild()
+        Attendance.objects.filter(employee=self.employee, attendance_date=date(2025, 3, 4)).get().delete()
+        self.assertRollupsMatchRebuild()
+
+        self.assertEqual(DailyAttendanceRollup.objects.get(date=date(2025, 3, 3), department='IT').present_count, 1)
+        self.assertEqual(DailyAttendanceRollup.objects.get(date=date(2025, 3, 3), department='HR').late_count, 1)
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+class StaleJobRequeueTests(TestCase):
+    """Only jobs whose run_jobs owner stopped sending heartbeats go back to the queue"""
+
+    def test_live_long_running_job_is_not_requeued(self):
+        live = enqueue('export_employees')
+        dead = enqueue('export_employees')
+        self.assertEqual(claim_next_job('host-a:1').id, live.id)
+        self.assertEqual(claim_next_job('host-b:2').id, dead.id)
+
+        # Both started long ago; only host-a is still beating
+        long_ago = timezone.now() - timedelta(hours=3)
+        BackgroundJob.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+        self.assertEqual(heartbeat('host-a:1', [live.id, dead.id]), 1)
+
+        self.assertEqual(requeue_stale_jobs(timezone.now() - timedelta(minutes=5)), 1)
+        live.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual((live.status, live.claimed_by), ('running', 'host-a:1'))
+        self.assertEqual((dead.status, dead.claimed_by, dead.heartbeat_at), ('queued', '', None))
+
+
+# ============================================================================
+# PAYROLL
+# ============================================================================
+
+class PayrollCalculationTests(TestCase):
+    """The batch payroll path must produce exactly what single-employee runs do"""
+
+    def setUp(self):
+        self.employees = [
+            make_employee(11, package=Decimal('520000')),
+            make_employee(12, package=Decimal('780000')),
+            make_employee(13, package=Decimal('390000')),
+        ]
+        for employee in self.employees[:2]:
+            Attendance.objects.create(employee=employee, attendance_date=date(2025, 3, 3), status='half_day')
+            Attendance.objects.create(employee=employee, attendance_date=date(2025, 3, 4), status='absent')
+            Attendance.objects.create(employee=employee, attendance_date=date(2025, 3, 5), status='present')
+            # Unpaid leave crossing into April: 3 of its 5 days fall in March
+            LeaveApply.objects.create(
+                employee=employee, leave_type='unpaid', start_date=date(2025, 3, 29), end_date=date(2025, 4, 2),
+                total_days=5, reason='Travel', status='approved',
+            )
+        Attendance.objects.create(employee=self.employees[1], attendance_date=date(2025, 3, 6), status='absent')
+        self.employee_ids = [employee.id for employee in self.employees]
+
+    def batch(self):
+        return calculate_month_payroll('March', 2025, 'Test HR', employees=Employee.objects.filter(id__in=self.employee_ids))
+
+    def outcome(self, employee):
+        payroll = Payroll.objects.get(employee=employee, month='March', year=2025)
+        deductions = sorted(
+            PayrollDeduction.objects.filter(payroll=payroll).values_list('deduction_type', 'amount', 'units_deducted')
+        )
+        return payroll.final_salary, payroll.leave_deduction, payroll.half_day_deduction, deductions
+
+    def test_batch_matches_single_employee_runs(self):
+        self.batch()
+        batch_outcomes = {employee.id: self.outcome(employee) for employee in self.employees}
+
+        Payroll.objects.all().delete()
+        for employee in self.employees:
+            calculate_employee_payroll(employee, 'March', 2025, 'Test HR')
+            self.assertEqual(self.outcome(employee), batch_outcomes[employee.id])
+
+        unpaid = PayrollDeduction.objects.get(employee=self.employees[0], deduction_type='unpaid_leave')
+        self.assertEqual(unpaid.units_deducted, 3)
+        absent = PayrollDeduction.objects.get(employee=self.employees[1], deduction_type='absent')
+        self.assertEqual(absent.units_deducted, 2)
+        self.assertFalse(PayrollDeduction.objects.filter(employee=self.employees[2], deduction_type='unpaid_leave').exists())
+
+    def test_rerun_updates_in_place_and_keeps_allowances(self):
+        first = calculate_employee_payroll(self.employees[0], 'March', 2025, 'Test HR', allowances='1500', overtime_amount='250')
+        self.batch()
+        deduction_count = PayrollDeduction.objects.count()
+        self.batch()
+
+        self.assertEqual(Payroll.objects.filter(month='March', year=2025).count(), 3)
+        self.assertEqual(PayrollDeduction.objects.count(), deduction_count)
+        payroll = Payroll.objects.get(employee=self.employees[0], month='March', year=2025)
+        self.assertEqual(payroll.pk, first.pk)
+        self.assertEqual((payroll.allowances, payroll.overtime_amount), (Decimal('1500.00'), Decimal('250.00')))
+        self.assertEqual(payroll.period, date(2025, 3, 1))
+        other = Payroll.objects.get(employee=self.employees[1], month='March', year=2025)
+        self.assertEqual((other.allowances, other.overtime_amount), (Decimal('0.00'), Decimal('0.00')))
+
+    def test_new_payroll_ids_recovered_when_bulk_create_returns_none(self):
+        # MySQL has no INSERT ... RETURNING, so bulk_create leaves primary keys unset
+        bulk_create = Payroll.objects.bulk_create
+
+        def bulk_create_without_pks(objs, **kwargs):
+            created = bulk_create(objs, **kwargs)
+            for payroll in objs:
+                payroll.pk = None
+            return created
+
+        with mock.patch.object(Payroll.objects, 'bulk_create', bulk_create_without_pks):
+            summary = self.batch()
+
+        self.assertEqual(
+            sorted(payroll.pk for payroll in summary['payrolls']),
+            sorted(Payroll.objects.filter(month='March', year=2025).values_list('pk', flat=True)),
+        )
+        for payroll in summary['payrolls']:
+            self.assertTrue(PayrollDeduction.objects.filter(payroll_id=payroll.pk, employee_id=payroll.employee_id).exists())
+
+    def test_period_follows_month_edits(self):
+        self.batch()
+        payroll = Payroll.objects.get(employee=self.employees[0], month='March', year=2025)
+        self.assertEqual(payroll.period, date(2025, 3, 1))
+
+        payroll.month = 'April'
+        payroll.save()
+        self.assertEqual(Payroll.objects.get(pk=payroll.pk).period, date(2025, 4, 1))
+
+
+# ============================================================================
+# QUERY BUDGETS
+# ============================================================================
+
+class QueryBudgetTests(TestCase):
+    """Per-member and per-employee data must load in a fixed number of queries (no N+1)"""
+
+    TEAM_SIZE = 12
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        leader = make_employee(100)
+        self.team_leader = TeamLeader.objects.create(employee=leader, experience_years=5, team_size=str(self.TEAM_SIZE))
+        for index in range(self.TEAM_SIZE):
+            member = make_employee(101 + index)
+            TeamAssignment.objects.create(team_leader=self.team_leader, employee=member, role='Engineer', assignment_date=self.today)
+            Attendance.objects.create(employee=member, attendance_date=self.today, status=['present', 'late', 'absent'][index % 3])
+            LeaveApply.objects.create(
+                employee=member, leave_type='sick', start_date=self.today, end_date=self.today,
+                total_days=1, reason='Unwell', status=['approved', 'pending'][index % 2],
+            )
+
+    def test_team_snapshot_load(self):
+        with assert_query_budget(max_queries=4, max_repeats=1):
+            snapshot = TeamSnapshot.load(self.team_leader.id, self.today.replace(day=1), self.today)
+        self.assertEqual(snapshot.total_members, self.TEAM_SIZE)
+
+    def test_tl_dashboard(self):
+        client = session_client(tl_id=self.team_leader.id, role='tl')
+        with assert_query_budget(max_queries=15, max_repeats=2):
+            response = client.get('/tl-dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_hr_dashboard(self):
+        hr = HRProfile.objects.create(
+            full_name='Test HR', employee_id='HR0001', email='hr@example.com', mobile='9999999999',
+            designation='HR Manager', department='HR', date_of_joining=date(2024, 1, 1),
+            work_location='Office', username='testhr', password='test',
+        )
+        client = session_client(hr_id=hr.id, role='hr', hr_name=hr.full_name)
+        with assert_query_budget(max_queries=20, max_repeats=2):
+            response = client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+
+# ============================================================================
+# CHAT SYNC
+# ============================================================================
+
+class ChatSyncTests(TestCase):
+    """Following sync cursors must deliver every change exactly once"""
+
+    def setUp(self):
+        self.team_leader = TeamLeader.objects.create(employee=make_employee(300), experience_years=5, team_size='1')
+        self.member = make_employee(301)
+        self.client = session_client(role='employee', employee_id=self.member.id)
+
+    def send(self, message='Hello'):
+        return TeamChat.objects.create(
+            sender_employee=self.team_leader.employee, sender_tl=self.team_leader,
+            receiver_employee=self.member, message=message
+        )
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        data = self.client.get('/chat-sync/', params).json()
+        self.assertTrue(data['success'], data)
+        return data
+
+    def test_cursor_round_trip_edits_and_deletes(self):
+        head = self.sync()
+        self.assertEqual(head['messages'], [])
+
+        chat = self.send()
+        first = self.sync(head['cursor'])
+        self.assertEqual([message['id'] for message in first['messages']], [chat.id])
+        self.assertEqual(self.sync(first['cursor'])['messages'], [])
+
+        chat.message = 'Hello, edited'
+        chat.save()
+        edited = self.sync(first['cursor'])
+        self.assertEqual([message['message'] for message in edited['messages']], ['Hello, edited'])
+
+        chat.status = 'archived'
+        chat.save()
+        archived = self.sync(edited['cursor'])
+        self.assertEqual([message['status'] for message in archived['messages']], ['archived'])
+
+        chat.delete()
+        self.assertEqual(self.sync(archived['cursor'])['messages'], [])
+
+    def test_late_commit_is_delivered(self):
+        head = self.sync()
+        chat = self.send()
+        first = self.sync(head['cursor'])
+
+        # Committed after the first sync, stamped before it
+        late = self.send('Slow transaction')
+        TeamChat.objects.filter(pk=late.pk).update(updated_at=chat.updated_at - timedelta(seconds=2))
+        second = self.sync(first['cursor'])
+        self.assertEqual([message['id'] for message in second['messages']], [late.id])
+        self.assertEqual(self.sync(second['cursor'])['messages'], [])
+
+    def test_burst_with_one_timestamp_pages_forward(self):
+        cursor = self.sync()['cursor']
+        chats = [self.send(f'Message {index}') for index in range(250)]
+        TeamChat.objects.update(updated_at=timezone.now())
+
+        delivered = []
+        while True:
+            page = self.sync(cursor, limit=100)
+            delivered += [message['id'] for message in page['messages']]
+            cursor = page['cursor']
+            if not page['has_more']:
+                break
+        self.assertEqual(delivered, [chat.id for chat in chats])
+
+    def test_invalid_cursor(self):
+        data = self.client.get('/chat-sync/', {'cursor': 'not-a-cursor'}).json()
+        self.assertEqual(data, {'success': False, 'error': 'Invalid cursor'})
+
+
+# ============================================================================
+# REALTIME
+# ============================================================================
+
+@mock.patch('app.realtime._backend', LocalBackend(hub))
+class LocalBackendStreamTests(SimpleTestCase):
+
+    async def test_published_event_reaches_stream(self):
+        channel = user_channel('employee', 7)
+        stream = sse_events([channel], heartbeat=5.0)
+        self.assertEqual(await anext(stream), "retry: 5000\n\n")
+        self.assertEqual(hub.subscriber_count(channel), 1)
+
+        event = {'type': 'chat_message', 'id': 42}
+        publish(user_channel('employee', 8), {'type': 'chat_message', 'id': 41})
+        publish(channel, event)
+        self.assertEqual(await asyncio.wait_for(anext(stream), 1.0), format_sse('chat_message', event))
+
+        await stream.aclose()
+        self.assertEqual(hub.subscriber_count(channel), 0)
+
+
+# ============================================================================
+# NOTIFICATION OUTBOX
+# ============================================================================
+
+class NotificationOutboxTests(TestCase):
+    """Outbox rows must never keep credentials once written"""
+
+    def setUp(self):
+        self.hr = HRProfile.objects.create(
+            full_name='Test HR', employee_id='HR0001', email='hr@example.com', mobile='9000000000',
+            designation='HR Manager', department='HR', date_of_joining=date(2025, 1, 1), work_location='Nagpur',
+            username='testhr', password='s3cret-pass',
+        )
+
+    def queue_welcome(self):
+        return queue_email(
+            'hr_welcome', [self.hr.email], subject='Welcome', template='email/hr_profile_email.html',
+            context={'hr_id': self.hr.id},
+        )
+
+    def test_credentials_rendered_at_send_time_only(self):
+        notification = self.queue_welcome()
+        self.assertEqual(Dispatcher().dispatch_batch(), (1, 0))
+
+        self.assertIn('s3cret-pass', mail.outbox[0].alternatives[0][0])
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.context), ('sent', {}))
+
+    def test_missing_profile_fails_without_traceback(self):
+        notification = self.queue_welcome()
+        self.hr.delete()
+        with self.assertLogs('app.notifications', 'WARNING'):
+            self.assertEqual(Dispatcher().dispatch_batch(), (0, 1))
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'failed')
+        self.assertTrue(notification.last_error.startswith('DoesNotExist: '))
+        self.assertNotIn('Traceback', notification.last_error)
+
+    def test_purge_finished(self):
+        old, recent, pending = self.queue_welcome(), self.queue_welcome(), self.queue_welcome()
+        now = timezone.now()
+        NotificationOutbox.objects.filter(pk=old.pk).update(status='sent', sent_at=now - timedelta(days=40))
+        NotificationOutbox.objects.filter(pk=recent.pk).update(status='sent', sent_at=now - timedelta(days=2))
+        NotificationOutbox.objects.filter(pk=pending.pk).update(next_attempt_at=now - timedelta(days=40))
+
+        self.assertEqual(purge_finished(now - timedelta(days=30)), 1)
+        self.assertEqual(set(NotificationOutbox.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+
+
+# ============================================================================
+# METRICS ENDPOINT
+# ============================================================================
+
+class MetricsAccessTests(TestCase):
+
+    def test_only_loopback_without_token(self):
+        self.assertEqual(Client(REMOTE_ADDR='127.0.0.1').get('/metrics').status_code, 200)
+        # A load balancer or docker bridge forwards every public request from a private address
+        self.assertEqual(Client(REMOTE_ADDR='172.17.0.1').get('/metrics').status_code, 403)
+        self.assertEqual(Client(REMOTE_ADDR='10.0.0.5').get('/metrics', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_token_required_when_set(self):
+        self.assertEqual(Client(REMOTE_ADDR='127.0.0.1').get('/metrics').status_code, 403)
+        self.assertEqual(
+            Client(REMOTE_ADDR='10.0.0.5').get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200
+        )
+
+
+# ============================================================================
+# PRINCIPAL
+# ============================================================================
+
+class PrincipalTests(TestCase):
+
+    def test_malformed_session_id_is_anonymous(self):
+        for value in ['not-a-number', ['7'], {'id': 7}]:
+            request = mock.Mock()
+            request.session = session_client(role='employee', employee_id=value).session
+            self.assertIs(get_principal(request), ANONYMOUS)
+
+    def test_session_id_resolves_profile(self):
+        employee = make_employee(200)
+        request = mock.Mock()
+        request.session = session_client(role='employee', employee_id=str(employee.id)).session
+        principal = get_principal(request)
+        self.assertEqual((principal.role, principal.id), ('employee', employee.id))
@@ -106,6 +106,8 @@ urlpatterns = [
     # Employee Attendance URLs
     path('employee-check-in/', views.employee_attendance_simple, name='employee-check-in'),
     path('employee-check-out/', views.employee_check_out, name='employee-check-out'),
+    path('api/attendance/check/', views.attendance_check_api, name='attendance-check-api'),
+    path('api/employees/', views.employee_directory_api, name='employee-directory-api'),
 
     # Team Leader Attendance Management URLs
     path('tl-attendance-management/', views.tl_attendance_management, name='tl-attendance-management'),
@@ -131,7 +133,18 @@ urlpatterns = [
     path('mark-messages-read/', views.mark_messages_read, name='mark-messages-read'),
     path('chat-reaction/', views.chat_reaction, name='chat-reaction'),
     path('get-unread-count/', views.get_unread_count, name='get-unread-count'),
+    path('chat-sync/', views.sync_team_chat, name='chat-sync'),
+    path('chat-stream/', views.chat_stream, name='chat-stream'),
     path('chat-search/', views.chat_search, name='chat-search'),
+    path('project-discussion-search/', views.project_discussion_search, name='project-discussion-search'),
+    
+    # ============================================================================
+    # BACKGROUND JOB URLS
+    # ============================================================================
+    
+    path('jobs/enqueue/', views.enqueue_background_job, name='job-enqueue'),
+    path('jobs/<int:job_id>/', views.background_job_status, name='job-status'),
+    path('jobs/<int:job_id>/download/', views.download_job_result, name='job-download'),
     
     # ============================================================================
     # ENHANCED ATTENDANCE SYSTEM URLS
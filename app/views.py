@@ -1,24 +1,53 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.contrib.auth import authenticate
 from functools import wraps
-from .models import Employee, HRProfile, Payroll, TeamLeader, TeamAssignment, ProjectAssignment, Announcement, Attendance, ProjectTask, ProjectMilestone, ProjectDiscussion, LeaveApply, LeaveApproval, MonthlyAttendanceSummary, AttendanceApproval, PayrollDeduction, SalaryProcessing, AttendanceCheckLog, TeamChat, ChatReaction, TeamChatSettings, PresentRecord, AbsentRecord, LateMarkRecord, DailyWorkCompletion
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from .models import Employee, HRProfile, Payroll, TeamLeader, TeamAssignment, ProjectAssignment, Announcement, Attendance, ProjectTask, ProjectMilestone, ProjectDiscussion, LeaveApply, LeaveApproval, LeaveBalanceLedger, LeaveDay, MonthlyAttendanceSummary, AttendanceApproval, PayrollDeduction, SalaryProcessing, AttendanceCheckLog, DailyAttendanceRollup, BackgroundJob, TeamChat, ChatReaction, TeamChatSettings, PresentRecord, AbsentRecord, LateMarkRecord, DailyWorkCompletion
 from django.db import models
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as XLImage 
 import os
 from .models import HRProfile, Employee, TeamLeader, Announcement, LeaveApply
 from django.utils import timezone
 from django.db.models import Sum, Avg, Count, Q
-from django.core.mail import send_mail
-from django.utils.html import strip_tags
-from django.template.loader import render_to_string
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from datetime import datetime, timedelta, time
 import requests
 from calendar import monthrange, month_name, month_name
+from .analytics import attendance_by_month, payroll_by_month, headcount_by_month
+from .exports import streaming_xlsx_response, employee_export, payroll_export
+from .jobs import enqueue as enqueue_job
+from .payroll import calculate_employee_payroll, calculate_month_payroll
+from .summaries import generate_monthly_summaries
+from .principal import current_profile
+from .chat import (
+    serialize_chat_message, serialize_project_discussion, chat_changes, chat_unread_count, mark_chat_read,
+    record_unread_message, chat_stream_channels, notify_unread_count, unread_event,
+    InvalidCursor, SYNC_DEFAULT_LIMIT, SYNC_MAX_LIMIT,
+)
+from .realtime import sse_events
+from .search import search_team_chat, search_project_discussions, highlight
+from .notifications import queue_email
+from .dashboards import (
+    announcements_widget, employee_attendance_widget, employee_leave_widget,
+    team_attendance_widget, team_leave_widget,
+)
+from .checkin import (
+    check_in, check_out, today_status, recent_attendance, attendance_counts, hours_between,
+    OFFICIAL_START_TIME, REQUIRED_WORK_HOURS, AUTO_CHECKOUT_TIME,
+)
+from .attendance import (
+    build_attendance_calendar, build_attendance_matrix, attendance_status_counts,
+    attendance_range_summary, paginate_attendance_employees, dates_between, page_numbers_for,
+)
+from .team import TeamSnapshot, team_employee_ids
+from .directory import (
+    directory_page, department_facets, serialize_directory_employee,
+    DIRECTORY_DEFAULT_LIMIT, DIRECTORY_MAX_LIMIT,
+)
 
 
 ###################### Authentication Decorator & Views ###########################################
@@ -38,13 +67,8 @@ def login_required_with_exemptions(exempt_urls=[]):
             if url_name in exempt_urls:
                 return view_func(request, *args, **kwargs)
             
-            # Check if user is logged in by checking session variables for any role
-            hr_id = request.session.get('hr_id')
-            employee_id = request.session.get('employee_id')
-            tl_id = request.session.get('tl_id')
-            
-            # If no valid session, redirect to login
-            if not (hr_id or employee_id or tl_id):
+            # Logged in when the session resolves to an existing HR, employee or team leader
+            if not request.principal.is_authenticated:
                 # Add a flag to prevent redirect loops
                 if not hasattr(request, 'is_login_redirect'):
                     request.is_login_redirect = True
@@ -87,39 +111,15 @@ def logout_confirmation(request):
         messages.error(request, "You are not logged in.")
         return redirect('login')
     
-    # Get user information for display
+    # Get user information for display from the cached principal snapshot
     user_info = {}
-    if hr_id:
-        try:
-            hr = HRProfile.objects.get(id=hr_id)
-            user_info = {
-                'name': hr.full_name,
-                'role': 'HR',
-                'employee_id': hr.employee_id
-            }
-        except HRProfile.DoesNotExist:
-            pass
-    elif employee_id:
-        try:
-            emp = Employee.objects.get(id=employee_id)
-            user_info = {
-                'name': f"{emp.first_name} {emp.last_name}",
-                'role': 'Employee',
-                'employee_id': emp.company_id
-            }
-        except Employee.DoesNotExist:
-            pass
-    elif tl_id:
-        try:
-            tl = TeamLeader.objects.get(id=tl_id)
-            emp = tl.employee
-            user_info = {
-                'name': f"{emp.first_name} {emp.last_name}",
-                'role': 'Team Leader',
-                'employee_id': emp.company_id
-            }
-        except TeamLeader.DoesNotExist:
-            pass
+    principal = request.principal
+    if principal.is_authenticated:
+        user_info = {
+            'name': principal.name,
+            'role': principal.role_display,
+            'employee_id': principal.company_id
+        }
     
     # Handle POST request - perform actual logout
     if request.method == "POST":
@@ -431,18 +431,21 @@ def hr_dashboard(request):
 
     total_employees = Employee.objects.count()
 
-    present_today = Attendance.objects.filter(
-        attendance_date=today,
-        status__in=['present', 'half_day', 'late']
-    ).count()
+    # Today's attendance comes from the precomputed rollup table (one row per department)
+    today_rollup = DailyAttendanceRollup.objects.filter(date=today).aggregate(
+        present=Sum('present_count'),
+        half_day=Sum('half_day_count'),
+        late=Sum('late_count'),
+        total=Sum('total_count'),
+    )
+
+    present_today = (today_rollup['present'] or 0) + (today_rollup['half_day'] or 0) + (today_rollup['late'] or 0)
 
     active_employees = Employee.objects.filter(
         resigned_date__isnull=True
     ).count()
 
-    employees_with_attendance_today = Attendance.objects.filter(
-        attendance_date=today
-    ).count()
+    employees_with_attendance_today = today_rollup['total'] or 0
 
     absent_today = max(0, active_employees - employees_with_attendance_today)
 
@@ -483,35 +486,16 @@ def hr_dashboard(request):
 
     # ==================== MONTHLY ATTENDANCE ====================
 
-    monthly_attendance_data = []
-
-    for i in range(5, -1, -1):
-        month_date = current_date.replace(day=1) - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-
-        if month_start.month == 12:
-            month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
-
-        month_attendance = Attendance.objects.filter(
-            attendance_date__gte=month_start,
-            attendance_date__lte=month_end
-        )
-
-        present_count = month_attendance.filter(status__in=['present', 'half_day', 'late']).count()
-        absent_count = month_attendance.filter(status='absent').count()
-        total_records = month_attendance.count()
-
-        attendance_rate = round((present_count / max(total_records, 1)) * 100, 1)
-
-        monthly_attendance_data.append({
-            'month': month_start.strftime('%b %Y'),
-            'present': present_count,
-            'absent': absent_count,
-            'attendance_rate': attendance_rate,
-            'total_records': total_records
-        })
+    monthly_attendance_data = [
+        {
+            'month': month['month_start'].strftime('%b %Y'),
+            'present': month['present'],
+            'absent': month['absent'],
+            'attendance_rate': month['attendance_rate'],
+            'total_records': month['total']
+        }
+        for month in attendance_by_month(6, today)
+    ]
 
     # ==================== QUICK ACTIONS ====================
 
@@ -675,12 +659,8 @@ def employee_dashboard(request):
     # Get employee ID from session
     employee_id = request.session.get('employee_id')
     
-    # Get recent announcements for Employee dashboard
-    recent_announcements = Announcement.objects.filter(
-        status='published'
-    ).filter(
-        Q(expiry_date__isnull=True) | Q(expiry_date__gte=timezone.now().date())
-    ).order_by('-created_at')[:5]
+    # Get recent announcements for Employee dashboard (cached until an announcement changes)
+    recent_announcements = announcements_widget(timezone.now().date())
     
     # Initialize default values with clear fallbacks
     working_days_this_month = 22  # Default working days
@@ -721,7 +701,7 @@ def employee_dashboard(request):
     try:
         # Get employee object with error handling
         try:
-            employee_obj = Employee.objects.get(id=employee_id)
+            employee_obj = current_profile(request, Employee, employee_id)
         except Employee.DoesNotExist:
             from django.contrib import messages
             messages.error(request, "Employee profile not found. Please login again.")
@@ -729,8 +709,6 @@ def employee_dashboard(request):
         
         # Get current time and date information
         now = timezone.now()
-        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = (current_month + timedelta(days=32)).replace(day=1)
         today = now.date()
         
         # ===== EMPLOYEE BASIC INFO =====
@@ -738,7 +716,7 @@ def employee_dashboard(request):
         team_assignment = TeamAssignment.objects.filter(employee=employee_obj).select_related('team_leader').first()
         
         # ===== TODAY'S ATTENDANCE =====
-        # Get today's attendance record with approval status
+        # Live (not cached): worked hours depend on the current time
         today_attendance = Attendance.objects.filter(
             employee=employee_obj,
             attendance_date=today
@@ -763,125 +741,20 @@ def employee_dashboard(request):
                 remaining_hours = round(max(0, 8.0 - worked_hours), 2)
                 can_check_out = worked_hours >= 8.0
         
-        # ===== ATTENDANCE DATA FOR CURRENT MONTH =====
-        # Get current month attendance records
-        current_month_attendance = Attendance.objects.filter(
-            employee=employee_obj,
-            attendance_date__gte=current_month,
-            attendance_date__lt=next_month
-        )
-        
-        # Calculate present and half days
-        present_days = current_month_attendance.filter(
-            status__in=['present', 'late']
-        ).count()
-        
-        half_days = current_month_attendance.filter(
-            status='half_day'
-        ).count()
-        
-        present_this_month = present_days + half_days  # Include half days as present
-        
-        # Calculate working days for current month (Monday to Saturday)
-        year = now.year
-        month = now.month
-        _, num_days = monthrange(year, month)
-        
-        working_days = 0
-        for day in range(1, num_days + 1):
-            date_obj = now.replace(year=year, month=month, day=day)
-            if date_obj.weekday() < 6:  # Monday to Saturday (0-5)
-                working_days += 1
-        working_days_this_month = working_days
-        
-        # Calculate attendance rate
-        if working_days_this_month > 0:
-            attendance_rate = round((present_this_month / working_days_this_month) * 100, 1)
-        else:
-            attendance_rate = 0.0
-        
-        # ===== RECENT ATTENDANCE RECORDS =====
-        # Get recent attendance records (last 10 for better display)
-        recent_attendance = Attendance.objects.filter(
-            employee=employee_obj
-        ).select_related('approval').order_by('-attendance_date')[:10]
-        
-        # ===== LEAVE DATA =====
-        # Get pending leave requests
-        pending_leaves = LeaveApply.objects.filter(
-            employee=employee_obj,
-            status='pending'
-        ).count()
-        
-        # Get recent leave applications
-        recent_leave_applications = LeaveApply.objects.filter(
-            employee=employee_obj
-        ).order_by('-applied_at')[:5]
-        
-        # ===== ENHANCED LEAVE STATISTICS =====
-        # Monthly leave statistics
-        monthly_leaves = LeaveApply.objects.filter(
-            employee=employee_obj,
-            start_date__gte=current_month,
-            start_date__lt=next_month,
-            status__in=['approved', 'pending']
-        )
-        
-        # Calculate leave usage for current month
-        leaves_used_this_month = sum([leave.total_days for leave in monthly_leaves])
-        max_leaves_per_month = 10  # Policy: 10 days per month
-        remaining_leaves = max(0, max_leaves_per_month - leaves_used_this_month)
-        
-        # Get approved and pending leave days
-        approved_leaves_this_month = monthly_leaves.filter(status='approved')
-        total_leave_days_approved = sum([leave.total_days for leave in approved_leaves_this_month])
-        pending_leave_days = sum([leave.total_days for leave in monthly_leaves.filter(status='pending')])
-        
-        # Calculate yearly statistics
-        current_year = now.year
-        yearly_leaves = LeaveApply.objects.filter(
-            employee=employee_obj,
-            start_date__year=current_year,
-            status='approved'
-        )
-        
-        total_approved_days = sum([leave.total_days for leave in yearly_leaves])
-        
-        # Get leave type distribution for current year
-        leave_type_stats = {}
-        for leave_type, leave_type_display in LeaveApply.LEAVE_TYPE_CHOICES:
-            type_leaves = yearly_leaves.filter(leave_type=leave_type)
-            type_count = type_leaves.count()
-            type_days = sum([leave.total_days for leave in type_leaves])
-            if type_count > 0:  # Only include leave types that have been used
-                leave_type_stats[leave_type_display] = {
-                    'count': type_count,
-                    'days': type_days
-                }
-        
-        # Recent leave activity (last 30 days)
-        last_30_days = now - timedelta(days=30)
-        recent_leave_activity = LeaveApply.objects.filter(
-            employee=employee_obj,
-            applied_at__gte=last_30_days
-        )
-        
-        # Next approved leave date
-        next_leave = monthly_leaves.filter(status='approved').order_by('start_date').first()
-        next_leave_date = next_leave.start_date if next_leave else None
-        
-        # Update leave statistics
-        leave_statistics = {
-            'leaves_used_this_month': leaves_used_this_month,
-            'max_leaves_per_month': max_leaves_per_month,
-            'remaining_leaves': remaining_leaves,
-            'total_leave_days_approved': total_leave_days_approved,
-            'pending_leave_days': pending_leave_days,
-            'total_approved_days_year': total_approved_days,
-            'leave_type_stats': leave_type_stats,
-            'recent_activity_count': recent_leave_activity.count(),
-            'next_leave_date': next_leave_date,
-        }
+        # ===== ATTENDANCE DATA FOR CURRENT MONTH (cached per employee generation) =====
+        attendance_widget = employee_attendance_widget(employee_obj.id, today)
+        present_days = attendance_widget['present_days']
+        half_days = attendance_widget['half_days']
+        present_this_month = attendance_widget['present_this_month']
+        working_days_this_month = attendance_widget['working_days_this_month']
+        attendance_rate = attendance_widget['attendance_rate']
+        recent_attendance = attendance_widget['recent_attendance']
+        
+        # ===== LEAVE DATA (cached per employee generation) =====
+        leave_widget = employee_leave_widget(employee_obj.id, today)
+        pending_leaves = leave_widget['pending_leaves']
+        recent_leave_applications = leave_widget['recent_leave_applications']
+        leave_statistics = leave_widget['leave_statistics']
         
     except Exception as e:
         # Log error and keep default values
@@ -892,7 +765,7 @@ def employee_dashboard(request):
     # Prepare context with all data
     context = {
         'recent_announcements': recent_announcements,
-        'announcements_count': recent_announcements.count(),
+        'announcements_count': len(recent_announcements),
         'working_days_this_month': working_days_this_month,
         'present_this_month': present_this_month,
         'attendance_rate': attendance_rate,
@@ -928,7 +801,7 @@ def employee_attendance(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         
@@ -1001,20 +874,14 @@ def employee_apply_leave(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
-        current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month = (current_month + timedelta(days=32)).replace(day=1)
+        employee = current_profile(request, Employee, employee_id)
+        today = timezone.now().date()
+        current_month = today.replace(day=1)
         
-        # Calculate leave statistics for current month
-        monthly_leaves = LeaveApply.objects.filter(
-            employee=employee,
-            start_date__gte=current_month,
-            start_date__lt=next_month,
-            status__in=['approved', 'pending']  # Count both pending and approved
+        # Get leave balance: pending and approved leave days falling in this month (LeaveDay rows)
+        leaves_taken_this_month = LeaveDay.days_between(
+            current_month, current_month.replace(day=monthrange(today.year, today.month)[1]), employee=employee
         )
-        
-        # Get leave balance (calculate based on total days)
-        leaves_taken_this_month = sum([leave.total_days for leave in monthly_leaves])
         max_leaves_per_month = 10  # Policy: 10 days per month
         remaining_leaves = max_leaves_per_month - leaves_taken_this_month
         
@@ -1023,16 +890,10 @@ def employee_apply_leave(request):
             employee=employee
         ).order_by('-applied_at')[:10]
         
-        # Calculate statistics
-        total_approved = LeaveApply.objects.filter(
-            employee=employee,
-            status='approved'
-        ).count()
-        
-        total_pending = LeaveApply.objects.filter(
-            employee=employee,
-            status='pending'
-        ).count()
+        # Calculate statistics from the balance ledger
+        ledger = LeaveBalanceLedger.totals(employee=employee)
+        total_approved = ledger['approved_count']
+        total_pending = ledger['pending_count']
         
         # ==============================
         # POST REQUEST (SUBMIT LEAVE APPLICATION or CANCEL REQUEST)
@@ -1087,12 +948,11 @@ def employee_apply_leave(request):
                         messages.error(request, f"Monthly leave limit exceeded. You have already used {leaves_taken_this_month} days this month and are requesting {total_days} more days (limit: {max_leaves_per_month} days).")
                         return redirect('apply-leave')
                     
-                    # Check for overlapping leave requests
-                    overlapping_leaves = LeaveApply.objects.filter(
+                    # Check for overlapping leave requests (any pending / approved leave day in the range)
+                    overlapping_leaves = LeaveDay.objects.filter(
                         employee=employee,
-                        status__in=['pending', 'approved'],
-                        start_date__lte=end_date,
-                        end_date__gte=start_date
+                        date__gte=start_date,
+                        date__lte=end_date
                     )
                     
                     if overlapping_leaves.exists():
@@ -1165,7 +1025,7 @@ def employee_payslip(request):
     
     try:
         # Get employee object
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get all payroll records for this employee, ordered by most recent first
         payroll_records = Payroll.objects.filter(employee=employee).order_by('-created_at')
@@ -1240,7 +1100,7 @@ def employee_profile(request):
     
     try:
         # Fetch employee data from database
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get additional data if needed (attendance, payroll, etc.)
         recent_attendance = Attendance.objects.filter(
@@ -1415,7 +1275,7 @@ def hr_profile(request):
     
     try:
         # Fetch HR data from database
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         
         # Calculate years of experience based on joining date
         from datetime import date
@@ -1457,7 +1317,7 @@ def tl_profile(request):
     
     try:
         # Fetch Team Leader data from database
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         employee = tl.employee  # Get the associated employee record
         
         # Get TL-specific data
@@ -1504,13 +1364,10 @@ def tl_dashboard(request):
     """TL Dashboard with real team data and enhanced leave tracking"""
     # Get TL ID from session
     tl_id = request.session.get('tl_id')
+    today = timezone.now().date()
     
-    # Get recent announcements for TL dashboard
-    recent_announcements = Announcement.objects.filter(
-        status='published'
-    ).filter(
-        models.Q(expiry_date__isnull=True) | models.Q(expiry_date__gte=timezone.now().date())
-    ).order_by('-created_at')[:5]
+    # Get recent announcements for TL dashboard (cached until an announcement changes)
+    recent_announcements = announcements_widget(today)
     
     # Initialize default values
     total_team_members = 0
@@ -1524,102 +1381,20 @@ def tl_dashboard(request):
     
     if tl_id:
         try:
-            tl_obj = TeamLeader.objects.get(id=tl_id)
-            employee = tl_obj.employee
-            
-            # Get team members assigned to this TL
-            team_assignments = TeamAssignment.objects.filter(team_leader=tl_obj).select_related('employee')
-            total_team_members = team_assignments.count()
-            
-            # Get today's date
-            today = timezone.now().date()
-            
-            # Count present team members today
-            present_count = 0
-            absent_count = 0
-            
-            for assignment in team_assignments:
-                # Check if team member has attendance record for today
-                today_attendance = Attendance.objects.filter(
-                    employee=assignment.employee,
-                    attendance_date=today
-                ).first()
-                
-                if today_attendance:
-                    if today_attendance.status in ['present', 'half_day', 'late']:
-                        present_count += 1
-                    elif today_attendance.status == 'absent':
-                        absent_count += 1
-                else:
-                    # If no attendance record, consider as absent
-                    absent_count += 1
-            
-            present_today = present_count
-            absent_today = absent_count
-            
-            # Get pending leave approvals for team members
-            team_employee_ids = [assignment.employee.id for assignment in team_assignments]
-            team_leave_applications = LeaveApply.objects.filter(
-                employee_id__in=team_employee_ids,
-                status='pending'
-            ).select_related('employee').order_by('-applied_at')[:5]
-            
-            pending_approvals = team_leave_applications.count()
-            
-            # ===== ENHANCED LEAVE STATISTICS FOR TL =====
-            
-            # Get all team member leave applications
-            team_leaves = LeaveApply.objects.filter(
-                employee_id__in=team_employee_ids
-            )
+            tl_obj = current_profile(request, TeamLeader, tl_id)
             
-            # Calculate monthly statistics
-            current_month = timezone.now().replace(day=1)
-            monthly_team_leaves = team_leaves.filter(applied_at__gte=current_month)
+            # Team members and today's attendance, one grouped query (cached per team generation)
+            attendance_widget = team_attendance_widget(tl_obj.id, today)
+            team_assignments = attendance_widget['team_assignments']
+            total_team_members = attendance_widget['total_team_members']
+            present_today = attendance_widget['present_today']
+            absent_today = attendance_widget['absent_today']
             
-            # Leave statistics for current month
-            pending_leaves_month = monthly_team_leaves.filter(status='pending').count()
-            approved_leaves_month = monthly_team_leaves.filter(status='approved').count()
-            rejected_leaves_month = monthly_team_leaves.filter(status='rejected').count()
-            total_leave_days_month = sum([leave.total_days for leave in monthly_team_leaves.filter(status='approved')])
-            
-            # Team member leave usage this month
-            team_member_leave_usage = []
-            for assignment in team_assignments:
-                member_leaves = monthly_team_leaves.filter(employee=assignment.employee)
-                leaves_used = member_leaves.count()
-                leave_days = sum([leave.total_days for leave in member_leaves.filter(status='approved')])
-                
-                team_member_leave_usage.append({
-                    'employee': assignment.employee,
-                    'leaves_used': leaves_used,
-                    'leave_days': leave_days,
-                    'pending_leaves': member_leaves.filter(status='pending').count(),
-                    'has_over_limit': leaves_used > 1  # Monthly limit check
-                })
-            
-            # Leave type distribution for team
-            team_leave_types = {}
-            for leave_type, leave_type_display in LeaveApply.LEAVE_TYPE_CHOICES:
-                type_count = monthly_team_leaves.filter(leave_type=leave_type).count()
-                team_leave_types[leave_type_display] = type_count
-            
-            # Recent TL decisions on leave applications
-            recent_tl_decisions = LeaveApply.objects.filter(
-                employee_id__in=team_employee_ids,
-                tl_approved_by__isnull=False
-            ).select_related('employee').order_by('-tl_approval_date')[:5]
-            
-            leave_statistics = {
-                'pending_leaves_month': pending_leaves_month,
-                'approved_leaves_month': approved_leaves_month,
-                'rejected_leaves_month': rejected_leaves_month,
-                'total_leave_days_month': total_leave_days_month,
-                'team_member_leave_usage': team_member_leave_usage,
-                'team_leave_types': team_leave_types,
-                'recent_tl_decisions': recent_tl_decisions,
-                'team_compliance_rate': round((approved_leaves_month / max(monthly_team_leaves.count(), 1)) * 100, 1) if monthly_team_leaves.exists() else 100,
-            }
+            # ===== ENHANCED LEAVE STATISTICS FOR TL (cached per team generation) =====
+            leave_widget = team_leave_widget(tl_obj.id, team_assignments, today)
+            team_leave_applications = leave_widget['team_leave_applications']
+            pending_approvals = leave_widget['pending_approvals']
+            leave_statistics = leave_widget['leave_statistics']
             
         except TeamLeader.DoesNotExist:
             # If TL not found, keep default values
@@ -1627,7 +1402,7 @@ def tl_dashboard(request):
     
     context = {
         'recent_announcements': recent_announcements,
-        'announcements_count': recent_announcements.count(),
+        'announcements_count': len(recent_announcements),
         'total_team_members': total_team_members,
         'present_today': present_today,
         'absent_today': absent_today,
@@ -1658,7 +1433,7 @@ def tl_attendance(request):
         return redirect('login')
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         
         # Handle filter parameters
         selected_date = request.GET.get('date', timezone.now().date().strftime('%Y-%m-%d'))
@@ -1670,47 +1445,32 @@ def tl_attendance(request):
         except ValueError:
             filter_date = timezone.now().date()
         
-        # Get team members assigned to this TL
-        team_assignments = TeamAssignment.objects.filter(team_leader=tl).select_related('employee')
-        team_member_ids = [assignment.employee.id for assignment in team_assignments]
-        
-        # Get attendance records for team members
-        attendance_records = Attendance.objects.filter(
-            employee_id__in=team_member_ids,
-            attendance_date=filter_date
-        ).select_related('employee').order_by('employee__first_name')
+        # Team members and their attendance for the day, in a fixed number of queries
+        snapshot = TeamSnapshot.load(tl.id, filter_date, filter_date, leaves=False)
         
-        # Apply status filter
-        if status_filter != 'all':
-            if status_filter == 'present':
-                attendance_records = attendance_records.filter(status__in=['present', 'late'])
-            elif status_filter == 'absent':
-                attendance_records = attendance_records.filter(status='absent')
-            elif status_filter == 'late':
-                attendance_records = attendance_records.filter(status='late')
-            elif status_filter == 'remote':
-                attendance_records = attendance_records.filter(status='remote_work')
-        
-        # Apply search filter
-        if search_term:
-            attendance_records = attendance_records.filter(
-                Q(employee__first_name__icontains=search_term) |
-                Q(employee__last_name__icontains=search_term) |
-                Q(employee__company_id__icontains=search_term) |
-                Q(employee__designation__icontains=search_term)
-            )
+        # Status and search filters over the day's records (ordered by first name)
+        status_filters = {
+            'present': ['present', 'late'],
+            'absent': ['absent'],
+            'late': ['late'],
+            'remote': ['remote_work'],
+        }
+        search = search_term.lower()
+        attendance_records = [
+            member.attendance for member in snapshot.members
+            if member.attendance
+            and (status_filter not in status_filters or member.status in status_filters[status_filter])
+            and (not search or any(
+                search in (value or '').lower()
+                for value in (member.employee.first_name, member.employee.last_name,
+                              member.employee.company_id, member.employee.designation)
+            ))
+        ]
         
         # Calculate statistics
-        total_team_members = team_assignments.count()
-        
-        # Get today's attendance stats
-        today_attendance = Attendance.objects.filter(
-            employee_id__in=team_member_ids,
-            attendance_date=filter_date
-        )
-        
-        present_today = today_attendance.filter(status__in=['present', 'late', 'half_day']).count()
-        absent_today = today_attendance.filter(status='absent').count()
+        total_team_members = snapshot.total_members
+        present_today = snapshot.present_today
+        absent_today = snapshot.absent_today
         
         # Calculate attendance rate
         if total_team_members > 0:
@@ -1721,16 +1481,10 @@ def tl_attendance(request):
         # Get attendance records with employee details
         team_attendance_data = []
         for record in attendance_records:
-            team_assignment = team_assignments.filter(employee=record.employee).first()
-            
             # Calculate worked hours
             worked_hours = 0
             if record.check_in_time and record.check_out_time:
-                from datetime import datetime
-                check_in_dt = datetime.combine(filter_date, record.check_in_time)
-                check_out_dt = datetime.combine(filter_date, record.check_out_time)
-                worked_duration = check_out_dt - check_in_dt
-                worked_hours = round(worked_duration.total_seconds() / 3600, 2)
+                worked_hours = round(hours_between(filter_date, record.check_in_time, record.check_out_time), 2)
             
             team_attendance_data.append({
                 'id': record.employee.company_id,
@@ -1746,9 +1500,7 @@ def tl_attendance(request):
             })
         
         # Get department list for filters
-        departments = list(Employee.objects.filter(
-            id__in=team_member_ids
-        ).values_list('department', flat=True).distinct().order_by('department'))
+        departments = sorted({member.employee.department for member in snapshot.members if member.employee.department})
         
         # Get status choices for filter
         status_choices = [
@@ -1822,7 +1574,7 @@ def team_leave_approval(request):
         return redirect('login')
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         
         # ==============================
         # POST REQUEST (APPROVE/REJECT/FORWARD)
@@ -1890,8 +1642,7 @@ def team_leave_approval(request):
         # ==============================
         
         # Get team members assigned to this TL
-        team_assignments = TeamAssignment.objects.filter(team_leader=tl)
-        team_member_ids = [assignment.employee.id for assignment in team_assignments]
+        team_member_ids = team_employee_ids(tl.id)
         
         # Get pending leave applications from team members
         pending_leaves = LeaveApply.objects.filter(
@@ -1919,7 +1670,7 @@ def team_leave_approval(request):
         rejected_this_month = monthly_decisions.filter(status='rejected').count()
         
         # Calculate total leave days
-        total_leave_days = sum([leave.total_days for leave in monthly_decisions.filter(tl_approved=True)])
+        total_leave_days = monthly_decisions.filter(tl_approved=True).aggregate(days=Sum('total_days'))['days'] or 0
         
         context = {
             'tl': tl,
@@ -1951,33 +1702,22 @@ def tl_manage_team(request):
         return redirect('login')
     
     try:
-        tl_obj = TeamLeader.objects.get(id=tl_id)
+        tl_obj = current_profile(request, TeamLeader, tl_id)
         employee = tl_obj.employee
         
-        # Get team assignments with real data
-        team_assignments = TeamAssignment.objects.filter(
-            team_leader=tl_obj
-        ).select_related('employee').order_by('-assigned_at')
-        
-        # Get team member statistics
-        total_team_members = team_assignments.count()
-        
-        # Get today's attendance for team members
+        # Team members with today's attendance and this month's counts, in a fixed number of queries
         today = timezone.now().date()
-        team_member_ids = [assignment.employee.id for assignment in team_assignments]
+        month_start = today.replace(day=1)
+        _, num_days = monthrange(today.year, today.month)
+        snapshot = TeamSnapshot.load(tl_obj.id, month_start, today.replace(day=num_days), day=today, leaves=False)
         
-        # Calculate attendance statistics
-        present_today = Attendance.objects.filter(
-            employee_id__in=team_member_ids,
-            attendance_date=today,
-            status__in=['present', 'half_day', 'late']
-        ).count()
+        team_assignments = sorted(snapshot.assignments, key=lambda assignment: assignment.assigned_at, reverse=True)
+        team_member_ids = snapshot.employee_ids
         
-        absent_today = Attendance.objects.filter(
-            employee_id__in=team_member_ids,
-            attendance_date=today,
-            status='absent'
-        ).count()
+        # Get team member statistics
+        total_team_members = snapshot.total_members
+        present_today = snapshot.present_today
+        absent_today = snapshot.absent_today
         
         # Get pending leave applications for team
         pending_leaves = LeaveApply.objects.filter(
@@ -1990,29 +1730,13 @@ def tl_manage_team(request):
             employee_id__in=team_member_ids
         ).select_related('employee').order_by('-attendance_date')[:20]
         
+        # Working days this month (Monday to Friday)
+        working_days = sum(1 for day in range(1, num_days + 1) if today.replace(day=day).weekday() < 5)
+        
         # Get team performance data (simplified)
         team_performance = []
         for assignment in team_assignments:
-            # Get attendance rate for this month
-            current_month = timezone.now().replace(day=1)
-            monthly_attendance = Attendance.objects.filter(
-                employee=assignment.employee,
-                attendance_date__gte=current_month,
-                status__in=['present', 'half_day', 'late']
-            ).count()
-            
-            # Calculate working days this month
-            import calendar
-            year = timezone.now().year
-            month = timezone.now().month
-            _, num_days = calendar.monthrange(year, month)
-            
-            working_days = 0
-            for day in range(1, num_days + 1):
-                date_obj = timezone.now().replace(year=year, month=month, day=day)
-                if date_obj.weekday() < 5:  # Monday=0, Sunday=6
-                    working_days += 1
-            
+            monthly_attendance = snapshot.member(assignment.employee_id).present_days
             attendance_rate = (monthly_attendance / working_days * 100) if working_days > 0 else 0
             
             team_performance.append({
@@ -2023,10 +1747,9 @@ def tl_manage_team(request):
             })
         
         # Get available employees for assignment (not already assigned to this TL)
-        assigned_employee_ids = [assignment.employee.id for assignment in team_assignments]
         available_employees = Employee.objects.filter(
             resigned_date__isnull=True
-        ).exclude(id__in=assigned_employee_ids).order_by('first_name')
+        ).exclude(id__in=team_member_ids).order_by('first_name')
         
         context = {
             'tl_obj': tl_obj,
@@ -2210,253 +1933,109 @@ def employee(request):
             return redirect("employee-management")
 
     # ====== GET REQUEST LOGIC ======
-    print("Loading employee list...")
-    employees = Employee.objects.all().order_by('-created_at')
-    print(f"Total employees found: {employees.count()}")
-    
-    # Print each employee for debugging
-    for i, emp in enumerate(employees, 1):
-        print(f"  {i}. {emp.first_name} {emp.last_name} ({emp.company_id}) - {emp.email}")
+    return render(request, 'app/hr/employee.html', employee_directory_context(request))
 
-    total_employees = employees.count()
-    active_employees = employees.filter(resigned_date__isnull=True).count()
+
+def employee_directory_context(request):
+    """
+    Template context for the HR employee directory: one keyset page of
+    employees (?q=, ?department=, ?status=, ?cursor=), the department facets
+    and the statistics cards
+    """
+    search = request.GET.get('q', '').strip()
+    department = request.GET.get('department', '').strip()
+    status = request.GET.get('status', '').strip()
+    try:
+        employees, next_cursor, has_more = directory_page(
+            search, department=department, status=status, cursor=request.GET.get('cursor') or None
+        )
+    except InvalidCursor:
+        employees, next_cursor, has_more = directory_page(search, department=department, status=status)
+    facets = department_facets(search, status=status)
+    
+    # Statistics cards, one aggregate over the whole table
+    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    stats = Employee.objects.aggregate(
+        total_employees=Count('id'),
+        active_employees=Count('id', filter=Q(resigned_date__isnull=True)),
+        new_this_month=Count('id', filter=Q(created_at__gte=current_month)),
+        resigned_this_month=Count('id', filter=Q(resigned_date__gte=current_month)),
+    )
     
-    current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'employees': employees,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'department_facets': facets,
+        'directory_total': sum(facet['count'] for facet in facets if not department or facet['department'] == department),
+        'search_term': search,
+        'selected_department': department,
+        'selected_status': status,
+        **stats,
+    }
+
+
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def employee_directory_api(request):
+    """
+    Employee Directory API - One page of employees, newest first
     
-    new_this_month = employees.filter(created_at__gte=current_month).count()
+    Query parameters: q (prefix of first name, last name or company id),
+    department, status (active / resigned), cursor (from the previous page's
+    next_cursor) and limit. The first page (no cursor) also returns the
+    department facets and the total for the search.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
     
-    resigned_this_month = employees.filter(
-        resigned_date__isnull=False,
-        resigned_date__gte=current_month
-    ).count()
+    search = request.GET.get('q', '').strip()
+    department = request.GET.get('department', '').strip()
+    status = request.GET.get('status', '').strip()
+    cursor = request.GET.get('cursor') or None
+    try:
+        limit = min(max(int(request.GET.get('limit', DIRECTORY_DEFAULT_LIMIT)), 1), DIRECTORY_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'})
     
-    print(f"Statistics: Total={total_employees}, Active={active_employees}, New this month={new_this_month}, Resigned this month={resigned_this_month}")
-
-    return render(request, 'app/hr/employee.html', {
-        'employees': employees,
-        'total_employees': total_employees,
-        'active_employees': active_employees,
-        'new_this_month': new_this_month,
-        'resigned_this_month': resigned_this_month,
-    })
+    try:
+        employees, next_cursor, has_more = directory_page(
+            search, department=department, status=status, cursor=cursor, limit=limit
+        )
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'})
+    
+    response = {
+        'success': True,
+        'employees': [serialize_directory_employee(employee) for employee in employees],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
+    if not cursor:
+        facets = department_facets(search, status=status)
+        response['facets'] = {'departments': facets}
+        response['total'] = sum(facet['count'] for facet in facets if not department or facet['department'] == department)
+    return JsonResponse(response)
 
 
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def export_employees(request):
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Employees Data"
-
-    ws.append([
-        "Employee ID",
-        "First Name",
-        "Last Name",
-        "Email",
-        "Contact Number",
-        "Family Contact",
-        "Family Relation",
-        "Designation",
-        "Department",
-        "Package",
-        "Contract Years",
-        "Certifications",
-        "Address",
-        "Image",
-        "Created At",
-    ])
-
-    row = 2  # Excel row starts after header
-
-    for emp in Employee.objects.all():
-
-        safe_email = emp.email.replace("=", "")
-        safe_id = emp.company_id.replace("=", "")
-
-        ws.append([
-            safe_id,
-            emp.first_name,
-            emp.last_name,
-            safe_email,
-            emp.contact_number,
-            emp.family_contact_number,
-            emp.family_relation,
-            emp.designation,
-            emp.department,
-            str(emp.package),
-            emp.contract_years,
-            emp.certifications,
-            emp.address,
-            "",   # image will be added here
-            emp.created_at.strftime("%Y-%m-%d %H:%M"),
-        ])
-
-        # ------------------------------
-        #   IMAGE EXPORT (OpenPyXL)
-        # ------------------------------
-        if emp.image:
-            img_path = emp.image.path
-
-            if os.path.exists(img_path):
-                try:
-                    img = XLImage(img_path)
-                    img.width = 60     # resize image width
-                    img.height = 60    # resize image height
-                    ws.add_image(img, f"U{row}")  # column U -> 21st column
-                except:
-                    pass
-
-        row += 1
-
-    file_name = f"Employees_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f"attachment; filename={file_name}"
-
-    wb.save(response)
-    return response
+    """Export all employees to Excel, streamed row by row (or queued with ?background=1)"""
+    if request.GET.get('background'):
+        return enqueue_job_response(request, 'export_employees')
+    return streaming_xlsx_response(employee_export())
 
 
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def export_payroll(request):
-    """Export all payroll data from database to Excel file"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Payroll Records"
-
-    # Define comprehensive headers
-    headers = [
-        "Payroll ID",
-        "Employee ID", 
-        "Employee Name",
-        "Email",
-        "Department",
-        "Designation",
-        "Contact Number",
-        "Company Package",
-        "Salary Month",
-        "Base Salary",
-        "PF Deduction", 
-        "Final Salary",
-        "Created By",
-        "Created Date",
-        "Updated Date",
-        "Status"
-    ]
-
-    # Add headers to worksheet
-    ws.append(headers)
-
-    # Get ALL payroll data from database with related employee info
-    # This ensures we get complete data from the Payroll model
-    payrolls = Payroll.objects.select_related("employee").all().order_by("-created_at")
-    
-    # Add data to worksheet
-    for payroll in payrolls:
-        employee = payroll.employee
-        ws.append([
-            payroll.id,
-            employee.company_id,
-            f"{employee.first_name} {employee.last_name}",
-            employee.email,
-            employee.department,
-            employee.designation,
-            employee.contact_number or "N/A",
-            float(employee.package),
-            payroll.month,
-            float(payroll.base_salary),
-            float(payroll.pf_deduction),
-            float(payroll.final_salary),
-            payroll.created_by,
-            payroll.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            payroll.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "Processed"
-        ])
-
-    # Add formatting to the worksheet
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    
-    # Style headers
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="0b7368", end_color="0b7368", fill_type="solid")
-    
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # Auto-adjust column widths for better readability
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 3, 60)
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    # Add borders to all cells
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-
-    # Freeze the first row (headers)
-    ws.freeze_panes = "A2"
-
-    # Generate filename with timestamp
-    file_name = f"Complete_Payroll_Records_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-    # Create HTTP response for file download
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f"attachment; filename={file_name}"
-
-    # Save workbook to response
-    wb.save(response)
-    return response
+    """Export all payroll data from database to Excel file, streamed row by row (or queued with ?background=1)"""
+    if request.GET.get('background'):
+        return enqueue_job_response(request, 'export_payroll')
+    return streaming_xlsx_response(payroll_export())
 
 
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def show_all_employees(request):
-    employees = Employee.objects.all().order_by('-created_at')
-    
-    # Calculate real statistics from Employee model
-    total_employees = employees.count()
-    active_employees = employees.filter(resigned_date__isnull=True).count()
-    
-    # New employees this month
-    from datetime import datetime
-    current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    new_this_month = employees.filter(created_at__gte=current_month).count()
-    
-    # Resigned this month
-    resigned_this_month = employees.filter(
-        resigned_date__isnull=False,
-        resigned_date__gte=current_month
-    ).count()
-
-    return render(request, "app/hr/employee.html", {
-        "employees": employees,
-        # Add real statistics for cards
-        "total_employees": total_employees,
-        "active_employees": active_employees,
-        "new_this_month": new_this_month,
-        "resigned_this_month": resigned_this_month,
-    })
+    return render(request, "app/hr/employee.html", employee_directory_context(request))
 
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def delete_employee(request, emp_id):
@@ -2506,8 +2085,8 @@ def get_employee(request, emp_id):
 def team_page(request):
     # ↓ Team Leaders
     leaders = TeamLeader.objects.select_related("employee").all()
-    # ↓ All Employees (for TL creation dropdown)
-    employees = Employee.objects.all()
+    # ↓ All Employees (for TL creation dropdown), only the columns the dropdowns show
+    employees = Employee.objects.only("id", "first_name", "last_name", "company_id", "designation")
     # ↓ TOTAL TEAM MEMBERS (count assigned employees)
     total_team_members = TeamAssignment.objects.count()
     # ↓ TOTAL TEAM LEADERS
@@ -2631,7 +2210,9 @@ def get_team_members(request):
     AJAX call → Return members assigned to a Team Leader
     """
     leader_id = request.GET.get("leader_id")
-    members = TeamAssignment.objects.filter(team_leader_id=leader_id)
+    members = TeamAssignment.objects.filter(team_leader_id=leader_id).select_related("employee").only(
+        "employee__id", "employee__first_name", "employee__last_name", "employee__designation"
+    )
 
     data = []
     for m in members:
@@ -2962,7 +2543,7 @@ def leave_approvals(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         
         # ==============================
         # POST REQUEST (FINAL APPROVAL/REJECTION)
@@ -2981,34 +2562,28 @@ def leave_approvals(request):
                     leave_application.approved_by = f"{hr.full_name} (HR)"
                     leave_application.approval_date = timezone.now()
                     leave_application.hr_comments = hr_comments
-                    leave_application.save()
                     
-                    # Send approval notification email to employee
-                    try:
-                        employee = leave_application.employee
-                        email_context = {
-                            'employee_name': f"{employee.first_name} {employee.last_name}",
-                            'leave_type': leave_application.get_leave_type_display(),
-                            'start_date': leave_application.start_date.strftime('%B %d, %Y'),
-                            'end_date': leave_application.end_date.strftime('%B %d, %Y'),
-                            'total_days': leave_application.total_days,
-                            'hr_name': hr.full_name,
-                            'hr_comments': hr_comments,
-                        }
-                        
-                        email_html = render_to_string('email/leave_approval_email.html', email_context)
-                        email_text = strip_tags(email_html)
-                        
-                        send_mail(
+                    # Save the approval and queue the notification email together
+                    # (sent by the dispatch_notifications command)
+                    employee = leave_application.employee
+                    email_context = {
+                        'employee_name': f"{employee.first_name} {employee.last_name}",
+                        'leave_type': leave_application.get_leave_type_display(),
+                        'start_date': leave_application.start_date.strftime('%B %d, %Y'),
+                        'end_date': leave_application.end_date.strftime('%B %d, %Y'),
+                        'total_days': leave_application.total_days,
+                        'hr_name': hr.full_name,
+                        'hr_comments': hr_comments,
+                    }
+                    with transaction.atomic():
+                        leave_application.save()
+                        queue_email(
+                            'leave_approved',
+                            [employee.email],
                             subject=f'Leave Request Approved - {leave_application.get_leave_type_display()}',
-                            message=email_text,
-                            from_email='adedinesh158@gmail.com',
-                            recipient_list=[employee.email],
-                            html_message=email_html,
-                            fail_silently=True,
+                            template='email/leave_approval_email.html',
+                            context=email_context,
                         )
-                    except Exception as email_error:
-                        print(f"Error sending approval email: {str(email_error)}")
                     
                     messages.success(request, f"Leave request approved for {leave_application.employee.first_name} {leave_application.employee.last_name}.")
                     
@@ -3021,34 +2596,27 @@ def leave_approvals(request):
                     leave_application.status = 'rejected'
                     leave_application.rejection_reason = hr_comments
                     leave_application.hr_comments = hr_comments
-                    leave_application.save()
                     
-                    # Send rejection notification email to employee
-                    try:
-                        employee = leave_application.employee
-                        email_context = {
-                            'employee_name': f"{employee.first_name} {employee.last_name}",
-                            'leave_type': leave_application.get_leave_type_display(),
-                            'start_date': leave_application.start_date.strftime('%B %d, %Y'),
-                            'end_date': leave_application.end_date.strftime('%B %d, %Y'),
-                            'total_days': leave_application.total_days,
-                            'hr_name': hr.full_name,
-                            'rejection_reason': hr_comments,
-                        }
-                        
-                        email_html = render_to_string('email/leave_rejection_email.html', email_context)
-                        email_text = strip_tags(email_html)
-                        
-                        send_mail(
+                    # Save the rejection and queue the notification email together
+                    employee = leave_application.employee
+                    email_context = {
+                        'employee_name': f"{employee.first_name} {employee.last_name}",
+                        'leave_type': leave_application.get_leave_type_display(),
+                        'start_date': leave_application.start_date.strftime('%B %d, %Y'),
+                        'end_date': leave_application.end_date.strftime('%B %d, %Y'),
+                        'total_days': leave_application.total_days,
+                        'hr_name': hr.full_name,
+                        'rejection_reason': hr_comments,
+                    }
+                    with transaction.atomic():
+                        leave_application.save()
+                        queue_email(
+                            'leave_rejected',
+                            [employee.email],
                             subject=f'Leave Request Status Update - {leave_application.get_leave_type_display()}',
-                            message=email_text,
-                            from_email='adedinesh158@gmail.com',
-                            recipient_list=[employee.email],
-                            html_message=email_html,
-                            fail_silently=True,
+                            template='email/leave_rejection_email.html',
+                            context=email_context,
                         )
-                    except Exception as email_error:
-                        print(f"Error sending rejection email: {str(email_error)}")
                     
                     messages.success(request, f"Leave request rejected for {leave_application.employee.first_name} {leave_application.employee.last_name}.")
                 
@@ -3079,7 +2647,11 @@ def leave_approvals(request):
         monthly_leaves = all_leaves.filter(applied_at__gte=current_month)
         approved_this_month = monthly_leaves.filter(status='approved').count()
         rejected_this_month = monthly_leaves.filter(status='rejected').count()
-        total_leave_days = sum([leave.total_days for leave in monthly_leaves.filter(status='approved')])
+        # Approved leave days falling in this month, including leaves that started last month
+        month_start = current_month.date()
+        total_leave_days = LeaveDay.days_between(
+            month_start, month_start.replace(day=monthrange(month_start.year, month_start.month)[1]), status='approved'
+        )
         
         # Leave distribution by type
         leave_types = {}
@@ -3246,26 +2818,14 @@ def reports(request):
     else:
         avg_salary = 0
     
-    # Get current month payroll data
-    current_month = datetime.now().strftime("%B %Y")
-    current_month_payroll = Payroll.objects.filter(
-        month=current_month
-    ).aggregate(total=Sum('final_salary'))['total'] or 0
-    
-    # Get last 6 months payroll data for charts
-    months_data = []
-    current_date = datetime.now()
-    for i in range(6):
-        month_date = current_date.replace(day=1) - timedelta(days=30*i)
-        month_name = month_date.strftime("%B %Y")
-        month_total = Payroll.objects.filter(
-            month=month_name
-        ).aggregate(total=Sum('final_salary'))['total'] or 0
-        months_data.append({
-            'month': month_name,
-            'total': float(month_total)
-        })
-    months_data.reverse()  # Oldest to newest
+    # Last 6 calendar months of payroll (oldest to newest) in one grouped query;
+    # the final entry is the current month
+    payroll_months = payroll_by_month(6)
+    months_data = [
+        {'month': month['label'], 'total': float(month['total'])}
+        for month in payroll_months
+    ]
+    current_month_payroll = payroll_months[-1]['total']
     
     # Get payroll by department with enhanced data
     payroll_by_dept = Payroll.objects.values(
@@ -3461,24 +3021,10 @@ def get_payroll_data(request):
     """API endpoint to fetch dynamic payroll data for charts"""
     from .models import Payroll, Employee
     
-    # Get last 12 months payroll data
-    months_data = []
-    labels = []
-    current_date = datetime.now()
-    
-    for i in range(12):
-        month_date = current_date.replace(day=1) - timedelta(days=30*i)
-        month_name = month_date.strftime("%B %Y")
-        month_short = month_date.strftime("%b")
-        month_total = Payroll.objects.filter(
-            month=month_name
-        ).aggregate(total=Sum('final_salary'))['total'] or 0
-        
-        months_data.append(float(month_total))
-        labels.append(month_short)
-    
-    months_data.reverse()
-    labels.reverse()
+    # Last 12 calendar months of payroll totals (oldest to newest) in one grouped query
+    payroll_months = payroll_by_month(12)
+    months_data = [float(month['total']) for month in payroll_months]
+    labels = [month['month_start'].strftime("%b") for month in payroll_months]
     
     # Get department-wise payroll distribution
     dept_data = Payroll.objects.values(
@@ -3494,43 +3040,13 @@ def get_payroll_data(request):
             dept_labels.append(dept['employee__department'])
             dept_values.append(float(dept['total_payroll']))
     
-    # Enhanced Employee Count Trends with both models
-    employee_trends = []
-    employee_labels = []
-    total_employees_data = []
-    active_employees_data = []
-    payroll_employees_data = []
-    
-    for i in range(12):  # Extended to 12 months for better trend analysis
-        month_date = current_date.replace(day=1) - timedelta(days=30*i)
-        month_name = month_date.strftime("%B %Y")
-        month_short = month_date.strftime("%b %Y")
-        
-        # Total employees registered by end of month
-        total_emp_count = Employee.objects.filter(
-            created_at__lte=month_date.replace(day=1) + timedelta(days=32)
-        ).count()
-        
-        # Active employees (not resigned) by end of month  
-        active_emp_count = Employee.objects.filter(
-            created_at__lte=month_date.replace(day=1) + timedelta(days=32),
-            resigned_date__isnull=True
-        ).count()
-        
-        # Employees with payroll processed in that month
-        payroll_emp_count = Payroll.objects.filter(
-            month=month_name
-        ).values('employee').distinct().count()
-        
-        employee_trends.append(month_short)
-        total_employees_data.append(total_emp_count)
-        active_employees_data.append(active_emp_count)
-        payroll_employees_data.append(payroll_emp_count)
-    
-    employee_trends.reverse()
-    total_employees_data.reverse()
-    active_employees_data.reverse()
-    payroll_employees_data.reverse()
+    # Enhanced Employee Count Trends with both models (12 months, oldest to newest)
+    headcount_months = headcount_by_month(12)
+    employee_trends = [month['month_start'].strftime("%b %Y") for month in headcount_months]
+    total_employees_data = [month['total_employees'] for month in headcount_months]
+    active_employees_data = [month['active_employees'] for month in headcount_months]
+    # Employees with payroll processed in that month
+    payroll_employees_data = [month['employee_count'] for month in payroll_months]
     
     # Get employee distribution by department for the latest month
     dept_employee_data = Employee.objects.filter(
@@ -3882,20 +3398,31 @@ def hr_create(request):
             # Handle profile image upload
             profile_image = request.FILES.get("profileImage")
             
-            hr = HRProfile.objects.create(
-                full_name=request.POST.get("fullName").strip(),
-                employee_id=request.POST.get("employeeId").strip(),
-                email=request.POST.get("email").strip().lower(),
-                mobile=request.POST.get("mobile").strip(),
-                designation=request.POST.get("designation").strip(),
-                department=request.POST.get("department").strip(),
-                date_of_joining=date_of_joining,
-                work_location=request.POST.get("workLocation").strip(),
-                username=request.POST.get("username").strip(),
-                password=request.POST.get("password"),
-                access_level=request.POST.get("accessLevel").strip(),
-                profile_image=profile_image,
-            )
+            # Create the HR and queue the welcome email in one transaction
+            # (sent by the dispatch_notifications command)
+            with transaction.atomic():
+                hr = HRProfile.objects.create(
+                    full_name=request.POST.get("fullName").strip(),
+                    employee_id=request.POST.get("employeeId").strip(),
+                    email=request.POST.get("email").strip().lower(),
+                    mobile=request.POST.get("mobile").strip(),
+                    designation=request.POST.get("designation").strip(),
+                    department=request.POST.get("department").strip(),
+                    date_of_joining=date_of_joining,
+                    work_location=request.POST.get("workLocation").strip(),
+                    username=request.POST.get("username").strip(),
+                    password=request.POST.get("password"),
+                    access_level=request.POST.get("accessLevel").strip(),
+                    profile_image=profile_image,
+                )
+                queue_email(
+                    'hr_welcome',
+                    [hr.email],
+                    subject='Welcome to Kavya Infoweb Private Limited Nagpur - HR Profile Created',
+                    template='email/hr_profile_email.html',
+                    # Credentials are read from the profile at send time, never stored in the outbox
+                    context={'hr_id': hr.id},
+                )
 
             print(f"HR object created successfully with ID: {hr.id}")
             
@@ -3906,41 +3433,10 @@ def hr_create(request):
             if hr_saved:
                 print(f"HR confirmed saved: {hr.full_name} - {hr.email}")
                 
-                # Send welcome email
-                email_sent = False
+                # Welcome email was queued together with the HR record
+                email_sent = True
                 whatsapp_sent = False
                 
-                try:
-                    email_context = {
-                        'name': hr.full_name,
-                        'username': hr.username,
-                        'password': hr.password,
-                        'employee_id': hr.employee_id,  # This will be the Access ID
-                        'email': hr.email,
-                        'designation': hr.designation,
-                    }
-                    
-                    # Render the email template
-                    email_html = render_to_string('email/hr_profile_email.html', email_context)
-                    email_text = strip_tags(email_html)
-                    
-                    # Send email
-                    send_mail(
-                        subject=f'Welcome to Kavya Infoweb Private Limited Nagpur - HR Profile Created',
-                        message=email_text,
-                        from_email='adedinesh158@gmail.com',
-                        recipient_list=[hr.email],
-                        html_message=email_html,
-                        fail_silently=False,
-                    )
-                    
-                    print(f"Welcome email sent successfully to {hr.email}")
-                    email_sent = True
-                    
-                except Exception as email_error:
-                    print(f"Error sending email: {str(email_error)}")
-                    # Email failed, but HR was created successfully
-                
                 # Send WhatsApp message with access credentials
                 try:
                     # Clean message without problematic Unicode characters
@@ -4190,7 +3686,7 @@ def hr_attendance_simple(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         today = timezone.now().date()
         
         # Handle filter parameters
@@ -4314,234 +3810,73 @@ def employee_attendance_simple(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
-        today = timezone.now().date()
-        current_time = timezone.now().time()
-        
-        # Constants
-        official_start_time = time(10, 45)  # 10:45 AM - Late arrival after this
-        check_in_allowed_time = time(10, 0)   # 10:00 AM - Check-in starts
-        required_work_hours = 8.0
-        auto_checkout_time = time(18, 30)    # 6:30 PM - Auto checkout time
-        
-        # Check if today is a working day (Monday to Saturday)
-        is_working_day = today.weekday() < 6  # Monday to Saturday
-        
-        # Check if current time is within check-in window
-        can_show_check_in = (current_time >= check_in_allowed_time and is_working_day)
-        
-        # Get or create today's attendance record
-        attendance, created = Attendance.objects.get_or_create(
-            employee=employee,
-            attendance_date=today,
-            defaults={
-                'status': 'present',
-                'shift_type': 'full_time',
-                'is_check_in_allowed': True,
-                'can_check_out': False
-            }
-        )
-        
-        # NEW: Automatic check-out at 6:30 PM
-        auto_checkout_triggered = False
-        if (attendance.check_in_time and 
-            not attendance.check_out_time and 
-            current_time >= auto_checkout_time):
-            
-            # Calculate worked hours for auto checkout
-            from datetime import datetime
-            check_in_dt = datetime.combine(today, attendance.check_in_time)
-            current_dt = datetime.combine(today, current_time)
-            worked_duration = current_dt - check_in_dt
-            worked_hours = worked_duration.total_seconds() / 3600
-            
-            # Auto checkout with minimum 8 hours (or what they've worked if less than 8)
-            final_worked_hours = max(worked_hours, 8.0) if worked_hours >= 4.0 else worked_hours
-            
-            # Update attendance record with auto checkout
-            attendance.check_out_time = current_time
-            attendance.total_worked_hours = round(final_worked_hours, 2)
-            
-            if final_worked_hours >= 8.0:
-                attendance.status = 'present'
-                attendance.remarks += f" | Auto checkout at 6:30 PM (Completed {final_worked_hours:.1f}h)"
-            elif final_worked_hours >= 4.0:
-                attendance.status = 'half_day'
-                attendance.remarks += f" | Auto checkout at 6:30 PM (Half day - {final_worked_hours:.1f}h)"
-            else:
-                attendance.status = 'early_departure'
-                attendance.remarks += f" | Auto checkout at 6:30 PM (Early - {final_worked_hours:.1f}h)"
-                
-            attendance.can_check_out = False
-            attendance.save()
-            
-            # Log the auto check-out
-            AttendanceCheckLog.objects.create(
-                employee=employee,
-                check_type='check_out',
-                check_time=timezone.now(),
-                attendance_date=today,
-                worked_hours_at_check=round(final_worked_hours, 2),
-                required_work_hours=8.0,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT')
-            )
-            
-            auto_checkout_triggered = True
-        
-        # Determine current status and actions
-        can_check_in = can_show_check_in and not attendance.check_in_time
-        can_check_out = False
-        worked_hours = 0
-        remaining_hours = required_work_hours
-        is_late_arrival = False
-        
-        if attendance.check_in_time and not attendance.check_out_time:
-            # Calculate current worked hours
-            from datetime import datetime
-            check_in_dt = datetime.combine(today, attendance.check_in_time)
-            current_dt = datetime.combine(today, current_time)
-            worked_duration = current_dt - check_in_dt
-            worked_hours = worked_duration.total_seconds() / 3600
-            remaining_hours = max(0, required_work_hours - worked_hours)
-            can_check_out = worked_hours >= required_work_hours
-            
-            # Update real-time worked hours
-            attendance.total_worked_hours = round(worked_hours, 2)
-            if can_check_out:
-                attendance.can_check_out = True
-            attendance.save()
+        employee = current_profile(request, Employee, employee_id)
+        now = timezone.localtime()
+        today = now.date()
         
-        # Handle POST requests for check-in/check-out
+        # Handle POST requests for check-in/check-out (one guarded write each, see app.checkin)
         if request.method == "POST":
             action = request.POST.get("action")
             
             if action == "check_in":
-                if not can_check_in:
-                    if not is_working_day:
-                        messages.error(request, "Check-in not allowed on weekends!")
-                    elif not can_show_check_in:
-                        messages.error(request, "Check-in is only allowed after 10:00 AM.")
-                    else:
-                        messages.error(request, "You have already checked-in today!")
-                    return redirect('employee-attendance')
-                
-                # Calculate late arrival
-                is_late_arrival = current_time > official_start_time
-                
-                # Update attendance record
-                attendance.check_in_time = current_time
-                attendance.status = 'half_day' if is_late_arrival else 'present'
-                attendance.remarks = f"Checked in at {current_time.strftime('%H:%M:%S')}"
-                attendance.is_check_in_allowed = False
-                attendance.save()
-                
-                # Log the check-in
-                AttendanceCheckLog.objects.create(
-                    employee=employee,
-                    check_type='check_in',
-                    check_time=timezone.now(),
-                    attendance_date=today,
-                    is_denied=False,
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    user_agent=request.META.get('HTTP_USER_AGENT')
-                )
-                
-                # Show appropriate message
-                if is_late_arrival:
-                    messages.warning(request, f"Checked in successfully! You arrived late (after 10:45 AM). Status: Half Day")
+                result = check_in(employee, now, request.META)
+                if not result:
+                    messages.error(request, result.message)
+                elif result.code == 'late':
+                    messages.warning(request, result.message)
                 else:
-                    messages.success(request, f"Checked in successfully at {current_time.strftime('%H:%M:%S')}!")
-                
+                    messages.success(request, result.message)
                 return redirect('employee-attendance')
             
             elif action == "check_out":
-                if not attendance.check_in_time:
-                    messages.error(request, "You need to check-in first before checking out!")
-                    return redirect('employee-attendance')
-                
-                if attendance.check_out_time:
-                    messages.error(request, "You have already checked-out today!")
-                    return redirect('employee-attendance')
-                
-                # Calculate worked hours
-                from datetime import datetime
-                check_in_dt = datetime.combine(today, attendance.check_in_time)
-                current_dt = datetime.combine(today, current_time)
-                worked_duration = current_dt - check_in_dt
-                worked_hours = worked_duration.total_seconds() / 3600
-                
-                if worked_hours < required_work_hours:
-                    messages.error(request, f"Cannot check-out yet! You need to complete at least {required_work_hours} hours. Current: {worked_hours:.1f} hours")
-                    return redirect('employee-attendance')
-                
-                # Update attendance record
-                attendance.check_out_time = current_time
-                attendance.total_worked_hours = round(worked_hours, 2)
-                attendance.can_check_out = False
-                
-                if worked_hours >= required_work_hours:
-                    attendance.status = 'present'
-                    attendance.remarks += f" | Checked out at {current_time.strftime('%H:%M:%S')} (Completed {worked_hours:.1f}h)"
-                elif worked_hours >= 4.0:
-                    attendance.status = 'half_day'
-                    attendance.remarks += f" | Checked out at {current_time.strftime('%H:%M:%S')} (Half day - {worked_hours:.1f}h)"
-                
-                attendance.save()
-                
-                # Log the check-out
-                AttendanceCheckLog.objects.create(
-                    employee=employee,
-                    check_type='check_out',
-                    check_time=timezone.now(),
-                    attendance_date=today,
-                    worked_hours_at_check=round(worked_hours, 2),
-                    required_work_hours=required_work_hours,
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    user_agent=request.META.get('HTTP_USER_AGENT')
-                )
-                
-                messages.success(request, f"Checked out successfully! You worked for {worked_hours:.1f} hours today.")
+                result = check_out(employee, now, request.META)
+                if result:
+                    messages.success(request, result.message)
+                else:
+                    messages.error(request, result.message)
                 return redirect('employee-attendance')
         
-        # Get present attendance records only (for display)
-        present_attendance_records = Attendance.objects.filter(
-            employee=employee,
-            status__in=['present', 'late', 'half_day']
-        ).order_by('-attendance_date')
+        # Today's state is computed on read; nothing is written for a page view
+        status = today_status(employee.id, now)
         
-        # Calculate current month statistics
-        current_month = timezone.now().replace(day=1)
-        current_month_attendance = present_attendance_records.filter(
-            attendance_date__gte=current_month
-        )
+        # Open rows are closed at 6:30 PM by the auto_checkout command; tell the employee if theirs was
+        auto_checkout_triggered = 'Auto checkout' in ((status['attendance'] or {}).get('remarks') or '')
+        attendance = Attendance(employee=employee, **(status['attendance'] or {'attendance_date': today}))
+        
+        # Present attendance records only (for display), most recent first
+        present_attendance_records = list(recent_attendance(employee.id))
+        for record in present_attendance_records:
+            if record.attendance_date == today and record.check_in_time and not record.check_out_time:
+                record.total_worked_hours = status['worked_hours']
         
+        # Current month statistics
+        counts = attendance_counts(employee.id, today.replace(day=1))
         current_month_stats = {
-            'total_days': current_month_attendance.count(),
-            'present_days': current_month_attendance.filter(status='present').count(),
-            'half_days': current_month_attendance.filter(status='half_day').count(),
-            'absent_days': current_month_attendance.filter(status='absent').count(),
+            'total_days': counts['month_days'],
+            'present_days': counts['month_present'],
+            'half_days': counts['month_half_days'],
+            'absent_days': 0,  # Only present / late / half-day rows are counted here
         }
         
         # Calculate attendance percentage
-        total_present_days = present_attendance_records.count()
+        total_present_days = counts['total_days']
         attendance_percentage = round((total_present_days / max(total_present_days, 1)) * 100, 1)
         
         # GET request - display attendance interface
         context = {
             'employee': employee,
             'attendance': attendance,
-            'current_time': current_time,
+            'current_time': now.time(),
             'today': today,
-            'official_start_time': official_start_time,
-            'required_work_hours': required_work_hours,
-            'auto_checkout_time': auto_checkout_time,
-            'is_working_day': is_working_day,
-            'can_check_in': can_check_in,
-            'can_check_out': can_check_out,
-            'worked_hours': round(worked_hours, 2),
-            'remaining_hours': round(remaining_hours, 2),
-            'is_late_arrival': is_late_arrival,
+            'official_start_time': OFFICIAL_START_TIME,
+            'required_work_hours': REQUIRED_WORK_HOURS,
+            'auto_checkout_time': AUTO_CHECKOUT_TIME,
+            'is_working_day': status['is_working_day'],
+            'can_check_in': status['can_check_in'],
+            'can_check_out': status['can_check_out'],
+            'worked_hours': status['worked_hours'],
+            'remaining_hours': status['remaining_hours'],
+            'is_late_arrival': status['is_late_arrival'],
             'attendance_records': present_attendance_records,  # Only present days
             'total_days': total_present_days,
             'present_days': current_month_stats['present_days'],
@@ -4561,6 +3896,55 @@ def employee_attendance_simple(request):
         return redirect('employee-dashboard')
 
 
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def attendance_check_api(request):
+    """
+    Attendance Check API - Lightweight JSON check-in / check-out
+    
+    GET returns today's state (worked hours computed on read). POST with
+    action=check_in or action=check_out performs the action with a single
+    guarded write on today's Attendance row.
+    """
+    employee_id = request.session.get('employee_id')
+    if not employee_id:
+        return JsonResponse({'success': False, 'error': 'User not authenticated'}, status=401)
+    
+    now = timezone.localtime()
+    
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action not in ('check_in', 'check_out'):
+            return JsonResponse({'success': False, 'error': 'Action must be check_in or check_out'}, status=400)
+        
+        try:
+            employee = current_profile(request, Employee, employee_id)
+        except Employee.DoesNotExist:
+            return JsonResponse({'success': False, 'error': 'Employee not found'}, status=404)
+        
+        result = check_in(employee, now, request.META) if action == 'check_in' else check_out(employee, now, request.META)
+        payload = {'success': result.ok, 'code': result.code}
+        payload['message' if result.ok else 'error'] = result.message
+        if result.worked_hours is not None:
+            payload['worked_hours'] = round(result.worked_hours, 2)
+        return JsonResponse(payload, status=200 if result.ok else 409)
+    
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    status = today_status(employee_id, now)
+    row = status.pop('attendance')
+    if row:
+        status['attendance'] = {
+            'date': row['attendance_date'].strftime('%Y-%m-%d'),
+            'check_in_time': row['check_in_time'].strftime('%H:%M:%S') if row['check_in_time'] else None,
+            'check_out_time': row['check_out_time'].strftime('%H:%M:%S') if row['check_out_time'] else None,
+            'status': row['status'],
+        }
+    else:
+        status['attendance'] = None
+    return JsonResponse(dict(status, success=True))
+
+
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def employee_check_out(request):
     """
@@ -4576,7 +3960,7 @@ def employee_check_out(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         current_datetime = timezone.now()
@@ -4736,21 +4120,24 @@ def tl_attendance_management(request):
         return redirect('login')
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         today = timezone.now().date()
         
-        # Get team members
-        team_assignments = TeamAssignment.objects.filter(team_leader=tl).select_related('employee')
-        team_member_ids = [assignment.employee.id for assignment in team_assignments]
+        # Get team members with today's attendance rows
+        snapshot = TeamSnapshot.load(tl.id, today, today, leaves=False)
+        team_assignments = snapshot.assignments
+        team_member_ids = snapshot.employee_ids
         
         if request.method == "POST":
             action = request.POST.get("action")
             
             if action == "create_daily_attendance":
-                # Create attendance records for all team members for today
+                # Create attendance records for team members who have none for today
                 created_count = 0
-                for assignment in team_assignments:
-                    employee = assignment.employee
+                for member in snapshot.members:
+                    if member.attendance:
+                        continue
+                    employee = member.employee
                     
                     # Check if attendance already exists for today
                     attendance, created = Attendance.objects.get_or_create(
@@ -4852,19 +4239,11 @@ def tl_attendance_management(request):
         
         # GET request - display attendance management interface
         
-        # Get today's attendance records for team members
-        today_attendance = Attendance.objects.filter(
-            employee_id__in=team_member_ids,
-            attendance_date=today
-        ).select_related('employee').order_by('employee__first_name')
-        
-        # Check which team members don't have attendance records yet
-        team_members_without_attendance = []
-        for assignment in team_assignments:
-            employee = assignment.employee
-            has_attendance = today_attendance.filter(employee=employee).exists()
-            if not has_attendance:
-                team_members_without_attendance.append(employee)
+        # Today's attendance records and the team members who don't have one yet (by first name)
+        today_attendance = [member.attendance for member in snapshot.members if member.attendance]
+        team_members_without_attendance = [
+            member.employee for member in snapshot.members if member.attendance is None
+        ]
         
         # Get pending approvals
         pending_approvals = AttendanceApproval.objects.filter(
@@ -4874,8 +4253,8 @@ def tl_attendance_management(request):
         ).select_related('attendance', 'attendance__employee')
         
         # Calculate statistics
-        total_team_members = team_assignments.count()
-        attendance_created = today_attendance.count()
+        total_team_members = snapshot.total_members
+        attendance_created = len(today_attendance)
         pending_approvals_count = pending_approvals.count()
         approved_today = AttendanceApproval.objects.filter(
             team_leader=tl,
@@ -4924,7 +4303,7 @@ def hr_monthly_attendance_summary(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         
         if request.method == "POST":
             action = request.POST.get("action")
@@ -4935,122 +4314,24 @@ def hr_monthly_attendance_summary(request):
                 year = int(request.POST.get("year"))
                 
                 try:
+                    if employee_id == "all":
+                        # Bulk mode: every active employee in one pass
+                        result = generate_monthly_summaries(month, year)
+                        messages.success(
+                            request,
+                            f"Monthly attendance summaries generated for {result['generated']} employees - {month} {year} "
+                            f"({result['skipped_finalized']} already finalized) in {result['elapsed_seconds']}s."
+                        )
+                        return redirect('hr-monthly-attendance-summary')
+                    
                     employee = Employee.objects.get(id=employee_id)
                     
-                    # Check if summary already exists
-                    existing_summary = MonthlyAttendanceSummary.objects.filter(
-                        employee=employee,
-                        month=month,
-                        year=year
-                    ).first()
+                    result = generate_monthly_summaries(month, year, employees=Employee.objects.filter(id=employee.id))
                     
-                    if existing_summary and existing_summary.is_finalized:
+                    if result['skipped_finalized']:
                         messages.error(request, "Monthly summary already finalized for this employee and period.")
                         return redirect('hr-monthly-attendance-summary')
                     
-                    # Generate attendance data for the month
-                    from calendar import monthrange, month_name
-                    import calendar
-                    
-                    # Get month number
-                    month_names = ['January', 'February', 'March', 'April', 'May', 'June',
-                                  'July', 'August', 'September', 'October', 'November', 'December']
-                    month_num = month_names.index(month) + 1
-                    
-                    # Calculate working days (excluding Sundays)
-                    _, num_days = monthrange(year, month_num)
-                    working_days = 0
-                    weekend_days = 0
-                    
-                    for day in range(1, num_days + 1):
-                        date_obj = datetime(year, month_num, day)
-                        if date_obj.weekday() < 6:  # Monday to Saturday (0-5)
-                            working_days += 1
-                        else:  # Sunday
-                            weekend_days += 1
-                    
-                    # Get attendance records for the month
-                    month_start = datetime(year, month_num, 1).date()
-                    if month_num == 12:
-                        month_end = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-                    else:
-                        month_end = datetime(year, month_num + 1, 1).date() - timedelta(days=1)
-                    
-                    attendance_records = Attendance.objects.filter(
-                        employee=employee,
-                        attendance_date__gte=month_start,
-                        attendance_date__lte=month_end
-                    )
-                    
-                    # Calculate statistics
-                    present_days = attendance_records.filter(
-                        status__in=['present', 'late']
-                    ).count()
-                    
-                    half_days = attendance_records.filter(status='half_day').count()
-                    absent_days = attendance_records.filter(status='absent').count()
-                    
-                    # Count late arrivals from approval records
-                    late_arrivals = AttendanceApproval.objects.filter(
-                        attendance__employee=employee,
-                        is_late_arrival=True,
-                        reviewed_at__gte=month_start,
-                        reviewed_at__lte=month_end
-                    ).count()
-                    
-                    # Get approved leaves for the month
-                    approved_leaves = LeaveApply.objects.filter(
-                        employee=employee,
-                        status='approved',
-                        start_date__gte=month_start,
-                        start_date__lte=month_end
-                    )
-                    
-                    unpaid_leaves = approved_leaves.filter(
-                        leave_type__in=['unpaid', 'leave_without_pay']
-                    ).count()
-                    
-                    # Calculate total worked hours
-                    total_worked_hours = sum([
-                        float(record.total_worked_hours or 0) 
-                        for record in attendance_records 
-                        if record.total_worked_hours
-                    ])
-                    
-                    # Calculate salary deductions
-                    daily_salary = float(employee.package) / 26  # Assuming 26 working days per month
-                    half_day_deduction = daily_salary / 2
-                    
-                    salary_deduction_for_absences = absent_days * daily_salary
-                    salary_deduction_for_half_days = half_days * half_day_deduction
-                    salary_deduction_for_late_arrivals = late_arrivals * (daily_salary * 0.1)  # 10% deduction for late arrival
-                    
-                    # Create or update summary
-                    if existing_summary:
-                        # Update existing summary
-                        summary = existing_summary
-                    else:
-                        # Create new summary
-                        summary = MonthlyAttendanceSummary.objects.create(
-                            employee=employee,
-                            month=month,
-                            year=year
-                        )
-                    
-                    summary.total_working_days = working_days
-                    summary.present_days = present_days
-                    summary.absent_days = absent_days
-                    summary.half_days = half_days
-                    summary.late_arrivals = late_arrivals
-                    summary.approved_leaves = approved_leaves.count() - unpaid_leaves
-                    summary.unpaid_leaves = unpaid_leaves
-                    summary.weekend_days = weekend_days
-                    summary.total_worked_hours = round(total_worked_hours, 2)
-                    summary.salary_deduction_for_absences = round(salary_deduction_for_absences, 2)
-                    summary.salary_deduction_for_half_days = round(salary_deduction_for_half_days, 2)
-                    summary.salary_deduction_for_late_arrivals = round(salary_deduction_for_late_arrivals, 2)
-                    summary.save()
-                    
                     messages.success(request, f"Monthly attendance summary generated for {employee.first_name} {employee.last_name} - {month} {year}.")
                     
                 except Employee.DoesNotExist:
@@ -5073,7 +4354,7 @@ def hr_monthly_attendance_summary(request):
                     messages.error(request, "Monthly summary not found.")
         
         # GET request - display summaries
-        summaries = MonthlyAttendanceSummary.objects.select_related('employee').order_by('-year', '-month')
+        summaries = MonthlyAttendanceSummary.objects.select_related('employee').order_by('-period', '-year')
         
         # Filter options
         employees = Employee.objects.filter(resigned_date__isnull=True).order_by('first_name')
@@ -5123,12 +4404,29 @@ def hr_payroll_calculations(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         
         if request.method == "POST":
             action = request.POST.get("action")
             
-            if action == "calculate_payroll":
+            if action == "calculate_payroll" and request.POST.get("employee") == "all":
+                # Batch mode: every active employee in one pass
+                month = request.POST.get("month")
+                year = int(request.POST.get("year"))
+                
+                try:
+                    # The form's allowance / overtime belong to one employee; everyone keeps their own
+                    summary = calculate_month_payroll(month, year, f"{hr.full_name} (HR)")
+                    messages.success(
+                        request,
+                        f"Payroll calculated for {summary['calculated']} employees - {month} {year} "
+                        f"({summary['created']} new, {summary['updated']} updated) in {summary['elapsed_seconds']}s "
+                        f"({summary['employees_per_second']} employees/sec)."
+                    )
+                except Exception as e:
+                    messages.error(request, f"Error calculating payroll: {str(e)}")
+            
+            elif action == "calculate_payroll":
                 employee_id = request.POST.get("employee")
                 month = request.POST.get("month")
                 year = int(request.POST.get("year"))
@@ -5136,178 +4434,36 @@ def hr_payroll_calculations(request):
                 try:
                     employee = Employee.objects.get(id=employee_id)
                     
-                    # Get attendance records for the month
-                    month_names = ['January', 'February', 'March', 'April', 'May', 'June',
-                                  'July', 'August', 'September', 'October', 'November', 'December']
-                    month_num = month_names.index(month) + 1
-                    
-                    # Calculate month date range
-                    if month_num == 12:
-                        month_start = datetime(year, month_num, 1).date()
-                        month_end = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-                    else:
-                        month_start = datetime(year, month_num, 1).date()
-                        month_end = datetime(year, month_num + 1, 1).date() - timedelta(days=1)
-                    
-                    # Get attendance records for the month
-                    attendance_records = Attendance.objects.filter(
-                        employee=employee,
-                        attendance_date__gte=month_start,
-                        attendance_date__lte=month_end
+                    payroll = calculate_employee_payroll(
+                        employee, month, year, f"{hr.full_name} (HR)",
+                        allowances=request.POST.get("allowances", 0),
+                        overtime_amount=request.POST.get("overtime_amount", 0),
                     )
                     
-                    # Calculate attendance statistics
-                    total_working_days = attendance_records.count()
-                    present_days = attendance_records.filter(status='present').count()
-                    half_days = attendance_records.filter(status='half_day').count()
-                    absent_days = attendance_records.filter(status='absent').count()
-                    late_arrivals = attendance_records.filter(status='late').count()
-                    
-                    # Get approved leave applications for the month
-                    approved_leaves = LeaveApply.objects.filter(
-                        employee=employee,
-                        status='approved',
-                        start_date__gte=month_start,
-                        start_date__lte=month_end
-                    )
-                    
-                    paid_leave_days = sum([leave.total_days for leave in approved_leaves 
-                                         if leave.leave_type not in ['unpaid', 'leave_without_pay']])
-                    unpaid_leave_days = sum([leave.total_days for leave in approved_leaves 
-                                            if leave.leave_type in ['unpaid', 'leave_without_pay']])
-                    
-                    # Calculate salary components
-                    base_salary = float(employee.package)
-                    daily_salary = base_salary / 26  # Assuming 26 working days per month
-                    
-                    # Calculate deductions
-                    half_day_deduction = half_days * (daily_salary / 2)
-                    absent_deduction = absent_days * daily_salary
-                    unpaid_leave_deduction = unpaid_leave_days * daily_salary
-                    
-                    # Standard deductions
-                    pf_deduction = base_salary * 0.12  # 12% PF
-                    professional_tax = 200  # Fixed professional tax
-                    
-                    # Calculate gross salary (base + allowances)
-                    allowances = float(request.POST.get("allowances", 0))
-                    overtime_amount = float(request.POST.get("overtime_amount", 0))
-                    gross_salary = base_salary + allowances + overtime_amount
-                    
-                    # Calculate total deductions
-                    total_deductions = (half_day_deduction + absent_deduction + unpaid_leave_deduction +
-                                      pf_deduction + professional_tax)
-                    
-                    # Calculate final salary
-                    final_salary = gross_salary - total_deductions
-                    
-                    # Create or update payroll record
-                    existing_payroll = Payroll.objects.filter(
-                        employee=employee,
-                        month=month,
-                        year=year
-                    ).first()
-                    
-                    if existing_payroll:
-                        payroll = existing_payroll
-                    else:
-                        payroll = Payroll.objects.create(
-                            employee=employee,
-                            month=month,
-                            year=year
-                        )
-                    
-                    # Update payroll fields
-                    payroll.base_salary = base_salary
-                    payroll.allowances = allowances
-                    payroll.overtime_amount = overtime_amount
-                    payroll.leave_deduction = absent_deduction + unpaid_leave_deduction
-                    payroll.half_day_deduction = half_day_deduction
-                    payroll.late_arrival_deduction = 0  # Late arrivals already handled in half day
-                    payroll.pf_deduction = pf_deduction
-                    payroll.professional_tax = professional_tax
-                    payroll.other_deductions = 0
-                    payroll.gross_salary = gross_salary
-                    payroll.total_deductions = total_deductions
-                    payroll.final_salary = final_salary
-                    payroll.created_by = f"{hr.full_name} (HR)"
-                    payroll.is_processed = False
-                    payroll.save()
-                    
-                    # Clear existing deduction records
-                    PayrollDeduction.objects.filter(payroll=payroll).delete()
-                    
-                    # Create detailed deduction records
-                    if half_day_deduction > 0:
-                        PayrollDeduction.objects.create(
-                            payroll=payroll,
-                            employee=employee,
-                            deduction_type='half_day',
-                            description=f'Half day deduction for {half_days} half days',
-                            amount=half_day_deduction,
-                            calculation_basis='Half day rate',
-                            units_deducted=half_days,
-                            approved_by=f"{hr.full_name} (HR)",
-                            approved_date=timezone.now()
-                        )
-                    
-                    if absent_deduction > 0:
-                        PayrollDeduction.objects.create(
-                            payroll=payroll,
-                            employee=employee,
-                            deduction_type='absent',
-                            description=f'Absence deduction for {absent_days} absent days',
-                            amount=absent_deduction,
-                            calculation_basis='Per day salary',
-                            units_deducted=absent_days,
-                            approved_by=f"{hr.full_name} (HR)",
-                            approved_date=timezone.now()
-                        )
-                    
-                    if unpaid_leave_deduction > 0:
-                        PayrollDeduction.objects.create(
-                            payroll=payroll,
-                            employee=employee,
-                            deduction_type='unpaid_leave',
-                            description=f'Unpaid leave deduction for {unpaid_leave_days} days',
-                            amount=unpaid_leave_deduction,
-                            calculation_basis='Per day salary',
-                            units_deducted=unpaid_leave_days,
-                            approved_by=f"{hr.full_name} (HR)",
-                            approved_date=timezone.now()
-                        )
-                    
-                    if pf_deduction > 0:
-                        PayrollDeduction.objects.create(
-                            payroll=payroll,
-                            employee=employee,
-                            deduction_type='pf',
-                            description='Provident Fund deduction',
-                            amount=pf_deduction,
-                            calculation_basis='12% of base salary',
-                            approved_by=f"{hr.full_name} (HR)",
-                            approved_date=timezone.now()
-                        )
-                    
-                    if professional_tax > 0:
-                        PayrollDeduction.objects.create(
-                            payroll=payroll,
-                            employee=employee,
-                            deduction_type='professional_tax',
-                            description='Professional Tax',
-                            amount=professional_tax,
-                            calculation_basis='Fixed amount',
-                            approved_by=f"{hr.full_name} (HR)",
-                            approved_date=timezone.now()
-                        )
-                    
-                    messages.success(request, f"Payroll calculated successfully for {employee.first_name} {employee.last_name} - {month} {year}. Final Salary: ₹{final_salary:.2f}")
+                    messages.success(request, f"Payroll calculated successfully for {employee.first_name} {employee.last_name} - {month} {year}. Final Salary: ₹{payroll.final_salary:.2f}")
                     
                 except Employee.DoesNotExist:
                     messages.error(request, "Employee not found.")
                 except Exception as e:
                     messages.error(request, f"Error calculating payroll: {str(e)}")
             
+            elif action == "calculate_payroll_background":
+                # Queue the month's payroll run for the run_jobs worker instead of doing it in the request
+                params = {
+                    'month': request.POST.get("month"),
+                    'year': request.POST.get("year"),
+                    'allowances': request.POST.get("allowances", 0),
+                    'overtime_amount': request.POST.get("overtime_amount", 0),
+                }
+                if request.POST.get("employee") and request.POST.get("employee") != "all":
+                    params['employee_ids'] = [request.POST.get("employee")]
+                
+                try:
+                    job = enqueue_job('payroll_calculation', params, requested_by=f"{hr.full_name} (HR)", requested_by_hr=hr)
+                    messages.success(request, f"Payroll calculation for {job.params['month']} {job.params['year']} queued as job #{job.id}.")
+                except ValueError as e:
+                    messages.error(request, f"Could not queue payroll calculation: {str(e)}")
+            
             elif action == "process_payroll":
                 payroll_id = request.POST.get("payroll_id")
                 try:
@@ -5322,7 +4478,7 @@ def hr_payroll_calculations(request):
                     messages.error(request, "Payroll record not found.")
         
         # GET request - display payroll calculations
-        payrolls = Payroll.objects.select_related('employee').order_by('-year', '-month')
+        payrolls = Payroll.objects.select_related('employee').order_by('-period', '-year')
         
         # Filter options
         employees = Employee.objects.filter(resigned_date__isnull=True).order_by('first_name')
@@ -5374,7 +4530,7 @@ def employee_attendance_records_simple(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get all attendance records for this employee
         attendance_records = Attendance.objects.filter(
@@ -5464,7 +4620,7 @@ def hr_salary_processing(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         current_date = timezone.now().date()
         
         # Check if current date is within salary processing window (1st to 7th of month)
@@ -5561,7 +4717,7 @@ def hr_salary_processing(request):
                     messages.error(request, "Salary processing record not found.")
         
         # GET request - display salary processing interface
-        salary_processings = SalaryProcessing.objects.select_related('employee').order_by('-salary_year', '-salary_month')
+        salary_processings = SalaryProcessing.objects.select_related('employee').order_by('-period', '-salary_year')
         
         # Filter options
         employees = Employee.objects.filter(resigned_date__isnull=True).order_by('first_name')
@@ -5613,7 +4769,7 @@ def employee_attendance_logs_view(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get attendance check logs
         check_logs = AttendanceCheckLog.objects.filter(
@@ -5672,7 +4828,7 @@ def employee_project_dashboard(request):
     projects_with_progress = []
 
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
     except Employee.DoesNotExist:
         messages.error(request, "Employee profile not found.")
         return redirect('login')
@@ -5764,7 +4920,7 @@ def tl_project_dashboard(request):
     pending_tasks = 0
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         employee = tl.employee
     except TeamLeader.DoesNotExist:
         messages.error(request, "Team Leader profile not found.")
@@ -5854,7 +5010,7 @@ def team_chat_dashboard(request):
     try:
         if employee_id:
             # Employee logged in
-            employee = Employee.objects.get(id=employee_id)
+            employee = current_profile(request, Employee, employee_id)
             context['user_role'] = 'employee'
             context['current_user'] = employee
             
@@ -5881,10 +5037,7 @@ def team_chat_dashboard(request):
                 context['conversations'] = conversations
                 
                 # Get unread message count
-                context['unread_count'] = conversations.filter(
-                    receiver_employee=employee,
-                    is_read=False
-                ).count()
+                context['unread_count'] = chat_unread_count('employee', employee.id)
                 
                 # Get team members (other employees in the same team)
                 team_members = TeamAssignment.objects.filter(
@@ -5918,7 +5071,7 @@ def team_chat_dashboard(request):
             
         elif tl_id:
             # Team Leader logged in
-            tl = TeamLeader.objects.get(id=tl_id)
+            tl = current_profile(request, TeamLeader, tl_id)
             context['user_role'] = 'tl'
             context['current_user'] = tl
             
@@ -5945,10 +5098,7 @@ def team_chat_dashboard(request):
             context['conversations'] = conversations
             
             # Get unread message count
-            context['unread_count'] = conversations.filter(
-                receiver_tl=tl,
-                is_read=False
-            ).count()
+            context['unread_count'] = chat_unread_count('tl', tl.id)
             
             # Recent messages (last 15)
             recent_messages = TeamChat.objects.filter(
@@ -5971,7 +5121,7 @@ def team_chat_dashboard(request):
         elif hr_id:
             # HR logged in - can see all conversations (optional feature)
             context['user_role'] = 'hr'
-            context['current_user'] = HRProfile.objects.get(id=hr_id)
+            context['current_user'] = current_profile(request, HRProfile, hr_id)
             
             # HR can see recent conversations from all teams
             all_conversations = TeamChat.objects.order_by('-created_at')[:50]
@@ -6035,9 +5185,9 @@ def send_team_message(request):
         sender_tl = None
         
         if employee_id:
-            sender_employee = Employee.objects.get(id=employee_id)
+            sender_employee = current_profile(request, Employee, employee_id)
         elif tl_id:
-            sender_tl = TeamLeader.objects.get(id=tl_id)
+            sender_tl = current_profile(request, TeamLeader, tl_id)
         
         # Get receiver objects
         receiver_employee = None
@@ -6091,20 +5241,22 @@ def send_team_message(request):
             except TeamChat.DoesNotExist:
                 pass
         
-        # Create the message
-        team_chat = TeamChat.objects.create(
-            sender_employee=sender_employee,
-            sender_tl=sender_tl,
-            receiver_employee=receiver_employee,
-            receiver_tl=receiver_tl,
-            chat_type=chat_type,
-            subject=subject,
-            message=message_text,
-            priority=priority,
-            parent_message=parent_message,
-            attachment=attachment,
-            attachment_name=attachment_name
-        )
+        # Create the message and count it as unread for the receiver in one transaction
+        with transaction.atomic():
+            team_chat = TeamChat.objects.create(
+                sender_employee=sender_employee,
+                sender_tl=sender_tl,
+                receiver_employee=receiver_employee,
+                receiver_tl=receiver_tl,
+                chat_type=chat_type,
+                subject=subject,
+                message=message_text,
+                priority=priority,
+                parent_message=parent_message,
+                attachment=attachment,
+                attachment_name=attachment_name
+            )
+            record_unread_message(team_chat)
         
         # Update reply count for parent message
         if parent_message:
@@ -6160,7 +5312,7 @@ def get_conversations(request):
         query = Q()
         
         if employee_id:
-            current_employee = Employee.objects.get(id=employee_id)
+            current_employee = current_profile(request, Employee, employee_id)
             
             if other_user_id and other_user_type:
                 if other_user_type == 'tl':
@@ -6182,7 +5334,7 @@ def get_conversations(request):
                 )
         
         elif tl_id:
-            current_tl = TeamLeader.objects.get(id=tl_id)
+            current_tl = current_profile(request, TeamLeader, tl_id)
             
             if other_user_id and other_user_type == 'employee':
                 other_employee = Employee.objects.get(id=other_user_id)
@@ -6201,37 +5353,7 @@ def get_conversations(request):
             'sender_employee', 'sender_tl', 'receiver_employee', 'receiver_tl', 'parent_message'
         ).order_by('-created_at')[offset:offset + limit]
         
-        # Prepare response data
-        conversation_data = []
-        for chat in conversations:
-            conversation_data.append({
-                'id': chat.id,
-                'chat_type': chat.chat_type,
-                'subject': chat.subject,
-                'message': chat.message,
-                'priority': chat.priority,
-                'is_read': chat.is_read,
-                'created_at': chat.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'sender': {
-                    'id': chat.sender_employee.id if chat.sender_employee else chat.sender_tl.id,
-                    'name': chat.get_sender_name(),
-                    'type': 'employee' if chat.sender_employee else 'tl',
-                    'image': chat.sender_employee.image.url if chat.sender_employee and chat.sender_employee.image else (
-                        chat.sender_tl.employee.image.url if chat.sender_tl and chat.sender_tl.employee.image else None
-                    )
-                },
-                'receiver': {
-                    'id': chat.receiver_employee.id if chat.receiver_employee else chat.receiver_tl.id,
-                    'name': chat.get_receiver_name(),
-                    'type': 'employee' if chat.receiver_employee else 'tl'
-                },
-                'has_attachment': bool(chat.attachment),
-                'attachment_name': chat.attachment_name,
-                'replies_count': chat.replies_count,
-                'likes_count': chat.likes_count,
-                'is_reply': bool(chat.parent_message),
-                'parent_message_id': chat.parent_message.id if chat.parent_message else None
-            })
+        conversation_data = [serialize_chat_message(chat) for chat in conversations]
         
         return JsonResponse({
             'success': True,
@@ -6272,19 +5394,11 @@ def mark_messages_read(request):
         if not message_ids:
             return JsonResponse({'success': False, 'error': 'No message IDs provided'})
         
-        # Build query to mark messages as read
-        query = Q(id__in=message_ids)
-        
-        if employee_id:
-            query &= Q(receiver_employee_id=employee_id)
-        elif tl_id:
-            query &= Q(receiver_tl_id=tl_id)
-        
-        # Mark messages as read
-        updated_count = TeamChat.objects.filter(query).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        # Mark messages as read (also bumps updated_at so chat-sync clients pick it up)
+        role, profile_id = ('employee', employee_id) if employee_id else ('tl', tl_id)
+        updated_count = mark_chat_read(role, profile_id, message_ids)
+        if updated_count:
+            notify_unread_count(role, profile_id)
         
         return JsonResponse({
             'success': True,
@@ -6334,9 +5448,9 @@ def chat_reaction(request):
         tl = None
         
         if employee_id:
-            employee = Employee.objects.get(id=employee_id)
+            employee = current_profile(request, Employee, employee_id)
         elif tl_id:
-            tl = TeamLeader.objects.get(id=tl_id)
+            tl = current_profile(request, TeamLeader, tl_id)
         
         if action == 'add':
             # Add reaction
@@ -6407,17 +5521,11 @@ def get_unread_count(request):
         if not (employee_id or tl_id):
             return JsonResponse({'success': False, 'error': 'User not authenticated'})
         
-        # Get unread count
+        # Get unread count (counter table primary key read)
         if employee_id:
-            unread_count = TeamChat.objects.filter(
-                receiver_employee_id=employee_id,
-                is_read=False
-            ).count()
+            unread_count = chat_unread_count('employee', employee_id)
         elif tl_id:
-            unread_count = TeamChat.objects.filter(
-                receiver_tl_id=tl_id,
-                is_read=False
-            ).count()
+            unread_count = chat_unread_count('tl', tl_id)
         
         return JsonResponse({
             'success': True,
@@ -6428,6 +5536,98 @@ def get_unread_count(request):
         return JsonResponse({'success': False, 'error': f'Error getting unread count: {str(e)}'})
 
 
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def sync_team_chat(request):
+    """
+    Sync Team Chat - API endpoint for incremental polling
+    
+    Returns messages created, edited or marked read since ``cursor`` (or with an
+    id above ``since_id``), the cursor to send next time and the unread count.
+    Without either parameter no messages are returned, only a cursor at the
+    current head of the conversation.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    try:
+        # Get user information
+        employee_id = request.session.get('employee_id')
+        tl_id = request.session.get('tl_id')
+        
+        if not (employee_id or tl_id):
+            return JsonResponse({'success': False, 'error': 'User not authenticated'})
+        
+        role, profile_id = ('employee', employee_id) if employee_id else ('tl', tl_id)
+        
+        cursor = request.GET.get('cursor') or None
+        since_id = request.GET.get('since_id')
+        try:
+            since_id = int(since_id) if since_id else None
+            limit = min(max(int(request.GET.get('limit', SYNC_DEFAULT_LIMIT)), 1), SYNC_MAX_LIMIT)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid since_id or limit'})
+        
+        try:
+            messages_changed, next_cursor, has_more = chat_changes(
+                role, profile_id, cursor=cursor, since_id=since_id, limit=limit
+            )
+        except InvalidCursor:
+            return JsonResponse({'success': False, 'error': 'Invalid cursor'})
+        
+        return JsonResponse({
+            'success': True,
+            'messages': [serialize_chat_message(chat) for chat in messages_changed],
+            'cursor': next_cursor,
+            'has_more': has_more,
+            'unread_count': chat_unread_count(role, profile_id)
+        })
+        
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': f'Error syncing messages: {str(e)}'})
+
+
+def _stream_subscription(request):
+    """(channels, initial events) for the session's chat stream, or None when not logged in"""
+    employee_id = request.session.get('employee_id')
+    tl_id = request.session.get('tl_id')
+    if not (employee_id or tl_id):
+        return None
+    role, profile_id = ('employee', int(employee_id)) if employee_id else ('tl', int(tl_id))
+    return chat_stream_channels(role, profile_id), [unread_event(role, profile_id)]
+
+
+async def chat_stream(request):
+    """
+    Chat Stream - Server-Sent Events push for team chat and project discussions
+    
+    Streams 'chat.message', 'chat.unread' and 'project.discussion' events (and
+    'resync' if the client fell behind, after which it should call chat-sync).
+    Replaces polling get-unread-count and get-project-discussions.
+    
+    Only served by the ASGI process (daphne hrms.asgi:application). Under WSGI
+    the response would be read to the end before sending anything, holding a
+    sync worker until it is killed, so the view answers 503 and clients keep
+    polling.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    if not isinstance(request, ASGIRequest):
+        response = JsonResponse({'success': False, 'error': 'Chat stream is only available from the ASGI server'}, status=503)
+        response['Retry-After'] = '300'
+        return response
+    
+    subscription = await sync_to_async(_stream_subscription)(request)
+    if subscription is None:
+        return JsonResponse({'success': False, 'error': 'User not authenticated'}, status=401)
+    
+    channels, initial_events = subscription
+    response = StreamingHttpResponse(sse_events(channels, initial_events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
+
+
 @login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
 def chat_search(request):
     """
@@ -6452,34 +5652,24 @@ def chat_search(request):
         if not query_text:
             return JsonResponse({'success': False, 'error': 'Search query is required'})
         
-        # Build search query
-        if employee_id:
-            search_query = Q(
-                Q(sender_employee_id=employee_id) | Q(receiver_employee_id=employee_id),
-                Q(message__icontains=query_text) | Q(subject__icontains=query_text)
-            )
-        elif tl_id:
-            search_query = Q(
-                Q(sender_tl_id=tl_id) | Q(receiver_tl_id=tl_id),
-                Q(message__icontains=query_text) | Q(subject__icontains=query_text)
-            )
+        limit = min(max(limit, 1), 50)
+        offset = max(offset, 0)
         
-        # Search messages
-        search_results = TeamChat.objects.filter(search_query).select_related(
-            'sender_employee', 'sender_tl', 'receiver_employee', 'receiver_tl'
-        ).order_by('-created_at')[offset:offset + limit]
+        # Ranked lookup on the search token index (see app.search)
+        role, profile_id = ('employee', employee_id) if employee_id else ('tl', tl_id)
+        search_results, total, total_is_estimate, (terms, prefix) = search_team_chat(
+            role, profile_id, query_text, offset=offset, limit=limit
+        )
         
         # Prepare response data
         results_data = []
         for chat in search_results:
-            # Highlight search terms
-            highlighted_message = chat.message
-            highlighted_subject = chat.subject
-            
             results_data.append({
                 'id': chat.id,
-                'message': highlighted_message,
-                'subject': highlighted_subject,
+                'message': chat.message,
+                'subject': chat.subject,
+                'message_highlighted': highlight(chat.message, terms, prefix),
+                'subject_highlighted': highlight(chat.subject, terms, prefix),
                 'created_at': chat.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'sender_name': chat.get_sender_name(),
                 'receiver_name': chat.get_receiver_name(),
@@ -6490,7 +5680,9 @@ def chat_search(request):
         return JsonResponse({
             'success': True,
             'results': results_data,
-            'total': search_results.count(),
+            'total': total,
+            'total_is_estimate': total_is_estimate,
+            'has_more': offset + len(results_data) < total,
             'query': query_text
         })
         
@@ -6498,6 +5690,67 @@ def chat_search(request):
         return JsonResponse({'success': False, 'error': f'Error searching messages: {str(e)}'})
 
 
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def project_discussion_search(request):
+    """
+    Search Project Discussions - API endpoint for searching discussions in the
+    user's projects (optionally one project via ``project_id``)
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    try:
+        # Get user information
+        employee_id = request.session.get('employee_id')
+        tl_id = request.session.get('tl_id')
+        
+        if not (employee_id or tl_id):
+            return JsonResponse({'success': False, 'error': 'User not authenticated'})
+        
+        query_text = request.GET.get('q', '').strip()
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 50)
+        offset = max(int(request.GET.get('offset', 0)), 0)
+        
+        if not query_text:
+            return JsonResponse({'success': False, 'error': 'Search query is required'})
+        
+        # Only projects the user belongs to (employee) or leads (TL)
+        if employee_id:
+            projects = ProjectAssignment.objects.filter(team_members__id=employee_id)
+        else:
+            projects = ProjectAssignment.objects.filter(team_leader_id=tl_id)
+        project_id = request.GET.get('project_id')
+        if project_id:
+            projects = projects.filter(id=project_id)
+        project_ids = list(projects.values_list('id', flat=True))
+        
+        discussions, total, total_is_estimate, (terms, prefix) = search_project_discussions(
+            project_ids, query_text, offset=offset, limit=limit
+        )
+        
+        results_data = []
+        for discussion in discussions:
+            result = serialize_project_discussion(discussion)
+            result['project_id'] = discussion.project_id
+            result['subject_highlighted'] = highlight(discussion.subject, terms, prefix)
+            result['content_highlighted'] = highlight(discussion.content, terms, prefix)
+            results_data.append(result)
+        
+        return JsonResponse({
+            'success': True,
+            'results': results_data,
+            'total': total,
+            'total_is_estimate': total_is_estimate,
+            'has_more': offset + len(results_data) < total,
+            'query': query_text
+        })
+        
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit or offset'})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': f'Error searching project discussions: {str(e)}'})
+
+
 # ============================================================================
 # NEW ENHANCED ATTENDANCE SYSTEM VIEWS
 # ============================================================================
@@ -6515,7 +5768,7 @@ def enhanced_attendance_dashboard(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         
@@ -6571,7 +5824,7 @@ def mark_present_today(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         
@@ -6641,7 +5894,7 @@ def mark_absent_today(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         
@@ -6691,7 +5944,7 @@ def work_complete_today(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         today = timezone.now().date()
         current_time = timezone.now().time()
         current_datetime = timezone.now()
@@ -6768,7 +6021,7 @@ def mark_present_date(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get the date from request
         import json
@@ -6877,7 +6130,7 @@ def mark_absent_date(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get the date and reason from request
         import json
@@ -6944,7 +6197,7 @@ def get_attendance_calendar(request):
         return JsonResponse({'success': False, 'error': 'User not authenticated'})
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get date range from request (default: current month)
         month = request.GET.get('month')
@@ -6959,91 +6212,10 @@ def get_attendance_calendar(request):
             month = today.month
             year = today.year
         
-        # Get first and last day of the month
-        import calendar
-        first_day = date(year, month, 1)
-        if month == 12:
-            last_day = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            last_day = date(year, month + 1, 1) - timedelta(days=1)
-        
-        # Get attendance records for the month
-        present_records = PresentRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[first_day, last_day]
-        )
-        
-        absent_records = AbsentRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[first_day, last_day]
-        )
-        
-        late_mark_records = LateMarkRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[first_day, last_day]
-        )
-        
-        # Create calendar data
-        calendar_data = []
-        current_date = first_day
-        
-        while current_date <= last_day:
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Check status for this date
-            status = 'no_record'
-            record_id = None
-            details = {}
-            
-            present = present_records.filter(attendance_date=current_date).first()
-            if present:
-                status = 'present'
-                record_id = present.id
-                details = {
-                    'check_in_time': present.check_in_time.strftime('%H:%M:%S') if present.check_in_time else None,
-                    'marked_time': present.marked_time.strftime('%Y-%m-%d %H:%M:%S') if present.marked_time else None
-                }
-            else:
-                late_mark = late_mark_records.filter(attendance_date=current_date).first()
-                if late_mark:
-                    status = 'late_mark'
-                    record_id = late_mark.id
-                    details = {
-                        'late_minutes': late_mark.late_minutes,
-                        'actual_check_in_time': late_mark.actual_check_in_time.strftime('%H:%M:%S') if late_mark.actual_check_in_time else None
-                    }
-                else:
-                    absent = absent_records.filter(attendance_date=current_date).first()
-                    if absent:
-                        status = 'absent'
-                        record_id = absent.id
-                        details = {
-                            'reason': absent.reason,
-                            'marked_time': absent.marked_time.strftime('%Y-%m-%d %H:%M:%S') if absent.marked_time else None
-                        }
-            
-            calendar_data.append({
-                'date': date_str,
-                'day': current_date.day,
-                'status': status,
-                'record_id': record_id,
-                'details': details,
-                'is_past': current_date < timezone.now().date(),
-                'is_today': current_date == timezone.now().date(),
-                'is_weekend': current_date.weekday() >= 5  # Saturday = 5, Sunday = 6
-            })
-            
-            current_date += timedelta(days=1)
+        # Past months are served from cache; other months cost three queries
+        calendar_payload = build_attendance_calendar(employee.id, year, month)
         
-        return JsonResponse({
-            'success': True,
-            'calendar_data': calendar_data,
-            'month': month,
-            'year': year,
-            'month_name': calendar.month_name[month],
-            'first_day': first_day.strftime('%Y-%m-%d'),
-            'last_day': last_day.strftime('%Y-%m-%d')
-        })
+        return JsonResponse({'success': True, **calendar_payload})
         
     except Employee.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Employee not found'})
@@ -7111,7 +6283,7 @@ def attendance_table_view(request):
         return render_attendance_public_info(request)
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get date range from request (default: last 30 days)
         from_date = request.GET.get('from_date')
@@ -7134,81 +6306,25 @@ def attendance_table_view(request):
         if records_per_page not in valid_page_sizes:
             records_per_page = 20
         
-        # Get attendance records
-        present_records = PresentRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[from_date, to_date]
-        ).order_by('attendance_date')
-        
-        absent_records = AbsentRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[from_date, to_date]
-        ).order_by('attendance_date')
-        
-        late_mark_records = LateMarkRecord.objects.filter(
-            employee=employee,
-            attendance_date__range=[from_date, to_date]
-        ).order_by('attendance_date')
-        
-        work_completions = DailyWorkCompletion.objects.filter(
-            employee=employee,
-            work_date__range=[from_date, to_date]
-        ).order_by('work_date')
-        
-        # Combine all records into a unified table
-        attendance_table = []
-        current_date = from_date
-        
-        while current_date <= to_date:
-            record = {
-                'date': current_date,
-                'status': 'No Record',
-                'time': '',
-                'details': '',
-                'work_completion': None
-            }
-            
-            # Check Present Record
-            present = present_records.filter(attendance_date=current_date).first()
-            if present:
-                record['status'] = 'Present'
-                record['time'] = present.marked_time.strftime('%H:%M:%S')
-                record['details'] = f"Checked in at {present.check_in_time.strftime('%H:%M:%S') if present.check_in_time else 'N/A'}"
-            
-            # Check Late Mark Record
-            late_mark = late_mark_records.filter(attendance_date=current_date).first()
-            if late_mark:
-                record['status'] = 'Late Mark'
-                record['time'] = late_mark.marked_time.strftime('%H:%M:%S')
-                record['details'] = f"Late by {late_mark.late_minutes} minutes"
-            
-            # Check Absent Record
-            absent = absent_records.filter(attendance_date=current_date).first()
-            if absent:
-                record['status'] = 'Absent'
-                record['time'] = absent.marked_time.strftime('%H:%M:%S')
-                record['details'] = absent.reason or 'No reason provided'
-            
-            # Check Work Completion
-            work_completion = work_completions.filter(work_date=current_date).first()
-            if work_completion:
-                record['work_completion'] = work_completion
-            
-            attendance_table.append(record)
-            current_date += timedelta(days=1)
-        
-        # Calculate statistics
-        total_days = len(attendance_table)
-        present_days = len([r for r in attendance_table if r['status'] == 'Present'])
-        late_mark_days = len([r for r in attendance_table if r['status'] == 'Late Mark'])
-        absent_days = len([r for r in attendance_table if r['status'] == 'Absent'])
-        no_record_days = len([r for r in attendance_table if r['status'] == 'No Record'])
-        
-        # Apply pagination
-        total_records = len(attendance_table)
+        # Paginate the days first, then load record details for this page only
+        all_dates = dates_between(from_date, to_date)
+        total_records = len(all_dates)
         start_index = (page - 1) * records_per_page
         end_index = start_index + records_per_page
-        paginated_attendance_table = attendance_table[start_index:end_index]
+        page_dates = all_dates[start_index:end_index]
+        
+        paginated_attendance_table = []
+        if page_dates:
+            attendance_rows = build_attendance_matrix([employee], page_dates[0], page_dates[-1])
+            paginated_attendance_table = attendance_rows[0]['cells']
+        
+        # Statistics cover the whole range from a status-only pass
+        status_counts = attendance_status_counts([employee.id], from_date, to_date)[employee.id]
+        total_days = total_records
+        present_days = status_counts['Present']
+        late_mark_days = status_counts['Late Mark']
+        absent_days = status_counts['Absent']
+        no_record_days = total_days - present_days - late_mark_days - absent_days
         
         # Calculate pagination info
         total_pages = (total_records + records_per_page - 1) // records_per_page  # Ceiling division
@@ -7216,16 +6332,7 @@ def attendance_table_view(request):
         has_next = page < total_pages
         
         # Generate page numbers for pagination controls
-        page_numbers = []
-        if total_pages <= 7:
-            page_numbers = list(range(1, total_pages + 1))
-        else:
-            if page <= 4:
-                page_numbers = [1, 2, 3, 4, 5, '...', total_pages]
-            elif page >= total_pages - 3:
-                page_numbers = [1, '...', total_pages - 4, total_pages - 3, total_pages - 2, total_pages - 1, total_pages]
-            else:
-                page_numbers = [1, '...', page - 1, page, page + 1, '...', total_pages]
+        page_numbers = page_numbers_for(page, total_pages)
         
         context = {
             'employee': employee,
@@ -7275,7 +6382,7 @@ def hr_enhanced_attendance_view(request):
         return redirect('login')
     
     try:
-        hr = HRProfile.objects.get(id=hr_id)
+        hr = current_profile(request, HRProfile, hr_id)
         
         # Get date range (default: current month)
         from_date = request.GET.get('from_date')
@@ -7294,39 +6401,21 @@ def hr_enhanced_attendance_view(request):
             else:
                 to_date = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
         
-        # Get all employees
-        employees = Employee.objects.filter(resigned_date__isnull=True).order_by('first_name')
-        
-        # Get attendance records for the date range
-        present_records = PresentRecord.objects.filter(
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        absent_records = AbsentRecord.objects.filter(
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        late_mark_records = LateMarkRecord.objects.filter(
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        work_completions = DailyWorkCompletion.objects.filter(
-            work_date__range=[from_date, to_date]
-        ).select_related('employee')
+        # Get all employees; only the requested page is expanded into a day grid
+        employees = Employee.objects.filter(resigned_date__isnull=True).order_by('first_name', 'id')
+        employees_page = paginate_attendance_employees(request, employees)
+        attendance_rows = build_attendance_matrix(list(employees_page.object_list), from_date, to_date)
         
         context = {
             'hr': hr,
-            'employees': employees,
-            'present_records': present_records,
-            'absent_records': absent_records,
-            'late_mark_records': late_mark_records,
-            'work_completions': work_completions,
+            'employees': employees_page.object_list,
+            'attendance_rows': attendance_rows,
+            'page_obj': employees_page,
+            'page_size': employees_page.paginator.per_page,
             'from_date': from_date,
             'to_date': to_date,
-            'total_employees': employees.count(),
-            'total_present': present_records.count(),
-            'total_absent': absent_records.count(),
-            'total_late_mark': late_mark_records.count(),
+            'total_employees': employees_page.paginator.count,
+            **attendance_range_summary(from_date, to_date),
         }
         
         return render(request, 'app/hr/enhanced-attendance.html', context)
@@ -7347,14 +6436,12 @@ def tl_enhanced_attendance_view(request):
         return redirect('login')
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         
         # Get team members
         team_assignments = TeamAssignment.objects.filter(
             team_leader=tl
-        ).select_related('employee')
-        
-        team_members = [assignment.employee for assignment in team_assignments]
+        )
         
         # Get date range (default: current month)
         from_date = request.GET.get('from_date')
@@ -7373,40 +6460,23 @@ def tl_enhanced_attendance_view(request):
             else:
                 to_date = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
         
-        # Get attendance records for team members
-        present_records = PresentRecord.objects.filter(
-            employee__in=team_members,
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        absent_records = AbsentRecord.objects.filter(
-            employee__in=team_members,
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        late_mark_records = LateMarkRecord.objects.filter(
-            employee__in=team_members,
-            attendance_date__range=[from_date, to_date]
-        ).select_related('employee')
-        
-        work_completions = DailyWorkCompletion.objects.filter(
-            employee__in=team_members,
-            work_date__range=[from_date, to_date]
-        ).select_related('employee')
+        # Only the requested page of team members is expanded into a day grid
+        team_members = Employee.objects.filter(
+            id__in=team_assignments.values('employee_id')
+        ).order_by('first_name', 'id')
+        members_page = paginate_attendance_employees(request, team_members)
+        attendance_rows = build_attendance_matrix(list(members_page.object_list), from_date, to_date)
         
         context = {
             'tl': tl,
-            'team_members': team_members,
-            'present_records': present_records,
-            'absent_records': absent_records,
-            'late_mark_records': late_mark_records,
-            'work_completions': work_completions,
+            'team_members': members_page.object_list,
+            'attendance_rows': attendance_rows,
+            'page_obj': members_page,
+            'page_size': members_page.paginator.per_page,
             'from_date': from_date,
             'to_date': to_date,
-            'team_size': len(team_members),
-            'total_present': present_records.count(),
-            'total_absent': absent_records.count(),
-            'total_late_mark': late_mark_records.count(),
+            'team_size': members_page.paginator.count,
+            **attendance_range_summary(from_date, to_date, employees=team_members),
         }
         
         return render(request, 'app/tl/enhanced-attendance.html', context)
@@ -7429,7 +6499,7 @@ def employee_project_discussions(request):
         return redirect('login')
     
     try:
-        employee = Employee.objects.get(id=employee_id)
+        employee = current_profile(request, Employee, employee_id)
         
         # Get projects assigned to this employee
         projects = ProjectAssignment.objects.filter(
@@ -7494,7 +6564,7 @@ def tl_project_discussions(request):
         return redirect('login')
     
     try:
-        tl = TeamLeader.objects.get(id=tl_id)
+        tl = current_profile(request, TeamLeader, tl_id)
         employee = tl.employee
         
         # Get projects led by this TL
@@ -7593,14 +6663,14 @@ def send_project_message(request):
         sender_tl = None
         
         if employee_id:
-            sender_employee = Employee.objects.get(id=employee_id)
+            sender_employee = current_profile(request, Employee, employee_id)
             
             # Verify employee is part of this project
             if not project.team_members.filter(id=employee_id).exists():
                 return JsonResponse({'success': False, 'error': 'You are not assigned to this project'})
                 
         elif tl_id:
-            sender_tl = TeamLeader.objects.get(id=tl_id)
+            sender_tl = current_profile(request, TeamLeader, tl_id)
             
             # Verify TL is leading this project
             if project.team_leader != sender_tl:
@@ -7717,36 +6787,7 @@ def get_project_discussions(request):
             'sender_employee', 'sender_tl', 'receiver_employee', 'receiver_tl'
         ).order_by('-created_at')[:50]  # Last 50 discussions
         
-        # Prepare response data
-        discussions_data = []
-        for discussion in discussions:
-            # Determine sender
-            if discussion.sender_employee:
-                sender_name = f"{discussion.sender_employee.first_name} {discussion.sender_employee.last_name}"
-                sender_type = 'employee'
-            elif discussion.sender_tl:
-                sender_name = f"TL {discussion.sender_tl.employee.first_name} {discussion.sender_tl.employee.last_name}"
-                sender_type = 'tl'
-            else:
-                sender_name = 'Unknown'
-                sender_type = 'unknown'
-            
-            discussions_data.append({
-                'id': discussion.id,
-                'sender_name': sender_name,
-                'sender_type': sender_type,
-                'subject': discussion.subject,
-                'content': discussion.content,
-                'priority': discussion.priority,
-                'priority_display': discussion.get_priority_display(),
-                'message_type': discussion.message_type,
-                'message_type_display': discussion.get_message_type_display(),
-                'created_at': discussion.created_at.isoformat(),
-                'created_at_human': discussion.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'has_attachment': bool(discussion.attachment),
-                'attachment_url': discussion.attachment.url if discussion.attachment else None,
-                'attachment_name': discussion.attachment_name,
-            })
+        discussions_data = [serialize_project_discussion(discussion) for discussion in discussions]
         
         return JsonResponse({
             'success': True,
@@ -7759,3 +6800,91 @@ def get_project_discussions(request):
         return JsonResponse({'success': False, 'error': 'Project not found'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': f'Error fetching project discussions: {str(e)}'})
+
+
+# ============================================================================
+# BACKGROUND JOB VIEWS
+# ============================================================================
+
+def _job_payload(job):
+    """JSON-friendly view of a BackgroundJob for the polling endpoints"""
+    payload = {
+        'job_id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error if job.status == 'failed' else None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('job-status', args=[job.id]),
+        'download_url': None,
+    }
+    if job.status == 'completed' and job.result_file:
+        payload['download_url'] = reverse('job-download', args=[job.id])
+    return payload
+
+
+def enqueue_job_response(request, job_type, params=None):
+    """Queue a job for the logged-in HR user and answer with its polling URLs"""
+    hr_id = request.session.get('hr_id')
+    if not hr_id:
+        return JsonResponse({'success': False, 'message': 'Only HR can run background jobs'}, status=403)
+
+    hr = HRProfile.objects.filter(id=hr_id).only('id', 'full_name').first()
+    if not hr:
+        return JsonResponse({'success': False, 'message': 'HR profile not found'}, status=403)
+
+    job = enqueue_job(job_type, params, requested_by=f"{hr.full_name} (HR)", requested_by_hr=hr)
+    return JsonResponse({'success': True, **_job_payload(job)}, status=202)
+
+
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def enqueue_background_job(request):
+    """AJAX endpoint to queue a background job (POST: job_type, optional JSON params)"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Only POST method is allowed'}, status=405)
+
+    import json
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+        job_type = data.get('job_type')
+        params = data.get('params') or {}
+        if isinstance(params, str):
+            params = json.loads(params)
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+
+    if job_type not in dict(BackgroundJob.JOB_TYPE_CHOICES):
+        return JsonResponse({'success': False, 'message': 'Unknown job type'}, status=400)
+
+    try:
+        return enqueue_job_response(request, job_type, params)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': f'Invalid job parameters: {e}'}, status=400)
+
+
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def background_job_status(request, job_id):
+    """Polling endpoint for a queued job's progress"""
+    hr_id = request.session.get('hr_id')
+    job = BackgroundJob.objects.filter(id=job_id, requested_by_hr_id=hr_id).first()
+    if not hr_id or not job:
+        return JsonResponse({'success': False, 'message': 'Job not found'}, status=404)
+    return JsonResponse({'success': True, **_job_payload(job)})
+
+
+@login_required_with_exemptions(exempt_urls=['create-hr', 'hr-list'])
+def download_job_result(request, job_id):
+    """Download the file produced by a completed job"""
+    hr_id = request.session.get('hr_id')
+    job = BackgroundJob.objects.filter(id=job_id, requested_by_hr_id=hr_id, status='completed').first()
+    if not hr_id or not job or not job.result_file:
+        raise Http404("Job result not found")
+
+    try:
+        result = job.result_file.open('rb')
+    except FileNotFoundError:
+        raise Http404("Job result file is no longer available")
+    file_name = (job.result or {}).get('file_name') or os.path.basename(job.result_file.name)
+    return FileResponse(result, as_attachment=True, filename=file_name)
@@ -2,12 +2,16 @@
 Health check views for deployment monitoring
 """
 
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.db import connection
 from django.core.cache import cache
 from django.conf import settings
+import hmac
+import ipaddress
 import time
 
+from .metrics import collect, render_prometheus
+
 # Optional redis import
 try:
     import redis
@@ -205,4 +209,41 @@ def liveness_check(request):
         return JsonResponse({
             'status': 'dead',
             'reason': str(e)
-        }, status=503)
\ No newline at end of file
+        }, status=503)
+
+
+def _metrics_allowed(request):
+    """
+    Bearer token check when METRICS_TOKEN is set, otherwise the client address
+    must be inside METRICS_ALLOWED_NETWORKS. REMOTE_ADDR is used as is, never
+    X-Forwarded-For, so a client cannot claim an allowed address.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ').strip()
+        return hmac.compare_digest(supplied.encode(), token.encode())
+    
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', ['127.0.0.1/32', '::1/128'])
+    )
+
+
+def metrics(request):
+    """
+    Prometheus metrics endpoint - aggregated over every gunicorn worker
+    """
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        raise Http404("Metrics are disabled")
+    
+    if not _metrics_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    return HttpResponse(
+        render_prometheus(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
\ No newline at end of file
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark the morning check-in rush
+
+Creates temporary employees, has them all check in at once from a pool of
+threads and reports latency percentiles and throughput, for both the
+attendance page (POST employee-check-in/) and the JSON check API
+(POST api/attendance/check/). Temporary rows are deleted afterwards.
+
+Usage:
+    python benchmark_checkin_rush.py [--employees 200] [--threads 16]
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrms.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from app.models import Employee, Attendance, AttendanceCheckLog, DailyAttendanceRollup
+
+EMAIL_DOMAIN = 'checkin-benchmark.invalid'
+
+# A working day inside the check-in window, so the run does not depend on the wall clock
+RUSH_TIME = timezone.make_aware(datetime(2030, 1, 7, 10, 30))
+
+
+def create_employees(count):
+    Employee.objects.bulk_create([
+        Employee(
+            first_name='Bench',
+            last_name=f'Employee{i}',
+            email=f'bench{i}@{EMAIL_DOMAIN}',
+            password='benchmark',
+            company_id=f'BENCH{i:05d}',
+            department='IT',
+            designation='Engineer',
+            package=600000,
+        )
+        for i in range(count)
+    ])
+    # Backends without INSERT ... RETURNING (MySQL) leave bulk_create primary keys unset
+    return list(Employee.objects.filter(email__endswith=EMAIL_DOMAIN).only('id').order_by('id'))
+
+
+def cleanup():
+    employees = Employee.objects.filter(email__endswith=EMAIL_DOMAIN)
+    AttendanceCheckLog.objects.filter(employee__in=employees).delete()
+    Attendance.objects.filter(employee__in=employees).delete()
+    employees.delete()
+    DailyAttendanceRollup.objects.filter(date=RUSH_TIME.date()).delete()
+
+
+def run_rush(employees, threads, path, data):
+    """POST ``data`` to ``path`` once per employee; returns (latencies in ms, failures, wall seconds)"""
+    local = threading.local()
+
+    def check_in(employee):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        session = local.client.session
+        session['employee_id'] = employee.id
+        session['role'] = 'employee'
+        session.save()
+        local.client.cookies['sessionid'] = session.session_key
+
+        started = time.perf_counter()
+        response = local.client.post(path, data)
+        elapsed = (time.perf_counter() - started) * 1000
+        connection.close()
+        return elapsed, response.status_code in (200, 302)
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(check_in, employees))
+    wall = time.perf_counter() - wall_started
+
+    latencies = [elapsed for elapsed, _ in results]
+    failures = sum(1 for _, ok in results if not ok)
+    return latencies, failures, wall
+
+
+def report(label, latencies, failures, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    print(f"{label}")
+    print(f"  requests:   {len(latencies)} ({failures} failed)")
+    print(f"  p50:        {statistics.median(latencies):.1f} ms")
+    print(f"  p95:        {p95:.1f} ms")
+    print(f"  max:        {latencies[-1]:.1f} ms")
+    print(f"  throughput: {len(latencies) / wall:.1f} check-ins/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    print("Check-in Rush Benchmark")
+    print("=" * 50)
+    print(f"{args.employees} employees, {args.threads} threads, check-in at {RUSH_TIME:%Y-%m-%d %H:%M}")
+
+    scenarios = [
+        ("Attendance page (POST /employee-check-in/)", '/employee-check-in/', {'action': 'check_in'}),
+        ("Check API (POST /api/attendance/check/)", '/api/attendance/check/', {'action': 'check_in'}),
+    ]
+
+    cleanup()
+    try:
+        with patch('django.utils.timezone.now', return_value=RUSH_TIME):
+            for label, path, data in scenarios:
+                employees = create_employees(args.employees)
+                try:
+                    latencies, failures, wall = run_rush(employees, args.threads, path, data)
+                    checked_in = Attendance.objects.filter(
+                        employee__in=employees, check_in_time__isnull=False
+                    ).count()
+                    report(label, latencies, failures, wall)
+                    print(f"  checked in: {checked_in}/{len(employees)}")
+                finally:
+                    cleanup()
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark the team leader pages against team size
+
+Creates temporary teams of growing size (with a month of attendance and a few
+leaves per member) and counts the SQL queries run by TeamSnapshot.load and by
+the TL dashboard, team attendance and manage team pages. Every count should
+stay the same from the smallest team to the largest.
+Leaves are saved one by one so the leave ledger and LeaveDay rows the pages
+read are filled in by their signals. Temporary rows are deleted afterwards.
+
+Usage:
+    python benchmark_team_snapshot.py [--sizes 5 25 100]
+"""
+
+import os
+import sys
+import argparse
+import time
+from datetime import timedelta
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrms.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from app.models import Employee, TeamLeader, TeamAssignment, Attendance, LeaveApply
+from app.fragments import bump_generation
+from app.team import TeamSnapshot
+
+EMAIL_DOMAIN = 'team-benchmark.invalid'
+
+PAGES = [
+    ("TL dashboard", '/tl-dashboard/'),
+    ("Team attendance", '/team-attendence/'),
+    ("Manage team", '/tl-manage-team/'),
+]
+
+STATUSES = ['present', 'present', 'late', 'half_day', 'absent']
+
+
+def create_team(size, today):
+    Employee.objects.bulk_create([
+        Employee(
+            first_name='Bench',
+            last_name=f'Member{i}',
+            email=f'team{size}-{i}@{EMAIL_DOMAIN}',
+            password='benchmark',
+            company_id=f'TEAM{size:04d}{i:05d}',
+            department='IT',
+            designation='Engineer',
+            package=600000,
+        )
+        for i in range(size + 1)
+    ])
+    # Backends without INSERT ... RETURNING (MySQL) leave bulk_create primary keys unset
+    employees = list(Employee.objects.filter(email__startswith=f'team{size}-', email__endswith=EMAIL_DOMAIN).order_by('company_id'))
+    leader, members = employees[0], employees[1:]
+    tl = TeamLeader.objects.create(employee=leader, experience_years=5, team_size=str(size))
+    TeamAssignment.objects.bulk_create([
+        TeamAssignment(team_leader=tl, employee=employee, role='Engineer', assignment_date=today)
+        for employee in members
+    ])
+
+    month_start = today.replace(day=1)
+    days = [month_start + timedelta(days=n) for n in range((today - month_start).days + 1)]
+    Attendance.objects.bulk_create([
+        Attendance(employee=employee, attendance_date=day, status=STATUSES[(i + n) % len(STATUSES)])
+        for i, employee in enumerate(members)
+        for n, day in enumerate(days)
+    ])
+    # save(), not bulk_create: the ledger and LeaveDay signals must see every leave
+    for employee in members:
+        for leave_type, status in [('sick', 'approved'), ('casual', 'approved'), ('annual', 'pending')]:
+            LeaveApply.objects.create(
+                employee=employee,
+                leave_type=leave_type,
+                start_date=month_start,
+                end_date=month_start,
+                total_days=1,
+                reason='Benchmark',
+                status=status,
+            )
+    return tl
+
+
+def cleanup():
+    Employee.objects.filter(email__endswith=EMAIL_DOMAIN).delete()
+
+
+def tl_client(tl):
+    client = Client()
+    session = client.session
+    session['tl_id'] = tl.id
+    session['role'] = 'tl'
+    session.save()
+    client.cookies['sessionid'] = session.session_key
+    return client
+
+
+def count_queries(run):
+    """(queries, milliseconds) for one call of ``run``"""
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        run()
+        elapsed = (time.perf_counter() - started) * 1000
+    return len(queries), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 25, 100])
+    args = parser.parse_args()
+
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+
+    print("Team Snapshot Benchmark")
+    print("=" * 50)
+
+    scenarios = [("TeamSnapshot.load (month, leaves)", None)] + PAGES
+    results = {label: [] for label, _ in scenarios}
+
+    cleanup()
+    try:
+        for size in args.sizes:
+            tl = create_team(size, today)
+            client = tl_client(tl)
+            for label, path in scenarios:
+                if path is None:
+                    run = lambda: TeamSnapshot.load(tl.id, month_start, today)
+                else:
+                    # Cold fragments for this team only, so the dashboard builds its widgets
+                    # without clearing sessions or other users' cached entries
+                    bump_generation('team', tl.id)
+                    bump_generation('announcements')
+                    run = lambda: client.get(path)
+                results[label].append(count_queries(run))
+            cleanup()
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        cleanup()
+        sys.exit(1)
+
+    header = ''.join(f"{size:>18}" for size in args.sizes)
+    print(f"{'team size':<36}{header}")
+    constant = True
+    for label, _ in scenarios:
+        cells = ''.join(f"{queries:>8} q {elapsed:>6.1f}ms" for queries, elapsed in results[label])
+        print(f"{label:<36}{cells}")
+        if len({queries for queries, _ in results[label]}) > 1:
+            constant = False
+
+    if constant:
+        print("✅ Query counts are independent of team size")
+    else:
+        print("❌ Query counts grow with team size")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -82,6 +82,8 @@ worker_tmp_dir = "/dev/shm"
 # Hooks
 def on_starting(server):
     server.log.info("Starting Django HRMS server...")
+    from app.metrics import reset_metrics_dir
+    reset_metrics_dir()
 
 def on_reload(server):
     server.log.info("Reloading Django HRMS server...")
@@ -107,5 +109,10 @@ def pre_exec(server):
 def when_ready(server):
     server.log.info("Django HRMS server is ready. Spawning workers")
 
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the /metrics totals
+    from app.metrics import archive_worker
+    archive_worker(worker.pid)
+
 def worker_abort(worker):
     worker.log.info("Worker received SIGABRT signal")
\ No newline at end of file
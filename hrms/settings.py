@@ -1,4 +1,5 @@
 
+import os
 from pathlib import Path
 import pymysql
 pymysql.install_as_MySQLdb()
@@ -34,10 +35,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.MetricsMiddleware',
+    'app.middleware.QueryBudgetMiddleware',  # No-op unless QUERY_BUDGET_ENABLED
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -129,6 +133,10 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generated files (background job exports) - never served by nginx or static(),
+# only through permission-checked views such as download_job_result
+PRIVATE_MEDIA_ROOT = BASE_DIR / 'private_media'
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -136,6 +144,44 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Cache shared by every worker (Redis). Dashboard fragments, attendance calendars and
+# principal snapshots are invalidated explicitly on save, and a delete or generation bump
+# only reaches workers that share the cache. Without REDIS_URL each process gets its own
+# LocMemCache and app.caching falls back to short timeouts (see cache_is_shared).
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+
+# Query budget / N+1 detector (app.middleware.QueryBudgetMiddleware)
+# Logs requests that run too many queries or repeat one query shape too often
+QUERY_BUDGET_ENABLED = False
+QUERY_BUDGET_MAX_QUERIES = 50
+QUERY_BUDGET_MAX_REPEATS = 10
+
+# Metrics registry served at /metrics (app.middleware.MetricsMiddleware)
+# Each worker writes snapshots to METRICS_DIR; keep it on tmpfs shared by all workers
+METRICS_ENABLED = True
+METRICS_DIR = '/dev/shm/hrms_metrics'
+# Who may scrape /metrics: with METRICS_TOKEN set, requests must send "Authorization: Bearer <token>";
+# otherwise only clients connecting from METRICS_ALLOWED_NETWORKS (nginx also denies /metrics).
+# Loopback only: behind a load balancer or docker bridge every public request arrives from a
+# private address, so scrapers on another host need METRICS_TOKEN
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = ['127.0.0.1/32', '::1/128']
+
+# Chat push events for the /chat-stream/ SSE endpoint (app.realtime)
+# LocalBackend only reaches streams in the same process. Streams are held by the separate
+# ASGI (daphne) process while messages are posted to gunicorn, so with Redis events go through it
+REALTIME_BACKEND = 'app.realtime.RedisBackend' if REDIS_URL else 'app.realtime.LocalBackend'
+REALTIME_REDIS_URL = REDIS_URL
+
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from app.views_health import health_check, detailed_health_check, readiness_check, liveness_check
+from app.views_health import health_check, detailed_health_check, readiness_check, liveness_check, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +13,9 @@ urlpatterns = [
     path('health/detailed/', detailed_health_check, name='detailed_health_check'),
     path('health/ready/', readiness_check, name='readiness_check'),
     path('health/live/', liveness_check, name='liveness_check'),
+    
+    # Prometheus metrics (aggregated across gunicorn workers)
+    path('metrics', metrics, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 # if settings.DEBUG: